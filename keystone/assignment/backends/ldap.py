@@ -55,7 +55,8 @@ class Assignment(assignment.Driver):
         return self._set_default_domain(self.project.get(tenant_id))
 
     def list_projects(self, hints):
-        return self._set_default_domain(self.project.get_all())
+        return self._set_default_domain(
+            self.project.get_all(self.project.filter_query(hints)))
 
     def list_projects_in_domain(self, domain_id):
         # We don't support multiple domains within this driver, so ignore
@@ -137,7 +138,7 @@ class Assignment(assignment.Driver):
         return self.role.get(role_id)
 
     def list_roles(self, hints):
-        return self.role.get_all()
+        return self.role.get_all(self.role.filter_query(hints))
 
     def list_projects_for_user(self, user_id, group_ids, hints):
         user_dn = self.user._id_to_dn(user_id)
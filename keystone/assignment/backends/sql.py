@@ -33,6 +33,23 @@ class AssignmentType:
     USER_DOMAIN = 'UserDomain'
     GROUP_DOMAIN = 'GroupDomain'
 
+    @classmethod
+    def calculate_type(cls, user_id, group_id, project_id, domain_id):
+        if user_id and project_id:
+            return cls.USER_PROJECT
+        elif user_id and domain_id:
+            return cls.USER_DOMAIN
+        elif group_id and project_id:
+            return cls.GROUP_PROJECT
+        elif group_id and domain_id:
+            return cls.GROUP_DOMAIN
+        else:
+            message_data = ', '.join(
+                [user_id, group_id, project_id, domain_id])
+            raise exception.Error(message=_(
+                'Unexpected combination of grant attributes - '
+                'User, Group, Project, Domain: %s') % message_data)
+
 
 class Assignment(keystone_assignment.Driver):
 
@@ -117,23 +134,6 @@ class Assignment(keystone_assignment.Driver):
     def create_grant(self, role_id, user_id=None, group_id=None,
                      domain_id=None, project_id=None,
                      inherited_to_projects=False):
-
-        def calculate_type(user_id, group_id, project_id, domain_id):
-            if user_id and project_id:
-                return AssignmentType.USER_PROJECT
-            elif user_id and domain_id:
-                return AssignmentType.USER_DOMAIN
-            elif group_id and project_id:
-                return AssignmentType.GROUP_PROJECT
-            elif group_id and domain_id:
-                return AssignmentType.GROUP_DOMAIN
-            else:
-                message_data = ', '.join(
-                    [user_id, group_id, project_id, domain_id])
-                raise exception.Error(message=_(
-                    'Unexpected combination of grant attributes - '
-                    'User, Group, Project, Domain: %s') % message_data)
-
         with sql.transaction() as session:
             self._get_role(session, role_id)
 
@@ -146,7 +146,8 @@ class Assignment(keystone_assignment.Driver):
                 msg = _('Inherited roles can only be assigned to domains')
                 raise exception.Conflict(type='role grant', details=msg)
 
-        type = calculate_type(user_id, group_id, project_id, domain_id)
+        type = AssignmentType.calculate_type(user_id, group_id, project_id,
+                                             domain_id)
         try:
             with sql.transaction() as session:
                 session.add(RoleAssignment(
@@ -159,6 +160,53 @@ class Assignment(keystone_assignment.Driver):
             # The v3 grant APIs are silent if the assignment already exists
             pass
 
+    def create_grants(self, grants):
+        if not grants:
+            return
+        with sql.transaction() as session:
+            for model, key, not_found in (
+                    (Role, 'role_id', exception.RoleNotFound),
+                    (Domain, 'domain_id', exception.DomainNotFound),
+                    (Project, 'project_id', exception.ProjectNotFound)):
+                ids = set(grant[key] for grant in grants if grant.get(key))
+                if not ids:
+                    continue
+                query = session.query(model.id).filter(model.id.in_(ids))
+                missing = ids - set(row.id for row in query.all())
+                if missing:
+                    raise not_found(**{key: missing.pop()})
+
+            # NOTE(garcianavalon) keyed by the primary key of the table
+            assignments = {}
+            for grant in grants:
+                if grant.get('project_id') and grant['inherited_to_projects']:
+                    msg = _('Inherited roles can only be assigned to domains')
+                    raise exception.Conflict(type='role grant', details=msg)
+                key = (AssignmentType.calculate_type(
+                           grant.get('user_id'), grant.get('group_id'),
+                           grant.get('project_id'), grant.get('domain_id')),
+                       grant.get('user_id') or grant.get('group_id'),
+                       grant.get('project_id') or grant.get('domain_id'),
+                       grant['role_id'])
+                assignments.setdefault(key, grant['inherited_to_projects'])
+
+            # The v3 grant APIs are silent if the assignment already exists
+            query = session.query(RoleAssignment)
+            query = query.filter(RoleAssignment.actor_id.in_(
+                set(key[1] for key in assignments)))
+            query = query.filter(RoleAssignment.target_id.in_(
+                set(key[2] for key in assignments)))
+            for ref in query.all():
+                assignments.pop(
+                    (ref.type, ref.actor_id, ref.target_id, ref.role_id),
+                    None)
+
+            session.add_all(
+                RoleAssignment(type=key[0], actor_id=key[1],
+                               target_id=key[2], role_id=key[3],
+                               inherited=inherited)
+                for key, inherited in six.iteritems(assignments))
+
     def list_grants(self, user_id=None, group_id=None,
                     domain_id=None, project_id=None,
                     inherited_to_projects=False):
@@ -234,6 +282,15 @@ class Assignment(keystone_assignment.Driver):
             project_refs = query.filter_by(domain_id=domain_id)
             return [project_ref.to_dict() for project_ref in project_refs]
 
+    def list_project_ids_in_domains(self, domain_ids):
+        projects = dict((domain_id, []) for domain_id in domain_ids)
+        with sql.transaction() as session:
+            query = session.query(Project.id, Project.domain_id)
+            query = query.filter(Project.domain_id.in_(domain_ids))
+            for project_id, domain_id in query:
+                projects[domain_id].append(project_id)
+        return projects
+
     def _project_ids_to_dicts(self, session, ids):
         if not ids:
             return []
@@ -575,6 +632,16 @@ class Assignment(keystone_assignment.Driver):
             session.add(tenant_ref)
             return tenant_ref.to_dict()
 
+    @sql.handle_conflicts(conflict_type='project')
+    def create_projects(self, tenants):
+        with sql.transaction() as session:
+            tenant_refs = []
+            for tenant in tenants:
+                tenant = dict(tenant, name=clean.project_name(tenant['name']))
+                tenant_refs.append(Project.from_dict(tenant))
+            session.add_all(tenant_refs)
+            return [tenant_ref.to_dict() for tenant_ref in tenant_refs]
+
     @sql.handle_conflicts(conflict_type='project')
     def update_project(self, tenant_id, tenant):
         if 'name' in tenant:
@@ -739,7 +806,7 @@ class Project(sql.ModelBase, sql.DictBase):
     __tablename__ = 'project'
     attributes = ['id', 'name', 'domain_id', 'description', 'enabled']
     id = sql.Column(sql.String(64), primary_key=True)
-    name = sql.Column(sql.String(64), nullable=False)
+    name = sql.Column(sql.String(64), nullable=False, index=True)
     domain_id = sql.Column(sql.String(64), sql.ForeignKey('domain.id'),
                            nullable=False)
     description = sql.Column(sql.Text())
@@ -15,7 +15,9 @@
 """Main entry point into the assignment service."""
 
 import abc
-import copy
+import collections
+import time
+
 import six
 
 from keystone import clean
@@ -48,6 +50,103 @@ def calc_default_domain():
             'name': u'Default'}
 
 
+class EffectiveRolesCache(object):
+    """Remember the effective roles of users on projects and domains.
+
+    Entries are keyed by user and target, expire after ``ttl`` seconds and the
+    least recently used ones are dropped beyond ``size``. The notifications
+    that invalidate them are only delivered within this process, so other
+    processes may keep using the previous roles until their entries expire.
+
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries = collections.OrderedDict()
+        self._user_keys = {}
+
+    def get(self, user_id, target_type, target_id):
+        key = (user_id, target_type, target_id)
+        entry = self._entries.pop(key, None)
+        if entry is not None and time.time() < entry[1]:
+            self._entries[key] = entry
+            self.hits += 1
+            return list(entry[0])
+        if entry is not None:
+            self._forget_user_key(key)
+        self.misses += 1
+        return None
+
+    def set(self, user_id, target_type, target_id, role_ids, generation):
+        """Remember the roles, unless invalidated since ``generation``."""
+        if generation != self.generation:
+            return
+        key = (user_id, target_type, target_id)
+        self._entries.pop(key, None)
+        self._entries[key] = (tuple(role_ids), time.time() + self.ttl)
+        self._user_keys.setdefault(user_id, set()).add(key)
+        while len(self._entries) > self.size:
+            old_key, _entry = self._entries.popitem(last=False)
+            self._forget_user_key(old_key)
+
+    def _forget_user_key(self, key):
+        user_keys = self._user_keys.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._user_keys[key[0]]
+
+    def invalidate(self, user_id=None, target_id=None):
+        """Forget the roles of a user, on a target or both.
+
+        Everything is forgotten if neither is given.
+
+        """
+        self.generation += 1
+        if user_id is None and target_id is None:
+            self._entries.clear()
+            self._user_keys.clear()
+            return
+        if user_id is None:
+            keys = [key for key in self._entries if key[2] == target_id]
+        else:
+            keys = [key for key in self._user_keys.get(user_id, ())
+                    if target_id is None or key[2] == target_id]
+        for key in keys:
+            self._entries.pop(key, None)
+            self._forget_user_key(key)
+
+    def get_stats(self):
+        """Report the use of the cache, to help sizing it.
+
+        :returns: dictionary with the number of entries, hits and misses.
+
+        """
+        return {'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+_EFFECTIVE_ROLES = None
+
+
+def get_effective_roles_cache():
+    """Return the process wide cache of effective roles, if enabled."""
+    global _EFFECTIVE_ROLES
+    size = CONF.assignment.effective_roles_cache_size
+    ttl = CONF.assignment.effective_roles_cache_time
+    if size <= 0:
+        return None
+    if (_EFFECTIVE_ROLES is None or _EFFECTIVE_ROLES.size != size or
+            _EFFECTIVE_ROLES.ttl != ttl):
+        _EFFECTIVE_ROLES = EffectiveRolesCache(size, ttl)
+    return _EFFECTIVE_ROLES
+
+
 @dependency.provider('assignment_api')
 @dependency.optional('revoke_api')
 @dependency.requires('credential_api', 'identity_api')
@@ -65,6 +164,30 @@ class Manager(manager.Manager):
     _INVALIDATION_USER_PROJECT_TOKENS = 'invalidate_user_project_tokens'
 
     def __init__(self):
+        self.event_callbacks = {
+            notifications.ACTIONS.created: {
+                notifications.role_assignment.ROLE_ASSIGNMENT: [
+                    self._role_assignment_callback],
+            },
+            notifications.ACTIONS.deleted: {
+                notifications.role_assignment.ROLE_ASSIGNMENT: [
+                    self._role_assignment_callback],
+                self._PROJECT: [self._project_callback],
+                'domain': [self._invalidate_effective_roles_callback],
+                'role': [self._invalidate_effective_roles_callback],
+                'user': [self._user_callback],
+            },
+            notifications.ACTIONS.disabled: {
+                self._PROJECT: [self._project_callback],
+                'domain': [self._invalidate_effective_roles_callback],
+            },
+            notifications.ACTIONS.internal: {
+                notifications.INVALIDATE_USER_TOKEN_PERSISTENCE: [
+                    self._user_callback],
+                notifications.INVALIDATE_USER_EFFECTIVE_ROLES: [
+                    self._user_callback],
+            },
+        }
         assignment_driver = CONF.assignment.driver
 
         if assignment_driver is None:
@@ -73,6 +196,42 @@ class Manager(manager.Manager):
 
         super(Manager, self).__init__(assignment_driver)
 
+    def _invalidate_effective_roles(self, user_id=None, target_id=None):
+        effective_roles = get_effective_roles_cache()
+        if effective_roles is not None:
+            effective_roles.invalidate(user_id, target_id)
+
+    def _role_assignment_callback(self, service, resource_type, operation,
+                                  payload):
+        if get_effective_roles_cache() is None:
+            return
+        assignment = payload['resource_info']
+        target_id = None
+        if not assignment['inherited_to_projects']:
+            target_id = assignment['project_id'] or assignment['domain_id']
+        if assignment['user_id']:
+            self._invalidate_effective_roles(assignment['user_id'], target_id)
+            return
+        group_id = assignment['group_id']
+        try:
+            user_ids = self.identity_api.list_user_ids_in_groups(
+                [group_id]).get(group_id, [])
+        except exception.GroupNotFound:
+            self._invalidate_effective_roles()
+            return
+        for user_id in user_ids:
+            self._invalidate_effective_roles(user_id, target_id)
+
+    def _project_callback(self, service, resource_type, operation, payload):
+        self._invalidate_effective_roles(target_id=payload['resource_info'])
+
+    def _user_callback(self, service, resource_type, operation, payload):
+        self._invalidate_effective_roles(user_id=payload['resource_info'])
+
+    def _invalidate_effective_roles_callback(self, service, resource_type,
+                                             operation, payload):
+        self._invalidate_effective_roles()
+
     def _get_group_ids_for_user_id(self, user_id):
         # TODO(morganfainberg): Implement a way to get only group_ids
         # instead of the more expensive to_dict() call for each record.
@@ -92,6 +251,29 @@ class Manager(manager.Manager):
                                          ret['domain_id'])
         return ret
 
+    @notifications.created(_PROJECT, result_id_arg_attr='id', bulk=True)
+    def create_projects(self, tenants):
+        """Create several projects at once, see create_project.
+
+        :param tenants: list of project dicts, with their ids already set
+        :returns: list of the projects created, in the order given
+
+        """
+        projects = []
+        for tenant in tenants:
+            tenant = tenant.copy()
+            tenant.setdefault('enabled', True)
+            tenant['enabled'] = clean.project_enabled(tenant['enabled'])
+            tenant.setdefault('description', '')
+            projects.append(tenant)
+        refs = self.driver.create_projects(projects)
+        for ret in refs:
+            if SHOULD_CACHE(ret):
+                self.get_project.set(ret, self, ret['id'])
+                self.get_project_by_name.set(ret, self, ret['name'],
+                                             ret['domain_id'])
+        return refs
+
     def assert_domain_enabled(self, domain_id, domain=None):
         """Assert the Domain is enabled.
 
@@ -197,11 +379,22 @@ class Manager(manager.Manager):
 
             return role_list
 
+        effective_roles = get_effective_roles_cache()
+        if effective_roles is not None:
+            role_list = effective_roles.get(user_id, self._PROJECT, tenant_id)
+            if role_list is not None:
+                return role_list
+            generation = effective_roles.generation
+
         project_ref = self.get_project(tenant_id)
         user_role_list = _get_user_project_roles(user_id, project_ref)
         group_role_list = _get_group_project_roles(user_id, project_ref)
         # Use set() to process the list to remove any duplicates
-        return list(set(user_role_list + group_role_list))
+        role_list = list(set(user_role_list + group_role_list))
+        if effective_roles is not None:
+            effective_roles.set(user_id, self._PROJECT, tenant_id, role_list,
+                                generation)
+        return role_list
 
     def get_roles_for_user_and_domain(self, user_id, domain_id):
         """Get the roles associated with a user within given domain.
@@ -241,11 +434,22 @@ class Manager(manager.Manager):
             return self._roles_from_role_dicts(
                 metadata_ref.get('roles', {}), False)
 
+        effective_roles = get_effective_roles_cache()
+        if effective_roles is not None:
+            role_list = effective_roles.get(user_id, 'domain', domain_id)
+            if role_list is not None:
+                return role_list
+            generation = effective_roles.generation
+
         self.get_domain(domain_id)
         user_role_list = _get_user_domain_roles(user_id, domain_id)
         group_role_list = _get_group_domain_roles(user_id, domain_id)
         # Use set() to process the list to remove any duplicates
-        return list(set(user_role_list + group_role_list))
+        role_list = list(set(user_role_list + group_role_list))
+        if effective_roles is not None:
+            effective_roles.set(user_id, 'domain', domain_id, role_list,
+                                generation)
+        return role_list
 
     def add_user_to_project(self, tenant_id, user_id):
         """Add user to a tenant by creating a default role relationship.
@@ -276,6 +480,7 @@ class Manager(manager.Manager):
                 user_id,
                 tenant_id,
                 config.CONF.member_role_id)
+        self._invalidate_effective_roles(user_id, tenant_id)
 
     def remove_user_from_project(self, tenant_id, user_id):
         """Remove user from a tenant
@@ -299,6 +504,7 @@ class Manager(manager.Manager):
             except exception.RoleNotFound:
                 LOG.debug("Removing role %s failed because it does not exist.",
                           role_id)
+        self._invalidate_effective_roles(user_id, tenant_id)
 
     # TODO(henry-nash): We might want to consider list limiting this at some
     # point in the future.
@@ -538,6 +744,10 @@ class Manager(manager.Manager):
         return [r for r in self.driver.list_role_assignments()
                 if r['role_id'] == role_id]
 
+    def add_role_to_user_and_project(self, user_id, tenant_id, role_id):
+        self.driver.add_role_to_user_and_project(user_id, tenant_id, role_id)
+        self._invalidate_effective_roles(user_id, tenant_id)
+
     def remove_role_from_user_and_project(self, user_id, tenant_id, role_id):
         self.driver.remove_role_from_user_and_project(user_id, tenant_id,
                                                       role_id)
@@ -557,6 +767,26 @@ class Manager(manager.Manager):
         self.driver.create_grant(role_id, user_id, group_id, domain_id,
                                  project_id, inherited_to_projects)
 
+    def create_grants(self, grants, context=None):
+        """Create several grants at once, see create_grant.
+
+        :param grants: list of dicts with the ``role_id``, the ``user_id``
+                       or ``group_id``, the ``project_id`` or ``domain_id``
+                       and, optionally, ``inherited_to_projects`` of every
+                       grant
+
+        """
+        assignments = []
+        for grant in grants:
+            assignment = dict((key, grant.get(key)) for key in (
+                'role_id', 'user_id', 'group_id', 'domain_id', 'project_id'))
+            assignment['inherited_to_projects'] = grant.get(
+                'inherited_to_projects', False)
+            assignments.append(assignment)
+        self.driver.create_grants(assignments)
+        notifications.send_role_assignments_notification(
+            notifications.ACTIONS.created, context, assignments)
+
     @notifications.role_assignment('deleted')
     def delete_grant(self, role_id, user_id=None, group_id=None,
                      domain_id=None, project_id=None,
@@ -588,164 +818,133 @@ class Manager(manager.Manager):
         if user_id is not None:
             self._emit_invalidate_user_token_persistence(user_id)
 
-    # The methods _expand_indirect_assignment, _list_direct_role_assignments
+    # The methods _expand_indirect_assignments, _list_direct_role_assignments
     # and _list_effective_role_assignments below are only used on
     # list_role_assignments, but they are not in its scope as nested functions
     # since it would significantly increase McCabe complexitiy, that should be
     # kept as it is in order to detect unnecessarily complex code, which is not
     # this case.
 
-    def _expand_indirect_assignment(self, ref, user_id=None,
-                                    project_id=None):
-        """Returns a list of expanded role assignments.
-
-        Given the original assignment ref, it expands grouping and inheritance,
-        applying provided filters.
-
-        """
-
-        def create_group_assignment(base_ref, user_id):
-            """Creates a group assignment from the provided ref."""
+    def _expand_indirect_assignments(self, refs, user_id=None,
+                                     project_id=None):
+        """Yields the expanded role assignments of a list of refs.
 
-            ref = copy.deepcopy(base_ref)
+        Given the original assignment refs, it expands grouping and
+        inheritance, applying provided filters. The members of every group
+        and the projects of every domain involved are fetched once for the
+        whole list, rather than once per ref.
 
-            ref['user_id'] = user_id
+        A group assignment, such as:
 
-            indirect = ref.setdefault('indirect', {})
-            indirect['group_id'] = ref.pop('group_id')
+        {
+            'group_id': group_id,
+            'project_id': project_id,
+            'role_id': role_id
+        }
 
-            return ref
-
-        def expand_group_assignment(ref, user_id):
-            """Expands group role assignments.
-
-            For any group role assignment on a target, it is replaced by a set
-            of role assignments containing one for each user of that group on
-            that target.
+        is replaced by one assignment for each user of that group:
 
-            An example of accepted ref is:
-
-            {
-                'group_id': group_id,
-                'project_id': project_id,
-                'role_id': role_id
+        {
+            'user_id': user_id,
+            'project_id': project_id,
+            'role_id': role_id,
+            'indirect' : {
+                'group_id': group_id
             }
+        }
 
-            Once expanded, it should be returned as a list of entities like the
-            one below, one for each each user_id in the provided group_id.
-
-            {
-                'user_id': user_id,
-                'project_id': project_id,
-                'role_id': role_id,
-                'indirect' : {
-                    'group_id': group_id
-                }
-            }
-
-            Returned list will be formatted by the Controller, which will
-            deduce a role assignment came from group membership if it has both
-            'user_id' in the main body of the dict and 'group_id' in indirect
-            subdict.
-
-            """
-            if user_id:
-                return [create_group_assignment(ref, user_id=user_id)]
-
-            return [create_group_assignment(ref, user_id=m['id'])
-                    for m in self.identity_api.list_users_in_group(
-                        ref['group_id'])]
+        An inherited assignment, such as:
 
-        def expand_inherited_assignment(ref, user_id, project_id=None):
-            """Expands inherited role assignments.
+        {
+            'group_id': group_id,
+            'domain_id': domain_id,
+            'role_id': role_id,
+            'inherited_to_projects': 'projects'
+        }
 
-            For any group role assignment on a target, replaces it by a set of
-            role assignments containing one for each user of that group on that
-            target.
+        is replaced by one assignment for each user of that group (or just the
+        user, if it was given to an user) on each project under the target:
 
-            For any inherited role assignment for an actor on a target,
-            replaces it by a set of role assignments for that actor on every
-            project under that target.
-
-            An example of accepted ref is:
-
-            {
+        {
+            'user_id': user_id,
+            'project_id': project_id,
+            'role_id': role_id,
+            'indirect' : {
                 'group_id': group_id,
-                'project_id': parent_id,
-                'role_id': role_id,
-                'inherited_to_projects': 'projects'
-            }
-
-            Once expanded, it should be returned as a list of entities like the
-            one below, one for each each user_id in the provided group_id and
-            for each subproject_id in the project_id subtree.
-
-            {
-                'user_id': user_id,
-                'project_id': subproject_id,
-                'role_id': role_id,
-                'indirect' : {
-                    'group_id': group_id,
-                    'project_id': parent_id
-                }
+                'domain_id': domain_id
             }
+        }
 
-            Returned list will be formatted by the Controller, which will
-            deduce a role assignment came from group membership if it has both
-            'user_id' in the main body of the dict and 'group_id' in the
-            'indirect' subdict, as well as it is possible to deduce if it has
-            come from inheritance if it contains both a 'project_id' in the
-            main body of the dict and 'parent_id' in the 'indirect' subdict.
-
-            """
-            def create_inherited_assignment(base_ref, project_id):
-                """Creates a project assignment from the provided ref."""
-
-                ref = copy.deepcopy(base_ref)
-
-                indirect = ref.setdefault('indirect', {})
-                if ref.get('project_id'):
-                    indirect['project_id'] = ref.pop('project_id')
-                else:
-                    indirect['domain_id'] = ref.pop('domain_id')
-
-                ref['project_id'] = project_id
-                ref.pop('inherited_to_projects')
-
-                return ref
+        The Controller will deduce from the 'indirect' subdict whether a role
+        assignment came from group membership, inheritance or both.
 
-            # Defines expanded project list
+        """
+        group_ids = set()
+        domain_ids = set()
+        for ref in refs:
+            if 'group_id' in ref and not user_id:
+                group_ids.add(ref['group_id'])
+            if (ref.get('inherited_to_projects') == 'projects' and
+                    not project_id and ref.get('domain_id')):
+                domain_ids.add(ref['domain_id'])
+
+        members = {}
+        if group_ids:
+            members = self.identity_api.list_user_ids_in_groups(group_ids)
+        domain_projects = {}
+        if domain_ids:
+            domain_projects = self.driver.list_project_ids_in_domains(
+                domain_ids)
+        subtree_projects = {}
+
+        def list_target_project_ids(ref):
             if project_id:
-                project_ids = [project_id]
-            elif ref.get('domain_id'):
-                project_ids = (
-                    [x['id'] for x in
-                        self.list_projects_in_domain(
-                            ref['domain_id'])])
-            else:
-                project_ids = (
-                    [x['id'] for x in
-                        self.list_projects_in_subtree(
-                            ref['project_id'])])
-
-            new_refs = []
+                return [project_id]
+            if ref.get('domain_id'):
+                return domain_projects.get(ref['domain_id'], [])
+            if ref['project_id'] not in subtree_projects:
+                subtree_projects[ref['project_id']] = [
+                    x['id'] for x in
+                    self.list_projects_in_subtree(ref['project_id'])]
+            return subtree_projects[ref['project_id']]
+
+        for ref in refs:
+            inherited = ref.get('inherited_to_projects') == 'projects'
+            if 'group_id' not in ref and not inherited:
+                yield ref
+                continue
+
+            base_ref = ref.copy()
+            indirect = {}
+            actor_ids = [None]
             if 'group_id' in ref:
-                # Expand role assignment for all members and for all projects
-                for ref in expand_group_assignment(ref, user_id):
-                    new_refs += [create_inherited_assignment(ref, proj_id)
-                                 for proj_id in project_ids]
+                indirect['group_id'] = base_ref.pop('group_id')
+                actor_ids = ([user_id] if user_id else
+                             members.get(indirect['group_id'], []))
+
+            if not inherited:
+                for actor_id in actor_ids:
+                    new_ref = base_ref.copy()
+                    new_ref['user_id'] = actor_id
+                    new_ref['indirect'] = indirect.copy()
+                    yield new_ref
+                continue
+
+            target_project_ids = list_target_project_ids(ref)
+            base_ref.pop('inherited_to_projects')
+            if base_ref.get('project_id'):
+                indirect['project_id'] = base_ref.pop('project_id')
             else:
-                # Expand role assignment for all projects
-                new_refs += [create_inherited_assignment(ref, proj_id)
-                             for proj_id in project_ids]
+                indirect['domain_id'] = base_ref.pop('domain_id')
 
-            return new_refs
-
-        if ref.get('inherited_to_projects') == 'projects':
-            return expand_inherited_assignment(ref, user_id, project_id)
-        elif 'group_id' in ref:
-            return expand_group_assignment(ref, user_id)
-        return [ref]
+            for actor_id in actor_ids:
+                for target_project_id in target_project_ids:
+                    new_ref = base_ref.copy()
+                    if actor_id:
+                        new_ref['user_id'] = actor_id
+                    new_ref['project_id'] = target_project_id
+                    new_ref['indirect'] = indirect.copy()
+                    yield new_ref
 
     def _list_effective_role_assignments(self, role_id, user_id, group_id,
                                          domain_id, project_id, inherited):
@@ -833,12 +1032,8 @@ class Manager(manager.Manager):
                     inherited=inherited)
 
         # Expand grouping and inheritance on retrieved role assignments
-        refs = []
-        for ref in (direct_refs + group_refs):
-            refs += self._expand_indirect_assignment(ref=ref, user_id=user_id,
-                                                     project_id=project_id)
-
-        return refs
+        return list(self._expand_indirect_assignments(
+            direct_refs + group_refs, user_id=user_id, project_id=project_id))
 
     def _list_direct_role_assignments(self, role_id, user_id, group_id,
                                       domain_id, project_id, inherited):
@@ -1056,6 +1251,20 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def create_grants(self, grants):
+        """Creates several assignments/grants, see create_grant.
+
+        :param grants: list of dicts with the ``role_id``, the ``user_id``
+                       or ``group_id``, the ``project_id`` or ``domain_id``
+                       and ``inherited_to_projects`` of every grant
+
+        """
+        for grant in grants:
+            self.create_grant(grant['role_id'], grant.get('user_id'),
+                              grant.get('group_id'), grant.get('domain_id'),
+                              grant.get('project_id'),
+                              grant['inherited_to_projects'])
+
     @abc.abstractmethod
     def list_grants(self, user_id=None, group_id=None,
                     domain_id=None, project_id=None,
@@ -1182,6 +1391,17 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def create_projects(self, projects):
+        """Creates several new projects, in a single transaction if possible.
+
+        :param projects: list of project dicts, with their ids already set
+        :returns: list of the projects created, in the same order
+        :raises: keystone.exception.Conflict
+
+        """
+        return [self.create_project(project['id'], project)
+                for project in projects]
+
     @abc.abstractmethod
     def list_projects(self, hints):
         """List projects in the system.
@@ -1206,6 +1426,22 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_project_ids_in_domains(self, domain_ids):
+        """List the ids of the projects in several domains.
+
+        Drivers able to fetch the projects of many domains with a single query
+        should override this.
+
+        :param domain_ids: the domains in question
+
+        :returns: a dict of lists of project ids, keyed by domain id.
+
+        """
+        return dict(
+            (domain_id, [project['id'] for project in
+                         self.list_projects_in_domain(domain_id)])
+            for domain_id in domain_ids)
+
     @abc.abstractmethod
     def list_projects_for_user(self, user_id, group_ids, hints):
         """List all projects associated with a given user.
@@ -526,9 +526,40 @@ class Auth(controller.V3Controller):
         token_data = self.token_provider_api.validate_v3_token(
             token_id)
         if not include_catalog and 'catalog' in token_data['token']:
+            # NOTE(garcianavalon) the validated token data might be shared
+            # with other requests, don't modify it
+            token_data = dict(token_data, token=dict(token_data['token']))
             del token_data['token']['catalog']
         return render_token_data_response(token_id, token_data)
 
+    @controller.protected()
+    def validate_tokens(self, context, tokens=None):
+        if not isinstance(tokens, list) or not all(
+                isinstance(token_id, six.string_types) and token_id
+                for token_id in tokens):
+            raise exception.ValidationError(attribute='tokens',
+                                            target='request body')
+        if len(tokens) > CONF.token.max_batch_validation:
+            raise exception.ValidationSizeError(
+                attribute='tokens', size=CONF.token.max_batch_validation)
+        include_catalog = 'nocatalog' not in context['query_string']
+        include_catalog = False
+        valid_tokens = self.token_provider_api.validate_tokens(tokens)
+        results = []
+        for token_id in tokens:
+            token_data = valid_tokens.get(token_id)
+            if token_data is None:
+                results.append({'id': token_id, 'valid': False})
+                continue
+            if not include_catalog and 'catalog' in token_data['token']:
+                token_data = dict(token_data['token'])
+                del token_data['catalog']
+            else:
+                token_data = token_data['token']
+            results.append({'id': token_id, 'valid': True,
+                            'token': token_data})
+        return {'tokens': results}
+
     @controller.protected()
     def revocation_list(self, context, auth=None):
         if not CONF.token.revoke_by_id:
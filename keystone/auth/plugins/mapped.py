@@ -12,7 +12,6 @@
 
 import functools
 
-from oslo.serialization import jsonutils
 from pycadf import cadftaxonomy as taxonomy
 from six.moves.urllib import parse
 
@@ -139,8 +138,7 @@ class Mapped(auth.AuthMethodHandler):
     def _apply_mapping_filter(self, identity_provider, protocol, assertion):
         mapping = self.federation_api.get_mapping_from_idp_and_protocol(
             identity_provider, protocol)
-        rules = jsonutils.loads(mapping['rules'])
-        rule_processor = utils.RuleProcessor(rules)
+        rule_processor = utils.get_rule_processor(mapping)
         mapped_properties = rule_processor.process(assertion)
         utils.validate_groups(mapped_properties['group_ids'],
                               mapping['id'], self.identity_api)
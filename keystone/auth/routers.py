@@ -35,6 +35,12 @@ class Routers(wsgi.RoutersBase):
             delete_action='revoke_token',
             rel=json_home.build_v3_resource_relation('auth_tokens'))
 
+        self._add_resource(
+            mapper, auth_controller,
+            path='/auth/tokens/batch',
+            post_action='validate_tokens',
+            rel=json_home.build_v3_resource_relation('auth_tokens_batch'))
+
         self._add_resource(
             mapper, auth_controller,
             path='/auth/tokens/OS-PKI/revoked',
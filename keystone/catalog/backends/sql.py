@@ -13,6 +13,9 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
+
+from oslo.utils import timeutils
 import six
 import sqlalchemy
 
@@ -86,6 +89,9 @@ class Endpoint(sql.ModelBase, sql.DictBase):
 
 
 class Catalog(catalog.Driver):
+    _compiled_catalog = None
+    _compiled_catalog_expires = None
+
     # Regions
     def list_regions(self, hints):
         session = sql.get_session()
@@ -269,44 +275,17 @@ class Catalog(catalog.Driver):
             ref.extra = new_endpoint.extra
         return ref.to_dict()
 
-    def get_catalog(self, user_id, tenant_id, metadata=None):
-        substitutions = dict(six.iteritems(CONF))
-        substitutions.update({'tenant_id': tenant_id, 'user_id': user_id})
+    def invalidate_compiled_catalog(self):
+        self._compiled_catalog = None
 
-        session = sql.get_session()
-        t = True  # variable for singleton for PEP8, E712.
-        endpoints = (session.query(Endpoint).
-                     options(sql.joinedload(Endpoint.service)).
-                     filter(Endpoint.enabled == t).all())
+    def _compile_catalog(self):
+        """Format everything in the catalog but the per-user substitutions.
 
-        catalog = {}
+        :returns: list of the enabled services, each one with a list of
+                  ``(endpoint_ref, url_template)`` for its enabled endpoints
 
-        for endpoint in endpoints:
-            if not endpoint.service['enabled']:
-                continue
-            try:
-                url = core.format_url(endpoint['url'], substitutions)
-            except exception.MalformedEndpoint:
-                continue  # this failure is already logged in format_url()
-
-            region = endpoint['region_id']
-            service_type = endpoint.service['type']
-            default_service = {
-                'id': endpoint['id'],
-                'name': endpoint.service['name'],
-                'publicURL': ''
-            }
-            catalog.setdefault(region, {})
-            catalog[region].setdefault(service_type, default_service)
-            interface_url = '%sURL' % endpoint['interface']
-            catalog[region][service_type][interface_url] = url
-
-        return catalog
-
-    def get_v3_catalog(self, user_id, tenant_id, metadata=None):
-        d = dict(six.iteritems(CONF))
-        d.update({'tenant_id': tenant_id,
-                  'user_id': user_id})
+        """
+        substitutions = dict(six.iteritems(CONF))
 
         session = sql.get_session()
         t = True  # variable for singleton for PEP8, E712.
@@ -314,25 +293,70 @@ class Catalog(catalog.Driver):
                     options(sql.joinedload(Service.endpoints)).
                     all())
 
-        def make_v3_endpoints(endpoints):
-            for endpoint in (ep.to_dict() for ep in endpoints if ep.enabled):
+        compiled = []
+        for svc in services:
+            endpoints = []
+            for endpoint in (ep.to_dict() for ep in svc.endpoints
+                             if ep.enabled):
+                try:
+                    template = core.compile_url(endpoint['url'],
+                                                substitutions)
+                except exception.MalformedEndpoint:
+                    continue  # this failure is already logged in format_url()
                 del endpoint['service_id']
                 del endpoint['legacy_endpoint_id']
                 del endpoint['enabled']
                 endpoint['region'] = endpoint['region_id']
-                try:
-                    endpoint['url'] = core.format_url(endpoint['url'], d)
-                except exception.MalformedEndpoint:
-                    continue  # this failure is already logged in format_url()
+                endpoints.append((endpoint, template))
+            compiled.append({'id': svc.id,
+                             'type': svc.type,
+                             'name': svc.extra.get('name'),
+                             'endpoints': endpoints})
+        return compiled
+
+    def _get_compiled_catalog(self):
+        # NOTE(garcianavalon) the compiled catalog is refreshed by the catalog
+        # notifications, changes made by other processes are picked up when
+        # it expires.
+        now = timeutils.utcnow()
+        compiled = self._compiled_catalog
+        if (compiled is None or not core.SHOULD_CACHE(compiled)
+                or now >= self._compiled_catalog_expires):
+            compiled = self._compile_catalog()
+            expiration_time = (core.EXPIRATION_TIME() or
+                               CONF.cache.expiration_time)
+            self._compiled_catalog = compiled
+            self._compiled_catalog_expires = now + datetime.timedelta(
+                seconds=expiration_time)
+        return compiled
 
-                yield endpoint
+    def get_catalog(self, user_id, tenant_id, metadata=None):
+        catalog = {}
+
+        for svc in self._get_compiled_catalog():
+            for endpoint, template in svc['endpoints']:
+                url = core.render_url(template, tenant_id, user_id)
+                region = endpoint['region_id']
+                default_service = {
+                    'id': endpoint['id'],
+                    'name': svc['name'],
+                    'publicURL': ''
+                }
+                catalog.setdefault(region, {})
+                catalog[region].setdefault(svc['type'], default_service)
+                interface_url = '%sURL' % endpoint['interface']
+                catalog[region][svc['type']][interface_url] = url
 
+        return catalog
+
+    def get_v3_catalog(self, user_id, tenant_id, metadata=None):
         def make_v3_service(svc):
-            eps = list(make_v3_endpoints(svc.endpoints))
-            service = {'endpoints': eps, 'id': svc.id, 'type': svc.type}
-            name = svc.extra.get('name')
-            if name:
-                service['name'] = name
+            eps = [dict(endpoint,
+                        url=core.render_url(template, tenant_id, user_id))
+                   for endpoint, template in svc['endpoints']]
+            service = {'endpoints': eps, 'id': svc['id'], 'type': svc['type']}
+            if svc['name']:
+                service['name'] = svc['name']
             return service
 
-        return [make_v3_service(svc) for svc in services]
+        return [make_v3_service(svc) for svc in self._get_compiled_catalog()]
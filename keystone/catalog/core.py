@@ -38,6 +38,10 @@ SHOULD_CACHE = cache.should_cache_fn('catalog')
 
 EXPIRATION_TIME = lambda: CONF.catalog.cache_time
 
+# The substitutions that change for every user and tenant, see compile_url()
+USER_SUBSTITUTIONS = ('tenant_id', 'user_id')
+_PLACEHOLDER = '\0'
+
 
 def format_url(url, substitutions):
     """Formats a user-defined URL with the given substitutions.
@@ -74,6 +78,34 @@ def format_url(url, substitutions):
     return result
 
 
+def compile_url(url, substitutions):
+    """Formats a user-defined URL except for the per-user substitutions.
+
+    The ``tenant_id`` and ``user_id`` substitutions are left in place, so the
+    result can be formatted for each user and tenant with ``render_url``.
+
+    :param string url: the URL to be formatted
+    :param dict substitutions: the dictionary used for substitution, the
+                               per-user values in it are ignored
+    :returns: a URL template
+
+    """
+    substitutions = dict(substitutions)
+    for key in USER_SUBSTITUTIONS:
+        substitutions[key] = '%s%s%s' % (_PLACEHOLDER, key, _PLACEHOLDER)
+    parts = format_url(url, substitutions).replace('%', '%%').split(
+        _PLACEHOLDER)
+    # NOTE(garcianavalon) the odd parts are the names of the substitutions
+    for index in range(1, len(parts), 2):
+        parts[index] = '%%(%s)s' % parts[index]
+    return ''.join(parts)
+
+
+def render_url(template, tenant_id, user_id):
+    """Formats a URL template built by ``compile_url`` for a user."""
+    return template % {'tenant_id': tenant_id, 'user_id': user_id}
+
+
 @dependency.provider('catalog_api')
 class Manager(manager.Manager):
     """Default pivot point for the Catalog backend.
@@ -87,8 +119,22 @@ class Manager(manager.Manager):
     _REGION = 'region'
 
     def __init__(self):
+        catalog_changed = [self._catalog_changed_callback]
+        self.event_callbacks = {}
+        for event in (notifications.ACTIONS.created,
+                      notifications.ACTIONS.updated,
+                      notifications.ACTIONS.deleted):
+            self.event_callbacks[event] = {
+                self._ENDPOINT: catalog_changed,
+                self._SERVICE: catalog_changed,
+                self._REGION: catalog_changed,
+            }
         super(Manager, self).__init__(CONF.catalog.driver)
 
+    def _catalog_changed_callback(self, service, resource_type, operation,
+                                  payload):
+        self.driver.invalidate_compiled_catalog()
+
     @notifications.created(_REGION, public=False, result_id_arg_attr='id')
     def create_region(self, region_ref):
         # Check duplicate ID
@@ -219,6 +265,15 @@ class Driver(object):
     def _get_list_limit(self):
         return CONF.catalog.list_limit or CONF.list_limit
 
+    def invalidate_compiled_catalog(self):
+        """Discard any catalog data compiled in advance by the driver.
+
+        Called whenever a region, service or endpoint changes. Drivers that
+        don't compile the catalog don't need to override this.
+
+        """
+        pass
+
     @abc.abstractmethod
     def create_region(self, region_ref):
         """Creates a new region.
@@ -15,6 +15,7 @@
 from __future__ import absolute_import
 
 import os
+import time
 
 from oslo.config import cfg
 import pbr.version
@@ -193,6 +194,28 @@ class TokenFlush(BaseApp):
         token_manager.driver.flush_expired_tokens()
 
 
+class OAuth2Flush(BaseApp):
+    """Flush expired OAuth2 access tokens and authorization codes."""
+
+    name = 'oauth2_flush'
+
+    @staticmethod
+    def main():
+        # NOTE(garcianavalon) OAuth2 is an extension, import it only when it
+        # is really going to be used.
+        from keystone.contrib import oauth2
+        oauth2_manager = oauth2.Manager()
+        start = time.time()
+        tokens_removed = oauth2_manager.driver.flush_expired_access_tokens()
+        codes_removed = (
+            oauth2_manager.driver.flush_expired_authorization_codes())
+        print(_('Removed %(tokens)d access tokens and %(codes)d '
+                'authorization codes in %(elapsed).2f seconds') %
+              {'tokens': tokens_removed,
+               'codes': codes_removed,
+               'elapsed': time.time() - start})
+
+
 class MappingPurge(BaseApp):
     """Purge the mapping table."""
 
@@ -290,6 +313,7 @@ CMDS = [
     DbSync,
     DbVersion,
     MappingPurge,
+    OAuth2Flush,
     PKISetup,
     SamlIdentityProviderMetadata,
     SSLSetup,
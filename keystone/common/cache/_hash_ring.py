@@ -0,0 +1,75 @@
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Consistent hash ring to spread keys over several memcached servers."""
+
+import bisect
+import hashlib
+
+import six
+
+
+class HashRing(object):
+    """Map keys to nodes with consistent hashing.
+
+    Every node is placed at ``points`` positions of the ring and a key belongs
+    to the node found next to its own position, so adding or removing a node
+    only moves the keys that belong, or will belong, to that node.
+
+    """
+
+    def __init__(self, nodes=(), points=100):
+        self.points = points
+        self._ring = {}
+        self._positions = []
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(key):
+        if isinstance(key, six.text_type):
+            key = key.encode('utf-8')
+        return int(hashlib.md5(key).hexdigest()[:8], 16)
+
+    @property
+    def nodes(self):
+        return set(six.itervalues(self._ring))
+
+    def add_node(self, node):
+        for point in six.moves.range(self.points):
+            self._ring[self._hash('%s-%d' % (node, point))] = node
+        self._positions = sorted(self._ring)
+
+    def remove_node(self, node):
+        self._ring = dict((position, ring_node)
+                          for position, ring_node in six.iteritems(self._ring)
+                          if ring_node != node)
+        self._positions = sorted(self._ring)
+
+    def get_node(self, key):
+        if not self._positions:
+            raise ValueError('The hash ring has no nodes')
+        index = bisect.bisect(self._positions, self._hash(key))
+        return self._ring[self._positions[index % len(self._positions)]]
+
+    def get_nodes(self, keys):
+        """Group the keys by the node they belong to.
+
+        :returns: dict of lists of keys, keyed by node
+
+        """
+        nodes = {}
+        for key in keys:
+            nodes.setdefault(self.get_node(key), []).append(key)
+        return nodes
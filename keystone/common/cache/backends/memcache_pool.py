@@ -20,6 +20,7 @@ import logging
 
 from dogpile.cache.backends import memcached as memcached_backend
 
+from keystone.common.cache import _hash_ring
 from keystone.common.cache import _memcache_pool
 
 
@@ -39,23 +40,101 @@ class ClientProxy(object):
         return functools.partial(self._run_method, name)
 
 
+def _create_client_pool(urls, arguments):
+    return _memcache_pool.MemcacheClientPool(
+        urls,
+        arguments={
+            'dead_retry': arguments.get('dead_retry', 5 * 60),
+            'socket_timeout': arguments.get('socket_timeout', 3),
+        },
+        maxsize=arguments.get('pool_maxsize', 10),
+        unused_timeout=arguments.get('pool_unused_timeout', 60),
+        conn_get_timeout=arguments.get('pool_connection_get_timeout', 10),
+    )
+
+
 class PooledMemcachedBackend(memcached_backend.MemcachedBackend):
     # Composed from GenericMemcachedBackend's and MemcacheArgs's __init__
     def __init__(self, arguments):
         super(PooledMemcachedBackend, self).__init__(arguments)
-        self.client_pool = _memcache_pool.MemcacheClientPool(
-            self.url,
-            arguments={
-                'dead_retry': arguments.get('dead_retry', 5 * 60),
-                'socket_timeout': arguments.get('socket_timeout', 3),
-            },
-            maxsize=arguments.get('pool_maxsize', 10),
-            unused_timeout=arguments.get('pool_unused_timeout', 60),
-            conn_get_timeout=arguments.get('pool_connection_get_timeout', 10),
-        )
+        self.client_pool = _create_client_pool(self.url, arguments)
 
     # Since all methods in backend just call one of methods of client, this
     # lets us avoid need to hack it too much
     @property
     def client(self):
         return ClientProxy(self.client_pool)
+
+
+class ShardedClientProxy(object):
+    """Send every key to the pool of the server it hashes to."""
+
+    def __init__(self, client_pools, ring):
+        self.client_pools = client_pools
+        self.ring = ring
+
+    def _run_method(self, __name, key, *args, **kwargs):
+        client_pool = self.client_pools[self.ring.get_node(key)]
+        with client_pool.acquire() as client:
+            return getattr(client, __name)(key, *args, **kwargs)
+
+    def _run_multi_method(self, __name, keys, build_arg, *args, **kwargs):
+        for node, node_keys in self.ring.get_nodes(keys).items():
+            with self.client_pools[node].acquire() as client:
+                yield getattr(client, __name)(build_arg(node_keys),
+                                              *args, **kwargs)
+
+    def get(self, key, *args, **kwargs):
+        return self._run_method('get', key, *args, **kwargs)
+
+    def set(self, key, *args, **kwargs):
+        return self._run_method('set', key, *args, **kwargs)
+
+    def add(self, key, *args, **kwargs):
+        return self._run_method('add', key, *args, **kwargs)
+
+    def delete(self, key, *args, **kwargs):
+        return self._run_method('delete', key, *args, **kwargs)
+
+    def get_multi(self, keys, *args, **kwargs):
+        values = {}
+        for node_values in self._run_multi_method('get_multi', keys, list,
+                                                  *args, **kwargs):
+            values.update(node_values)
+        return values
+
+    def set_multi(self, mapping, *args, **kwargs):
+        failed = []
+        build_mapping = lambda keys: dict((key, mapping[key]) for key in keys)
+        for node_failed in self._run_multi_method('set_multi', mapping,
+                                                  build_mapping,
+                                                  *args, **kwargs):
+            failed.extend(node_failed or [])
+        return failed
+
+    def delete_multi(self, keys, *args, **kwargs):
+        results = list(self._run_multi_method('delete_multi', keys, list,
+                                              *args, **kwargs))
+        return all(results)
+
+
+class ShardedMemcachedBackend(memcached_backend.MemcachedBackend):
+    """Spread the keys over the servers with consistent hashing.
+
+    python-memcached picks the server of a key as its hash modulo the number
+    of servers, so adding or removing a server moves almost every key. Here
+    each server has its own connection pool and the keys are placed on a
+    hash ring with ``hash_ring_points`` points per server instead.
+
+    """
+
+    def __init__(self, arguments):
+        super(ShardedMemcachedBackend, self).__init__(arguments)
+        self.client_pools = dict((url, _create_client_pool([url], arguments))
+                                 for url in self.url)
+        self.ring = _hash_ring.HashRing(
+            self.url, points=arguments.get('hash_ring_points', 100))
+
+    @property
+    def client(self):
+        return ShardedClientProxy(self.client_pools, self.ring)
@@ -45,6 +45,11 @@ dogpile.cache.register_backend(
     'keystone.common.cache.backends.memcache_pool',
     'PooledMemcachedBackend')
 
+dogpile.cache.register_backend(
+    'keystone.cache.memcache_sharded',
+    'keystone.common.cache.backends.memcache_pool',
+    'ShardedMemcachedBackend')
+
 
 class DebugProxy(proxy.ProxyBackend):
     """Extra Logging ProxyBackend."""
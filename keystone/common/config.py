@@ -109,6 +109,12 @@ FILE_OPTIONS = {
         cfg.IntOpt('crypt_strength', default=40000,
                    help='The value passed as the keyword "rounds" to '
                         'passlib\'s encrypt method.'),
+        cfg.IntOpt('crypt_workers', default=4,
+                   help='Number of native threads used to hash and verify '
+                        'passwords and to sign tokens when running under '
+                        'eventlet, so that logins don\'t block other '
+                        'requests. Set to 0 to do it in the request '
+                        'greenthread.'),
         cfg.BoolOpt('tcp_keepalive', default=False,
                     help='Set this to true if you want to enable '
                          'TCP_KEEPALIVE on server sockets, i.e. sockets used '
@@ -176,6 +182,15 @@ FILE_OPTIONS = {
         cfg.IntOpt('list_limit',
                    help='Maximum number of entities that will be returned in '
                         'an identity collection.'),
+        cfg.IntOpt('verified_password_cache_size', default=0,
+                   help='Number of users whose last successful password '
+                        'verification is remembered by each process, to '
+                        'skip hashing the password again. Only a keyed '
+                        'hash of the password is kept. Set to 0 to '
+                        'disable.'),
+        cfg.IntOpt('verified_password_cache_time', default=60,
+                   help='Time to remember a successful password '
+                        'verification (in seconds).'),
     ],
     'identity_mapping': [
         cfg.StrOpt('driver',
@@ -271,6 +286,24 @@ FILE_OPTIONS = {
                         "middleware must be configured with the "
                         "hash_algorithms, otherwise token revocation will "
                         "not be processed correctly."),
+        cfg.IntOpt('validation_cache_size', default=1000,
+                   help='Number of recently validated tokens remembered by '
+                        'each process, so validating them again skips the '
+                        'token backend. The results are checked again '
+                        'against any new revocation event, so this has no '
+                        'effect unless the Revoke extension and revocation '
+                        'event caching are enabled. Set to 0 to disable.'),
+        cfg.IntOpt('validation_cache_time', default=10,
+                   help='Time (in seconds) a token validation result is '
+                        'remembered.'),
+        cfg.IntOpt('user_index_buckets', default=8,
+                   help='Number of keys each user token list is split into '
+                        'by the sharded memcache token persistence backend. '
+                        'Changing it loses track of the tokens already '
+                        'issued, so flush memcache when doing so.'),
+        cfg.IntOpt('max_batch_validation', default=100,
+                   help='Maximum number of tokens that can be validated '
+                        'in a single batch validation request.'),
     ],
     'revoke': [
         cfg.StrOpt('driver',
@@ -284,6 +317,12 @@ FILE_OPTIONS = {
         cfg.BoolOpt('caching', default=True,
                     help='Toggle for revocation event caching. This has no '
                          'effect unless global caching is enabled.'),
+        cfg.IntOpt('poll_interval', default=5,
+                   help='Time (in seconds) between checks for revocation '
+                        'events recorded by other processes. Only the events '
+                        'newer than the last ones seen are fetched. This has '
+                        'no effect unless revocation event caching is '
+                        'enabled.'),
     ],
     'cache': [
         cfg.StrOpt('config_prefix', default='cache.keystone',
@@ -423,6 +462,12 @@ FILE_OPTIONS = {
                             'CN=www.example.com'),
                    help='Certificate subject (auto generated certificate) for '
                         'token signing.'),
+        cfg.BoolOpt('in_process', default=True,
+                    help='Sign PKI and PKIZ tokens in process, loading the '
+                         'certfile and keyfile once, instead of running '
+                         'openssl for every token. Requires the '
+                         'cryptography library and an RSA keyfile, otherwise '
+                         'openssl is used.'),
     ],
     'assignment': [
         # assignment has no default for backward compatibility reasons.
@@ -439,6 +484,16 @@ FILE_OPTIONS = {
         cfg.IntOpt('list_limit',
                    help='Maximum number of entities that will be returned '
                         'in an assignment collection.'),
+        cfg.IntOpt('effective_roles_cache_size', default=0,
+                   help='Number of user and project or domain pairs whose '
+                        'effective roles are remembered by each process, '
+                        'to skip the assignment backend when issuing '
+                        'scoped tokens. Changes made through other '
+                        'processes are only seen once the entries expire. '
+                        'Set to 0 to disable.'),
+        cfg.IntOpt('effective_roles_cache_time', default=60,
+                   help='Time to remember the effective roles of a user '
+                        '(in seconds).'),
     ],
     'credential': [
         cfg.StrOpt('driver',
@@ -455,6 +510,16 @@ FILE_OPTIONS = {
         cfg.IntOpt('access_token_duration', default=86400,
                    help='Duration (in seconds) for the OAuth Access Token.'),
     ],
+    'oauth2': [
+        cfg.BoolOpt('caching', default=True,
+                    help='Toggle for OAuth2 access token and consumer '
+                         'caching. This has no effect unless global caching '
+                         'is enabled.'),
+        cfg.IntOpt('cache_time',
+                   help='TTL (in seconds) to cache OAuth2 access tokens and '
+                        'consumers. This has no effect unless global and '
+                        'OAuth2 caching are enabled.'),
+    ],
     'federation': [
         cfg.StrOpt('driver',
                    default='keystone.contrib.federation.'
@@ -471,6 +536,18 @@ FILE_OPTIONS = {
         cfg.IntOpt('list_limit',
                    help='Maximum number of entities that will be returned '
                         'in a policy collection.'),
+        cfg.IntOpt('reload_interval', default=10,
+                   help='Seconds between checks for changes of the policy '
+                        'file, made in the background. Set to 0 to check '
+                        'for changes on every policy decision instead.'),
+        cfg.IntOpt('decision_cache_size', default=0,
+                   help='Number of policy decisions remembered by each '
+                        'process, keyed by the action and the attributes '
+                        'of the credentials and the target its rule reads. '
+                        'They are forgotten whenever the policy rules are '
+                        'reloaded. Only worth enabling for policies with '
+                        'long rules, simple ones are evaluated as fast as '
+                        'decisions are looked up. Set to 0 to disable.'),
     ],
     'endpoint_filter': [
         cfg.StrOpt('driver',
@@ -481,6 +558,29 @@ FILE_OPTIONS = {
                     help='Toggle to return all active endpoints if no filter '
                          'exists.'),
     ],
+    'roles': [
+        cfg.BoolOpt('permission_index', default=False,
+                    help='Toggle for the in-process index of role permissions '
+                         'and application roles used to compute the '
+                         'allowed roles and applications of an actor. The '
+                         'index is local to each process: when several '
+                         'processes serve the API, a permission removed '
+                         'through one of them is still granted by the '
+                         'others for up to permission_index_ttl seconds.'),
+        cfg.IntOpt('permission_index_ttl', default=300,
+                   help='Maximum age (in seconds) of the permission index '
+                        'before it is rebuilt. This bounds how long changes '
+                        'made through another process go unnoticed. This '
+                        'has no effect unless permission_index is '
+                        'enabled.'),
+        cfg.BoolOpt('caching', default=True,
+                    help='Toggle for OAuth2 token validation caching. This '
+                         'has no effect unless global caching is enabled.'),
+        cfg.IntOpt('cache_time',
+                   help='TTL (in seconds) to cache the validation data of an '
+                        'OAuth2 access token. This has no effect unless '
+                        'global caching is enabled.'),
+    ],
     'endpoint_policy': [
         cfg.StrOpt('driver',
                    default='keystone.contrib.endpoint_policy.backends'
@@ -817,6 +917,12 @@ FILE_OPTIONS = {
                         'a memcache client connection. This is used by the '
                         'key value store system (e.g. token pooled memcached '
                         'persistence backend).'),
+        cfg.IntOpt('hash_ring_points',
+                   default=100,
+                   help='Number of points of every memcached server in the '
+                        'consistent hash ring of the sharded memcached '
+                        'backend (e.g. token sharded memcached persistence '
+                        'backend).'),
     ],
     'catalog': [
         cfg.StrOpt('template_file',
@@ -886,6 +992,12 @@ FILE_OPTIONS = {
                    default=_KEYFILE,
                    help='Path of the keyfile for SAML signing. Note, the path '
                         'cannot contain a comma.'),
+        cfg.BoolOpt('in_process', default=True,
+                    help='Sign SAML assertions in process, loading the '
+                         'certfile and keyfile once, instead of running '
+                         'xmlsec1 for every assertion. Requires the '
+                         'cryptography and lxml libraries and an RSA '
+                         'keyfile, otherwise xmlsec1 is used.'),
         cfg.StrOpt('idp_entity_id',
                    help='Entity ID value for unique Identity Provider '
                         'identification. Usually FQDN is set with a suffix. '
@@ -926,6 +1038,18 @@ FILE_OPTIONS = {
                         'This file should be generated with the '
                         'keystone-manage saml_idp_metadata command.'),
     ],
+    'scim': [
+        cfg.IntOpt('bulk_max_operations', default=1000,
+                   help='Maximum number of operations accepted in a single '
+                        'SCIM Bulk request.'),
+        cfg.IntOpt('bulk_max_payload_size', default=1048576,
+                   help='Maximum size in bytes of a SCIM Bulk request. '
+                        'Requests are also limited by '
+                        'max_request_body_size.'),
+        cfg.IntOpt('bulk_chunk_size', default=100,
+                   help='Number of consecutive user creations of a SCIM '
+                        'Bulk request stored in a single transaction.'),
+    ],
     'two_factor_auth': [
         cfg.StrOpt('driver',
                    default='keystone.contrib.two_factor_auth.backends.sql.TwoFactorAuth',
@@ -12,9 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import base64
+import binascii
 import functools
+import logging
 import uuid
+
 import six
+from six.moves import urllib
 
 from keystone.common import authorization
 from keystone.common import dependency
@@ -50,10 +55,16 @@ def v2_deprecated(f):
     return f
 
 
+# NOTE(garcianavalon) where the auth context built from the incoming token
+# is kept for the other policy checks of the request
+_RBAC_AUTH_CONTEXT = 'rbac_auth_context'
+
+
 def _build_policy_check_credentials(self, action, context, kwargs):
-    LOG.debug('RBAC: Authorizing %(action)s(%(kwargs)s)', {
-        'action': action,
-        'kwargs': ', '.join(['%s=%s' % (k, kwargs[k]) for k in kwargs])})
+    if LOG.isEnabledFor(logging.DEBUG):
+        LOG.debug('RBAC: Authorizing %(action)s(%(kwargs)s)', {
+            'action': action,
+            'kwargs': ', '.join(['%s=%s' % (k, kwargs[k]) for k in kwargs])})
 
     # see if auth context has already been created. If so use it.
     if ('environment' in context and
@@ -61,6 +72,12 @@ def _build_policy_check_credentials(self, action, context, kwargs):
         LOG.debug('RBAC: using auth context from the request environment')
         return context['environment'].get(authorization.AUTH_CONTEXT_ENV)
 
+    # or if it was built from the same token by an earlier check
+    token_id, auth_context = context.get(_RBAC_AUTH_CONTEXT, (None, None))
+    if token_id is not None and token_id == context.get('token_id'):
+        LOG.debug('RBAC: using auth context built for an earlier check')
+        return auth_context
+
     # There is no current auth context, build it from the incoming token.
     # TODO(morganfainberg): Collapse this logic with AuthContextMiddleware
     # in a sane manner as this just mirrors the logic in AuthContextMiddleware
@@ -79,6 +96,7 @@ def _build_policy_check_credentials(self, action, context, kwargs):
         raise exception.Unauthorized()
 
     auth_context = authorization.token_to_auth_context(token_ref)
+    context[_RBAC_AUTH_CONTEXT] = (context['token_id'], auth_context)
 
     return auth_context
 
@@ -183,9 +201,10 @@ def filterprotected(*filters):
                         if item in context['query_string']:
                             target[item] = context['query_string'][item]
 
-                    LOG.debug('RBAC: Adding query filter params (%s)', (
-                        ', '.join(['%s=%s' % (item, target[item])
-                                  for item in target])))
+                    if LOG.isEnabledFor(logging.DEBUG):
+                        LOG.debug('RBAC: Adding query filter params (%s)', (
+                            ', '.join(['%s=%s' % (item, target[item])
+                                      for item in target])))
 
                 # Now any formal url parameters
                 for key in kwargs:
@@ -362,9 +381,12 @@ class V3Controller(wsgi.Application):
 
         Returns the wrapped collection, which includes:
         - Executing any filtering not already carried out
+        - Starting after the requested marker, if not already done
         - Truncate to a set limit if necessary
         - Adds 'self' links in every member
-        - Adds 'next', 'self' and 'prev' links for the whole collection.
+        - Adds 'next', 'self' and 'prev' links for the whole collection. The
+          'next' link, if the collection was truncated, carries the marker
+          of the following page.
 
         :param context: the current context, containing the original url path
                         and query string
@@ -380,15 +402,22 @@ class V3Controller(wsgi.Application):
 
         if hints is not None:
             refs = cls.filter_by_attributes(refs, hints)
+            refs = cls.paginate(refs, hints)
 
         list_limited, refs = cls.limit(refs, hints)
 
         for ref in refs:
             cls.wrap_member(context, ref)
 
+        next_url = None
+        sorted_by_id = hints is None or hints.sort is None or (
+            hints.sort['key'] == 'id')
+        if list_limited and sorted_by_id and refs and 'id' in refs[-1]:
+            next_url = cls.next_url(context, refs[-1]['id'])
+
         container = {cls.collection_name: refs}
         container['links'] = {
-            'next': None,
+            'next': next_url,
             'self': cls.full_url(context, path=context['path']),
             'previous': None}
 
@@ -397,6 +426,76 @@ class V3Controller(wsgi.Application):
 
         return container
 
+    @classmethod
+    def paginate(cls, refs, hints):
+        """Orders a list of entities and starts it after the marker.
+
+        The driver layer orders the entities when it satisfies the sort,
+        truncates the collection or satisfies the marker, otherwise we do it
+        here, by the sort key requested, if any, and then by id, so that any
+        truncated page can be resumed from the id of its last entity.
+
+        :param refs: the list of members of the collection
+        :param hints: hints, containing the limit, the marker and the sort,
+                      if any, not satisfied by the driver
+
+        :returns: the list of entities of this page, before truncation
+
+        """
+        if hints.limit is None and hints.marker is None and hints.sort is None:
+            return refs
+        if hints.sort is not None and hints.sort['satisfied']:
+            return refs
+        if (hints.sort is None and hints.limit is not None and
+                hints.limit.get('truncated', False)):
+            return refs
+        if not all('id' in ref for ref in refs):
+            return refs
+
+        sort_key, reverse = 'id', False
+        if hints.sort is not None:
+            sort_key = hints.sort['key']
+            reverse = hints.sort['dir'] == 'desc'
+
+        def _sort_value(ref):
+            # NOTE(garcianavalon): entities without the attribute go first,
+            # the same as NULLs in an ascending ORDER BY on most databases
+            value = ref.get(sort_key)
+            return (value is not None, value, ref['id'])
+
+        refs = sorted(refs, key=_sort_value, reverse=reverse)
+        if hints.marker is not None:
+            if reverse:
+                refs = [ref for ref in refs if ref['id'] < hints.marker]
+            else:
+                refs = [ref for ref in refs if ref['id'] > hints.marker]
+        return refs
+
+    @classmethod
+    def next_url(cls, context, last_id):
+        """Build the url of the page following the entity ``last_id``."""
+        query = dict(context['query_string'] or {})
+        query['marker'] = cls.encode_marker(last_id)
+        return '%s?%s' % (cls.base_url(context, path=context['path']),
+                          urllib.parse.urlencode(sorted(query.items())))
+
+    @staticmethod
+    def encode_marker(entity_id):
+        """Encode an entity id into an opaque pagination marker."""
+        marker = base64.urlsafe_b64encode(entity_id.encode('utf-8'))
+        return marker.decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_marker(marker):
+        """Decode a pagination marker back into the entity id."""
+        try:
+            padded = marker + '=' * (-len(marker) % 4)
+            return base64.urlsafe_b64decode(
+                padded.encode('ascii')).decode('utf-8')
+        except (binascii.Error, TypeError, ValueError):
+            raise exception.ValidationError(attribute='a valid marker',
+                                            target='the query')
+
     @classmethod
     def limit(cls, refs, hints):
         """Limits a list of entities.
@@ -515,6 +614,10 @@ class V3Controller(wsgi.Application):
             return hints
 
         for key in query_dict:
+            if key in ('limit', 'marker', 'sort_key', 'sort_dir'):
+                # These are pagination directives, not filters
+                continue
+
             # Check if this is an exact filter
             if supported_filters is None or key in supported_filters:
                 hints.add_filter(key, query_dict[key])
@@ -550,9 +653,35 @@ class V3Controller(wsgi.Application):
                                  comparator=comparator,
                                  case_sensitive=case_sensitive)
 
-        # NOTE(henry-nash): If we were to support pagination, we would pull any
-        # pagination directives out of the query_dict here, and add them into
-        # the hints list.
+        if 'limit' in query_dict:
+            try:
+                limit = int(query_dict['limit'])
+            except (TypeError, ValueError):
+                limit = 0
+            if limit <= 0:
+                raise exception.ValidationError(attribute='a positive limit',
+                                                target='the query')
+            hints.set_limit(limit)
+        if 'sort_key' in query_dict or 'sort_dir' in query_dict:
+            sort_key = query_dict.get('sort_key', 'id')
+            sort_dir = query_dict.get('sort_dir', 'asc')
+            if sort_key != 'id' and (supported_filters is None or
+                                     sort_key not in supported_filters):
+                raise exception.ValidationError(attribute='a valid sort_key',
+                                                target='the query')
+            if sort_dir not in ('asc', 'desc'):
+                raise exception.ValidationError(
+                    attribute='asc or desc as sort_dir', target='the query')
+            if sort_key != 'id' and 'marker' in query_dict:
+                # NOTE(garcianavalon): the marker is only the id of the last
+                # entity, which is not enough to resume any other order
+                raise exception.ValidationError(
+                    attribute='sort_key=id along with a marker',
+                    target='the query')
+            hints.set_sort(sort_key, sort_dir)
+        if 'marker' in query_dict:
+            hints.set_marker(cls.decode_marker(query_dict['marker']))
+
         return hints
 
     def _require_matching_id(self, value, ref):
@@ -28,14 +28,28 @@ class Hints(object):
 
     A Hint object contains filters, which is a list of dicts that can be
     accessed publicly. Also it contains a dict called limit, which will
-    indicate the amount of data we want to limit our listing to.
+    indicate the amount of data we want to limit our listing to, and a
+    marker, the id of the last entity of the previous page when paginating.
+    Entities are then listed in id order, starting after the marker. A driver
+    that satisfies the marker must clear it, the same way as filters.
+
+    A sort may also be requested, as a dict with the ``key`` attribute to
+    order the entities by and the ``dir`` of the ordering, ``asc`` or
+    ``desc``, ties being broken by id. A driver that returns the entities in
+    that order marks the sort as ``satisfied``.
+
+    Alternatively, a page of the entities in id order may be requested by
+    ``offset`` and ``count``, for APIs such as SCIM that address the pages
+    by position and report the ``total`` number of entities, which is only
+    computed if asked for with ``with_total``. A driver that returns just
+    that page marks it as ``satisfied``, filling in the total if asked.
 
     Each filter term consists of:
 
     * ``name``: the name of the attribute being matched
     * ``value``: the value against which it is being matched
     * ``comparator``: the operation, which can be one of ``equals``,
-                      ``startswith`` or ``endswith``
+                      ``contains``, ``startswith`` or ``endswith``
     * ``case_sensitive``: whether any comparison should take account of
                           case
     * ``type``: will always be 'filter'
@@ -43,6 +57,9 @@ class Hints(object):
     """
     def __init__(self):
         self.limit = None
+        self.marker = None
+        self.sort = None
+        self.page = None
         self.filters = list()
 
     def add_filter(self, name, value, comparator='equals',
@@ -63,3 +80,18 @@ class Hints(object):
     def set_limit(self, limit, truncated=False):
         """Set a limit to indicate the list should be truncated."""
         self.limit = {'limit': limit, 'type': 'limit', 'truncated': truncated}
+
+    def set_marker(self, marker):
+        """Set the id of the entity after which the list should start."""
+        self.marker = marker
+
+    def set_sort(self, key, direction='asc', satisfied=False):
+        """Set the attribute and direction the list should be sorted by."""
+        self.sort = {'key': key, 'dir': direction, 'type': 'sort',
+                     'satisfied': satisfied}
+
+    def set_page(self, offset=0, count=None, with_total=False):
+        """Set the position and size of the page of the list to return."""
+        self.page = {'offset': offset, 'count': count,
+                     'with_total': with_total, 'total': None,
+                     'type': 'page', 'satisfied': False}
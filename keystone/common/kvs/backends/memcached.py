@@ -39,7 +39,8 @@ VALID_DOGPILE_BACKENDS = dict(
     pylibmc=memcached.PylibmcBackend,
     bmemcached=memcached.BMemcachedBackend,
     memcached=memcached.MemcachedBackend,
-    pooled_memcached=memcache_pool.PooledMemcachedBackend)
+    pooled_memcached=memcache_pool.PooledMemcachedBackend,
+    sharded_memcached=memcache_pool.ShardedMemcachedBackend)
 
 
 class MemcachedLock(object):
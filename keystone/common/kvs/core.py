@@ -286,6 +286,12 @@ class KeyValueStore(object):
             raise exception.NotFound(target=not_found)
         return values
 
+    def get_multi_or_default(self, keys, default=None):
+        """Get multiple values in a single call, using default if missing."""
+        self._assert_configured()
+        values = self._region.get_multi(keys)
+        return [default if value is NO_VALUE else value for value in values]
+
     def set(self, key, value, lock=None):
         """Set a single value in the KVS backend."""
         self._assert_configured()
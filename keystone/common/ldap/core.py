@@ -1130,6 +1130,10 @@ class BaseLdap(object):
     attribute_options_names = {}
     immutable_attrs = []
     attribute_ignore = []
+    # NOTE(garcianavalon) attributes list filters cannot match in LDAP: the
+    # domain is not stored by the LDAP backends, only set on read, and
+    # enabled may be emulated, masked or inverted
+    unfilterable_attrs = ['domain_id', 'enabled']
     tree_dn = None
 
     def __init__(self, conf):
@@ -1511,6 +1515,56 @@ class BaseLdap(object):
         return [self._ldap_res_to_model(x)
                 for x in self._ldap_get_all(ldap_filter)]
 
+    def filter_query(self, hints, query=None):
+        """Translate the filters of the hints into an LDAP filter.
+
+        Exact filters, and inexact ones as substring assertions, are added
+        for the attributes mapped to LDAP and stored there, see
+        ``unfilterable_attrs``, so that the server only returns
+        the matching entries. LDAP matching rules usually ignore case, so
+        only the case insensitive inexact filters are satisfied here; the
+        rest only narrow the search and are left in the hints for the
+        controller to check.
+
+        :param hints: contains the list of filters yet to be satisfied.
+                      Any filters satisfied here will be removed so that
+                      the caller will know if any filters remain.
+        :param query: an LDAP filter to combine with the one built here
+
+        :returns: the LDAP filter, or ``query`` if there was nothing to add
+
+        """
+        if hints is None:
+            return query
+
+        substring_patterns = {'contains': u'*%s*',
+                              'startswith': u'%s*',
+                              'endswith': u'*%s'}
+        terms = []
+        for filter_ in list(hints.filters):
+            name = filter_['name']
+            if name == 'id':
+                attr = self.id_attr
+            elif (name in self.attribute_mapping and
+                    name not in self.attribute_ignore and
+                    name not in self.unfilterable_attrs):
+                attr = self.attribute_mapping[name]
+            else:
+                continue
+            value = ldap.filter.escape_filter_chars(
+                six.text_type(filter_['value']))
+            if filter_['comparator'] == 'equals':
+                terms.append(u'(%s=%s)' % (attr, value))
+            elif filter_['comparator'] in substring_patterns:
+                pattern = substring_patterns[filter_['comparator']]
+                terms.append(u'(%s=%s)' % (attr, pattern % value))
+                if not filter_['case_sensitive']:
+                    hints.filters.remove(filter_)
+
+        if not terms:
+            return query
+        return u'(&%s%s)' % (query or self.ldap_filter or '', ''.join(terms))
+
     def update(self, object_id, values, old_obj=None):
         if old_obj is None:
             old_obj = self.get(object_id)
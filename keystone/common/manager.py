@@ -32,7 +32,8 @@ def response_truncated(f):
 
     A _get_list_limit() method is required to be present in the object class
     hierarchy, which returns the limit for this backend to which we will
-    truncate.
+    truncate. A smaller limit already in the hints, such as the page size
+    requested by the client, is kept.
 
     If a hints list is not provided in the arguments of the wrapped call then
     any limits set in the config file are ignored.  This allows internal use
@@ -46,9 +47,11 @@ def response_truncated(f):
         if kwargs.get('hints') is None:
             return f(self, *args, **kwargs)
 
+        hints = kwargs['hints']
         list_limit = self.driver._get_list_limit()
-        if list_limit:
-            kwargs['hints'].set_limit(list_limit)
+        if list_limit and (hints.limit is None or
+                           hints.limit['limit'] > list_limit):
+            hints.set_limit(list_limit)
         return f(self, *args, **kwargs)
     return wrapper
 
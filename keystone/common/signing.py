@@ -0,0 +1,273 @@
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""In-process CMS signing of PKI and PKIZ tokens.
+
+keystoneclient signs every token by running ``openssl cms -sign
+-nosmimecap -nodetach -nocerts -noattr -md sha256`` in a subprocess, so
+each issued token pays for a fork and an exec. :class:`CMSSigner` loads the
+signing certificate and key once and builds the same SignedData in process:
+no signed attributes, no certificates, a SHA-256 digest and an RSA PKCS#1
+v1.5 signature. That signature is deterministic, so the tokens are byte for
+byte the ones openssl produces.
+
+It needs the ``cryptography`` library and an RSA signing key. Without them,
+or with ``[signing] in_process`` disabled, tokens are signed by
+keystoneclient as before.
+
+The certificate and key loading helpers, and the cache of signers built from
+them, are shared with the in-process SAML assertion signer of the federation
+extension.
+
+"""
+
+import base64
+import os
+import zlib
+
+from keystoneclient.common import cms
+import six
+
+try:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives import serialization
+except ImportError:
+    rsa = None
+
+from keystone.common import pemutils
+from keystone.common import utils
+from keystone import config
+from keystone.i18n import _, _LW
+from keystone.openstack.common import log
+
+
+CONF = config.CONF
+LOG = log.getLogger(__name__)
+
+_INTEGER = 0x02
+_OCTET_STRING = 0x04
+_NULL = 0x05
+_OID = 0x06
+_SEQUENCE = 0x30
+_SET = 0x31
+_EXPLICIT_0 = 0xa0
+
+signing_pool = utils.CryptWorkerPool('Token signing')
+
+
+def _der(tag, content):
+    length = len(content)
+    if length < 0x80:
+        header = six.int2byte(length)
+    else:
+        octets = bytearray()
+        while length:
+            octets.insert(0, length & 0xff)
+            length >>= 8
+        header = six.int2byte(0x80 | len(octets)) + bytes(octets)
+    return six.int2byte(tag) + header + content
+
+
+def _oid(dotted):
+    arcs = [int(arc) for arc in dotted.split('.')]
+    body = bytearray([40 * arcs[0] + arcs[1]])
+    for arc in arcs[2:]:
+        octets = bytearray([arc & 0x7f])
+        arc >>= 7
+        while arc:
+            octets.insert(0, 0x80 | (arc & 0x7f))
+            arc >>= 7
+        body.extend(octets)
+    return _der(_OID, bytes(body))
+
+
+def _sequence(*elements):
+    return _der(_SEQUENCE, b''.join(elements))
+
+
+_VERSION_1 = _der(_INTEGER, b'\x01')
+_ID_DATA = _oid('1.2.840.113549.1.7.1')
+_ID_SIGNED_DATA = _oid('1.2.840.113549.1.7.2')
+# NOTE(garcianavalon) openssl leaves the parameters of the SHA-2 digest
+# algorithms out, but sets them to NULL for rsaEncryption
+_SHA256 = _sequence(_oid('2.16.840.1.101.3.4.2.1'))
+_RSA_ENCRYPTION = _sequence(_oid('1.2.840.113549.1.1.1'), _der(_NULL, b''))
+
+
+def _read(der, offset):
+    """Return the tag, content offset and end offset of a DER element."""
+    tag = der[offset]
+    length = der[offset + 1]
+    offset += 2
+    if length & 0x80:
+        count = length & 0x7f
+        length = 0
+        for octet in der[offset:offset + count]:
+            length = length << 8 | octet
+        offset += count
+    return tag, offset, offset + length
+
+
+def _issuer_and_serial_number(cert_der):
+    """Build the IssuerAndSerialNumber identifying the signer's cert."""
+    der = bytearray(cert_der)
+    _tag, tbs, _end = _read(der, 0)
+    _tag, start, _end = _read(der, tbs)
+    tag, _content, end = _read(der, start)
+    if tag == _EXPLICIT_0:
+        # skip the version
+        start = end
+        _tag, _content, end = _read(der, start)
+    serial_number = der[start:end]
+    _tag, _content, issuer = _read(der, end)
+    _tag, _content, end = _read(der, issuer)
+    return _der(_SEQUENCE, bytes(der[issuer:end] + serial_number))
+
+
+def _canonicalize(data):
+    # NOTE(garcianavalon) without -binary openssl signs the MIME canonical
+    # form of the text, with CRLF line endings
+    return b'\r\n'.join(line.rstrip(b'\r') for line in data.split(b'\n'))
+
+
+def load_certificate(certfile):
+    """Return the DER encoded certificate in a PEM file.
+
+    :raises ValueError: if there is no certificate in the file.
+
+    """
+    with open(certfile) as f:
+        cert_der = pemutils.get_pem_data(f.read(), 'cert')
+    if cert_der is None:
+        raise ValueError(_('No certificate found in %s') % certfile)
+    return cert_der
+
+
+def load_rsa_key(keyfile):
+    """Return the RSA private key in an unencrypted PEM file.
+
+    :raises ValueError: if the file has no RSA key.
+
+    """
+    with open(keyfile, 'rb') as f:
+        key = serialization.load_pem_private_key(
+            f.read(), password=None, backend=default_backend())
+    if not isinstance(key, rsa.RSAPrivateKey):
+        raise ValueError(_('%s is not an RSA key') % keyfile)
+    return key
+
+
+class CMSSigner(object):
+    """Sign data with a certificate and RSA key loaded once.
+
+    :raises ValueError: if the certificate or the key cannot be used.
+
+    """
+
+    def __init__(self, certfile, keyfile):
+        self._signer_id = _issuer_and_serial_number(
+            load_certificate(certfile))
+        self._key = load_rsa_key(keyfile)
+
+    def sign(self, data):
+        """Return the DER encoded CMS SignedData enveloping data."""
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        content = _canonicalize(bytes(data))
+        signature = self._key.sign(content, padding.PKCS1v15(),
+                                   hashes.SHA256())
+        signer_info = _sequence(_VERSION_1, self._signer_id, _SHA256,
+                                _RSA_ENCRYPTION,
+                                _der(_OCTET_STRING, signature))
+        content_info = _sequence(
+            _ID_DATA, _der(_EXPLICIT_0, _der(_OCTET_STRING, content)))
+        signed_data = _sequence(_VERSION_1, _der(_SET, _SHA256),
+                                content_info, _der(_SET, signer_info))
+        return _sequence(_ID_SIGNED_DATA, _der(_EXPLICIT_0, signed_data))
+
+    def sign_pem(self, data):
+        """Return the signed data as written by ``openssl cms -sign``."""
+        return pemutils.binary_to_pem(self.sign(data), 'cms')
+
+
+_signers = {}
+
+
+def load_signer(factory, certfile, keyfile):
+    """Return ``factory(certfile, keyfile)``, built once per version of them.
+
+    The signer is built again when the files change on disk.
+
+    :returns: the signer, or None if the files cannot be used to sign in
+              process.
+
+    """
+    try:
+        stamp = (os.path.getmtime(certfile), os.path.getmtime(keyfile))
+    except OSError:
+        # NOTE(garcianavalon) let the external signer report the missing
+        # files
+        return None
+
+    cache_key = (factory, certfile, keyfile)
+    cached = _signers.get(cache_key)
+    if cached is None or cached[0] != stamp:
+        try:
+            signer = factory(certfile, keyfile)
+        except (IOError, ValueError) as e:
+            LOG.warning(_LW('Unable to sign in process with %(certfile)s and '
+                            '%(keyfile)s, falling back to the external '
+                            'signer: %(reason)s'),
+                        {'certfile': certfile, 'keyfile': keyfile,
+                         'reason': e})
+            signer = None
+        cached = _signers[cache_key] = (stamp, signer)
+    return cached[1]
+
+
+def get_signer(certfile, keyfile):
+    """Return the in-process CMS signer for the files, if they can be used.
+
+    :returns: a :class:`CMSSigner`, or None when signing has to go through
+              openssl.
+
+    """
+    if rsa is None or not CONF.signing.in_process:
+        return None
+    return load_signer(CMSSigner, certfile, keyfile)
+
+
+def cms_sign_token(text, signing_cert_file_name, signing_key_file_name):
+    """Sign a PKI token, as keystoneclient's ``cms.cms_sign_token``."""
+    signer = get_signer(signing_cert_file_name, signing_key_file_name)
+    if signer is None:
+        return cms.cms_sign_token(text, signing_cert_file_name,
+                                  signing_key_file_name)
+    return cms.cms_to_token(signing_pool.execute(signer.sign_pem, text))
+
+
+def pkiz_sign(text, signing_cert_file_name, signing_key_file_name,
+              compression_level=6):
+    """Sign a PKIZ token, as keystoneclient's ``cms.pkiz_sign``."""
+    signer = get_signer(signing_cert_file_name, signing_key_file_name)
+    if signer is None:
+        return cms.pkiz_sign(text, signing_cert_file_name,
+                             signing_key_file_name, compression_level)
+    signed = signing_pool.execute(signer.sign_pem, text)
+    compressed = zlib.compress(signed.encode('utf-8'), compression_level)
+    return cms.PKIZ_PREFIX + base64.urlsafe_b64encode(
+        compressed).decode('utf-8')
@@ -239,6 +239,20 @@ def truncated(f):
     return wrapper
 
 
+LIKE_ESCAPE = '\\'
+
+
+def _escape_like(value):
+    """Escape the wildcards of a value to match it literally with LIKE."""
+    return (value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+            .replace('%', LIKE_ESCAPE + '%')
+            .replace('_', LIKE_ESCAPE + '_'))
+
+
+def _dialect_name(query):
+    return query.session.get_bind().dialect.name
+
+
 def _filter(model, query, hints):
     """Applies filtering to a query.
 
@@ -266,29 +280,33 @@ def _filter(model, query, hints):
 
         """
         column_attr = getattr(model, filter_['name'])
-
-        # TODO(henry-nash): Sqlalchemy 0.7 defaults to case insensitivity
-        # so once we find a way of changing that (maybe on a call-by-call
-        # basis), we can add support for the case sensitive versions of
-        # the filters below.  For now, these case sensitive versions will
-        # be handled at the controller level.
-
-        if filter_['case_sensitive']:
-            return query
+        value = _escape_like(filter_['value'])
 
         if filter_['comparator'] == 'contains':
-            query_term = column_attr.ilike('%%%s%%' % filter_['value'])
+            pattern = '%%%s%%' % value
         elif filter_['comparator'] == 'startswith':
-            query_term = column_attr.ilike('%s%%' % filter_['value'])
+            pattern = '%s%%' % value
         elif filter_['comparator'] == 'endswith':
-            query_term = column_attr.ilike('%%%s' % filter_['value'])
+            pattern = '%%%s' % value
         else:
             # It's a filter we don't understand, so let the caller
             # work out if they need to do something with it.
             return query
 
-        hints.filters.remove(filter_)
-        return query.filter(query_term)
+        if not filter_['case_sensitive']:
+            hints.filters.remove(filter_)
+            return query.filter(
+                column_attr.ilike(pattern, escape=LIKE_ESCAPE))
+
+        # NOTE(garcianavalon): LIKE only takes account of case on
+        # PostgreSQL; MySQL and SQLite compare with the case insensitive
+        # collation of the column. Elsewhere it still narrows the rows
+        # fetched down to a superset of the matches, and the filter is left
+        # for the controller to discard the ones differing in case.
+        query = query.filter(column_attr.like(pattern, escape=LIKE_ESCAPE))
+        if _dialect_name(query) == 'postgresql':
+            hints.filters.remove(filter_)
+        return query
 
     def exact_filter(model, filter_, cumulative_filter_dict, hints):
         """Applies an exact filter to a query.
@@ -316,7 +334,7 @@ def _filter(model, query, hints):
 
     filter_dict = {}
 
-    for filter_ in hints.filters:
+    for filter_ in list(hints.filters):
         if filter_['name'] not in model.attributes:
             continue
         if filter_['comparator'] == 'equals':
@@ -331,6 +349,53 @@ def _filter(model, query, hints):
     return query
 
 
+def _paginate(model, query, hints):
+    """Orders a query and starts it after the marker, if any.
+
+    Resuming each page from the id of the last entity of the previous one,
+    instead of skipping an offset, keeps every page as cheap as the first
+    and does not skip nor repeat entities if the collection changes between
+    requests. The entities are ordered by the sort key requested, if any, and
+    then by id.
+
+    :param model: the table model in question
+    :param query: query to paginate
+    :param hints: contains the limit, marker and sort details. The marker is
+                  cleared and the sort marked satisfied if done here.
+
+    :returns: updated query
+
+    """
+    if ((hints.limit is None and hints.marker is None and
+            hints.sort is None and hints.page is None) or
+            'id' not in model.attributes):
+        return query
+
+    sort_key, sort_dir = 'id', 'asc'
+    if hints.sort is not None:
+        if hints.sort['key'] not in model.attributes:
+            return query
+        sort_key, sort_dir = hints.sort['key'], hints.sort['dir']
+
+    column_attr = getattr(model, sort_key)
+    if sort_dir == 'desc':
+        query = query.order_by(column_attr.desc(), model.id.desc())
+    else:
+        query = query.order_by(column_attr, model.id)
+    if hints.sort is not None:
+        hints.set_sort(sort_key, sort_dir, satisfied=True)
+
+    # NOTE(garcianavalon): Markers are only accepted along with the id
+    # order, see V3Controller.build_driver_hints.
+    if hints.marker is not None and sort_key == 'id':
+        if sort_dir == 'desc':
+            query = query.filter(model.id < hints.marker)
+        else:
+            query = query.filter(model.id > hints.marker)
+        hints.set_marker(None)
+    return query
+
+
 def _limit(query, hints):
     """Applies a limit to a query.
 
@@ -340,17 +405,41 @@ def _limit(query, hints):
     :returns updated query
 
     """
-    # NOTE(henry-nash): If we were to implement pagination, then we
-    # we would expand this method to support pagination and limiting.
-
     # If we satisfied all the filters, set an upper limit if supplied
     if hints.limit:
         query = query.limit(hints.limit['limit'])
     return query
 
 
+def _page(query, hints):
+    """Returns the page of a query at the requested offset.
+
+    The total number of entities is counted, with a separate query that
+    neither orders nor fetches them, only if the caller asked for it.
+
+    :param query: query to apply the page to, already filtered and ordered
+    :param hints: contains the page details, which are marked satisfied
+                  and given the total if asked for.
+
+    :returns: updated query
+
+    """
+    page = hints.page
+    if page['with_total']:
+        # NOTE(garcianavalon) Query.count() counts the rows of the query as
+        # a subquery, a bare count(*) entity has no FROM clause when the
+        # query has no WHERE clause and always counts 1
+        page['total'] = query.order_by(None).count()
+    if page['offset']:
+        query = query.offset(page['offset'])
+    if page['count'] is not None:
+        query = query.limit(page['count'])
+    page['satisfied'] = True
+    return query
+
+
 def filter_limit_query(model, query, hints):
-    """Applies filtering and limit to a query.
+    """Applies filtering, pagination and limit to a query.
 
     :param model: table model
     :param query: query to apply filters to
@@ -369,6 +458,11 @@ def filter_limit_query(model, query, hints):
     # First try and satisfy any filters
     query = _filter(model, query, hints)
 
+    # NOTE(garcianavalon): Ordering and starting after the marker hold
+    # regardless of the filters left to the controller, as long as it keeps
+    # the same order.
+    query = _paginate(model, query, hints)
+
     # NOTE(henry-nash): Any unsatisfied filters will have been left in
     # the hints list for the controller to handle. We can only try and
     # limit here if all the filters are already satisfied since, if not,
@@ -376,10 +470,12 @@ def filter_limit_query(model, query, hints):
     # unsatisfied filters, we have to leave any limiting to the controller
     # as well.
 
-    if not hints.filters:
-        return _limit(query, hints)
-    else:
+    if hints.filters or (hints.sort is not None and
+                         not hints.sort['satisfied']):
         return query
+    if hints.page is not None:
+        return _page(query, hints)
+    return _limit(query, hints)
 
 
 def handle_conflicts(conflict_type='object'):
@@ -0,0 +1,44 @@
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Index the names the user, project and group lists are filtered by."""
+
+import sqlalchemy as sql
+
+INDEXES = [('user', 'name'),
+           ('user', 'username'),
+           ('project', 'name'),
+           ('group', 'name')]
+
+
+def _indexes(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+
+    tables = {}
+    for table_name, column_name in INDEXES:
+        if table_name not in tables:
+            tables[table_name] = sql.Table(table_name, meta, autoload=True)
+        column = getattr(tables[table_name].c, column_name)
+        yield sql.Index('ix_%s_%s' % (table_name, column_name), column)
+
+
+def upgrade(migrate_engine):
+    for idx in _indexes(migrate_engine):
+        idx.create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    for idx in _indexes(migrate_engine):
+        idx.drop(migrate_engine)
@@ -22,6 +22,7 @@ import grp
 import hashlib
 import os
 import pwd
+import time
 
 from oslo.serialization import jsonutils
 from oslo.utils import strutils
@@ -30,6 +31,7 @@ import six
 from six import moves
 
 from keystone.common import config
+from keystone.common import environment
 from keystone import exception
 from keystone.i18n import _
 from keystone.openstack.common import log
@@ -124,11 +126,103 @@ def hash_user_password(user):
     return dict(user, password=hash_password(password))
 
 
+def hash_user_passwords(users):
+    """Hash the passwords of several user dicts, see hash_user_password.
+
+    Under eventlet the passwords are hashed concurrently by the
+    ``crypt_workers`` native threads, instead of one after another.
+
+    """
+    if (CONF.crypt_workers <= 1 or environment.Server is None or
+            len(users) < 2):
+        return [hash_user_password(user) for user in users]
+
+    import eventlet
+    pool = eventlet.GreenPool(CONF.crypt_workers)
+    return list(pool.imap(hash_user_password, users))
+
+
+class CryptWorkerPool(object):
+    """Run password hashing out of the eventlet hub.
+
+    Hashing a password takes tens of milliseconds of CPU, which would block
+    every other greenthread of the worker. Under eventlet the work is handed
+    to a pool of native threads (``eventlet.tpool``) of ``crypt_workers``
+    size, otherwise it runs in the calling thread.
+
+    :param name: what the pool runs, for the debug logs.
+
+    """
+
+    def __init__(self, name='Password hashing'):
+        self.name = name
+        self._threads = None
+        self.pending = 0
+        self.max_pending = 0
+        self.calls = 0
+        self.wait_time = 0.0
+        self.run_time = 0.0
+
+    def _timed(self, func, args, kwargs):
+        started = time.time()
+        result = func(*args, **kwargs)
+        return result, started, time.time()
+
+    def execute(self, func, *args, **kwargs):
+        # NOTE(garcianavalon) the eventlet Server is only set up by
+        # environment.use_eventlet()
+        if CONF.crypt_workers <= 0 or environment.Server is None:
+            return func(*args, **kwargs)
+
+        from eventlet import tpool
+        if self._threads is None:
+            # NOTE(garcianavalon) only effective before the first call
+            tpool.set_num_threads(CONF.crypt_workers)
+            self._threads = CONF.crypt_workers
+
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        queued = time.time()
+        try:
+            result, started, finished = tpool.execute(
+                self._timed, func, args, kwargs)
+        finally:
+            self.pending -= 1
+        self.calls += 1
+        self.wait_time += started - queued
+        self.run_time += finished - started
+        LOG.debug('%(name)s waited %(wait).3fs and ran %(run).3fs, '
+                  '%(pending)d pending',
+                  {'name': self.name,
+                   'wait': started - queued, 'run': finished - started,
+                   'pending': self.pending})
+        return result
+
+    def get_stats(self):
+        """Report the load of the pool, to help sizing it.
+
+        :returns: dictionary with the number of pending and the highest
+                  number of pending hashing calls, the number of calls and
+                  their average time waiting for a worker and running, in
+                  seconds.
+
+        """
+        calls = self.calls or 1
+        return {'pending': self.pending,
+                'max_pending': self.max_pending,
+                'calls': self.calls,
+                'avg_wait_time': self.wait_time / calls,
+                'avg_run_time': self.run_time / calls}
+
+
+crypt_pool = CryptWorkerPool()
+
+
 def hash_password(password):
     """Hash a password. Hard."""
     password_utf8 = verify_length_and_trunc_password(password).encode('utf-8')
-    return passlib.hash.sha512_crypt.encrypt(
-        password_utf8, rounds=CONF.crypt_strength)
+    return crypt_pool.execute(passlib.hash.sha512_crypt.encrypt,
+                              password_utf8, rounds=CONF.crypt_strength)
 
 
 def check_password(password, hashed):
@@ -141,7 +235,8 @@ def check_password(password, hashed):
     if password is None or hashed is None:
         return False
     password_utf8 = verify_length_and_trunc_password(password).encode('utf-8')
-    return passlib.hash.sha512_crypt.verify(password_utf8, hashed)
+    return crypt_pool.execute(passlib.hash.sha512_crypt.verify,
+                              password_utf8, hashed)
 
 
 def attr_as_boolean(val_attr):
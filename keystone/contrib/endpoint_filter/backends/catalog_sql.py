@@ -26,10 +26,8 @@ CONF = config.CONF
 @dependency.requires('endpoint_filter_api')
 class EndpointFilterCatalog(sql.Catalog):
     def get_v3_catalog(self, user_id, project_id, metadata=None):
-        substitutions = dict(six.iteritems(CONF))
-        substitutions.update({'tenant_id': project_id, 'user_id': user_id})
-
         services = {}
+        services_endpoints = {}
 
         refs = self.endpoint_filter_api.list_filtered_endpoints_for_project(
             project_id)
@@ -39,9 +37,30 @@ class EndpointFilterCatalog(sql.Catalog):
             return super(EndpointFilterCatalog, self).get_v3_catalog(
                 user_id, project_id, metadata=metadata)
 
+        compiled_endpoints = {}
+        for svc in self._get_compiled_catalog():
+            for endpoint, template in svc['endpoints']:
+                compiled_endpoints[endpoint['id']] = (svc, endpoint, template)
+
         for endpoint in refs:
-            try:
-                endpoint = self.get_endpoint(endpoint['id'])
+            if endpoint['id'] in compiled_endpoints:
+                svc, endpoint, template = compiled_endpoints[endpoint['id']]
+                service_id = svc['id']
+                services.setdefault(service_id, svc)
+                endpoint = dict(endpoint, url=catalog_core.render_url(
+                    template, project_id, user_id))
+                del endpoint['region']
+            else:
+                # NOTE(garcianavalon) the compiled catalog only has the
+                # enabled endpoints of the enabled services, look up any
+                # other one
+                try:
+                    endpoint = self.get_endpoint(endpoint['id'])
+                except exception.EndpointNotFound:
+                    # remove bad reference from association
+                    self.endpoint_filter_api.remove_endpoint_from_project(
+                        endpoint['id'], project_id)
+                    continue
                 if not endpoint['enabled']:
                     # Skip disabled endpoints.
                     continue
@@ -49,21 +68,17 @@ class EndpointFilterCatalog(sql.Catalog):
                 services.setdefault(
                     service_id,
                     self.get_service(service_id))
-                service = services[service_id]
                 del endpoint['service_id']
                 del endpoint['enabled']
                 del endpoint['legacy_endpoint_id']
+                substitutions = dict(six.iteritems(CONF))
+                substitutions.update({'tenant_id': project_id,
+                                      'user_id': user_id})
                 endpoint['url'] = catalog_core.format_url(
                     endpoint['url'], substitutions)
-                # populate filtered endpoints
-                if 'endpoints' in services[service_id]:
-                    service['endpoints'].append(endpoint)
-                else:
-                    service['endpoints'] = [endpoint]
-            except exception.EndpointNotFound:
-                # remove bad reference from association
-                self.endpoint_filter_api.remove_endpoint_from_project(
-                    endpoint['id'], project_id)
+            # populate filtered endpoints
+            endpoints = services_endpoints.setdefault(service_id, [])
+            endpoints.append(endpoint)
 
         # format catalog
         catalog = []
@@ -71,14 +86,14 @@ class EndpointFilterCatalog(sql.Catalog):
             formatted_service = {}
             formatted_service['id'] = service['id']
             formatted_service['type'] = service['type']
-            for endpoint in service['endpoints']:
+            for endpoint in services_endpoints[service_id]:
                 # NOTE(garcianavalon) change region_id for region
                 # like old catalog services!
                 region = endpoint.pop('region_id', None)
                 if region:
                     endpoint['region'] = region
 
-            formatted_service['endpoints'] = service['endpoints']
+            formatted_service['endpoints'] = services_endpoints[service_id]
             catalog.append(formatted_service)
 
         return catalog
@@ -20,6 +20,7 @@ from keystone.common import dependency
 from keystone.common import extension
 from keystone.common import manager
 from keystone import config
+from keystone.contrib.federation import utils
 from keystone import exception
 from keystone.openstack.common import log as logging
 
@@ -57,6 +58,15 @@ class Manager(manager.Manager):
     def __init__(self):
         super(Manager, self).__init__(CONF.federation.driver)
 
+    def update_mapping(self, mapping_id, mapping_ref):
+        mapping_ref = self.driver.update_mapping(mapping_id, mapping_ref)
+        utils.invalidate_rule_processor(mapping_id)
+        return mapping_ref
+
+    def delete_mapping(self, mapping_id):
+        self.driver.delete_mapping(mapping_id)
+        utils.invalidate_rule_processor(mapping_id)
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Driver(object):
@@ -10,7 +10,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import base64
+import copy
 import datetime
+import hashlib
 import os
 import subprocess
 import uuid
@@ -26,7 +29,16 @@ xmldsig = importutils.try_import("saml2.xmldsig")
 if not xmldsig:
     xmldsig = importutils.try_import("xmldsig")
 
+try:
+    from cryptography.hazmat.primitives.asymmetric import padding
+    from cryptography.hazmat.primitives import hashes
+    from lxml import etree
+except ImportError:
+    etree = None
+
 from keystone.common import config
+from keystone.common import signing
+from keystone.common import utils
 from keystone import exception
 from keystone.i18n import _, _LE
 from keystone.openstack.common import fileutils
@@ -36,6 +48,8 @@ from keystone.openstack.common import log
 LOG = log.getLogger(__name__)
 CONF = config.CONF
 
+saml_signing_pool = utils.CryptWorkerPool('SAML signing')
+
 
 class SAMLGenerator(object):
     """A class to generate SAML assertions."""
@@ -369,13 +383,83 @@ class SAMLGenerator(object):
         return signature
 
 
+class AssertionSigner(object):
+    """Sign SAML assertions in process with a certificate and RSA key.
+
+    Fills in the XML-DSig enveloped signature template of the assertion,
+    as ``xmlsec1 --sign`` does: the SHA-1 digest of the exclusive canonical
+    form of the assertion without its signature, the RSA-SHA1 signature of
+    the exclusive canonical form of the SignedInfo and the certificate.
+
+    :raises ValueError: if the certificate or the key cannot be used.
+
+    """
+
+    def __init__(self, certfile, keyfile):
+        self._cert = base64.b64encode(
+            signing.load_certificate(certfile)).decode('ascii')
+        self._key = signing.load_rsa_key(keyfile)
+
+    def sign(self, assertion):
+        """Sign the assertion, as built by SAMLGenerator, in place."""
+        template = assertion.signature
+        reference = template.signed_info.reference
+        if isinstance(reference, list):
+            reference = reference[0]
+
+        tree = etree.fromstring(_assertion_to_string(assertion))
+        signature = tree.find('{%s}Signature' % xmldsig.NAMESPACE)
+
+        enveloped = copy.deepcopy(tree)
+        enveloped.remove(enveloped.find('{%s}Signature' % xmldsig.NAMESPACE))
+        digest = base64.b64encode(
+            hashlib.sha1(_c14n(enveloped)).digest()).decode('ascii')
+        signed_info = signature.find('{%s}SignedInfo' % xmldsig.NAMESPACE)
+        signed_info.find('.//{%s}DigestValue' % xmldsig.NAMESPACE).text = (
+            digest)
+        signature_value = base64.b64encode(self._key.sign(
+            _c14n(signed_info), padding.PKCS1v15(),
+            hashes.SHA1())).decode('ascii')
+
+        reference.digest_value.text = digest
+        template.signature_value.text = signature_value
+        template.key_info.x509_data = [xmldsig.X509Data(
+            x509_certificate=xmldsig.X509Certificate(text=self._cert))]
+        return assertion
+
+
+def _c14n(element):
+    return etree.tostring(element, method='c14n', exclusive=True,
+                          with_comments=False)
+
+
+def _assertion_to_string(assertion):
+    # NOTE(gyee): need to make the namespace prefixes explicit so
+    # they won't get reassigned when we wrap the assertion into
+    # SAML2 response
+    return assertion.to_string(nspair={'saml': saml2.NAMESPACE,
+                                       'xmldsig': xmldsig.NAMESPACE})
+
+
+def _get_assertion_signer():
+    """Return the in-process assertion signer, if it can be used."""
+    if signing.rsa is None or etree is None or not CONF.saml.in_process:
+        return None
+    return signing.load_signer(AssertionSigner, CONF.saml.certfile,
+                               CONF.saml.keyfile)
+
+
 def _sign_assertion(assertion):
     """Sign a SAML assertion.
 
-    This method utilizes ``xmlsec1`` binary and signs SAML assertions in a
-    separate process. ``xmlsec1`` cannot read input data from stdin so the
-    prepared assertion needs to be serialized and stored in a temporary
-    file. This file will be deleted immediately after ``xmlsec1`` returns.
+    The assertion is signed in process by :class:`AssertionSigner` when
+    possible, on the ``crypt_workers`` pool under eventlet.
+
+    Otherwise this method utilizes ``xmlsec1`` binary and signs SAML
+    assertions in a separate process. ``xmlsec1`` cannot read input data
+    from stdin so the prepared assertion needs to be serialized and stored
+    in a temporary file. This file will be deleted immediately after
+    ``xmlsec1`` returns.
     The signed assertion is redirected to a standard output and read using
     subprocess.PIPE redirection. A ``saml.Assertion`` class is created
     from the signed string again and returned.
@@ -387,6 +471,10 @@ def _sign_assertion(assertion):
     :return: XML <Assertion> object
 
     """
+    signer = _get_assertion_signer()
+    if signer is not None:
+        return saml_signing_pool.execute(signer.sign, assertion)
+
     xmlsec_binary = CONF.saml.xmlsec1_binary
     idp_private_key = CONF.saml.keyfile
     idp_public_key = CONF.saml.certfile
@@ -401,12 +489,8 @@ def _sign_assertion(assertion):
                     '--id-attr:ID', 'Assertion']
 
     try:
-        # NOTE(gyee): need to make the namespace prefixes explicit so
-        # they won't get reassigned when we wrap the assertion into
-        # SAML2 response
-        file_path = fileutils.write_to_tempfile(assertion.to_string(
-            nspair={'saml': saml2.NAMESPACE,
-                    'xmldsig': xmldsig.NAMESPACE}))
+        file_path = fileutils.write_to_tempfile(
+            _assertion_to_string(assertion))
         command_list.append(file_path)
         process = subprocess.Popen(command_list,
                                    stdin=subprocess.PIPE,
@@ -15,6 +15,7 @@
 import re
 
 import jsonschema
+from oslo.serialization import jsonutils
 from oslo.utils import timeutils
 import six
 
@@ -141,8 +142,47 @@ def get_assertion_params_from_env(context):
             yield (k, v)
 
 
+_RULE_PROCESSORS = {}
+
+
+def get_rule_processor(mapping):
+    """Return the rule processor of a mapping, built once per version of it.
+
+    :param mapping: mapping ref, with its rules serialized
+    :type mapping: dict
+
+    """
+    cached = _RULE_PROCESSORS.get(mapping['id'])
+    if cached is None or cached[0] != mapping['rules']:
+        processor = RuleProcessor(jsonutils.loads(mapping['rules']))
+        cached = _RULE_PROCESSORS[mapping['id']] = (mapping['rules'],
+                                                    processor)
+    return cached[1]
+
+
+def invalidate_rule_processor(mapping_id):
+    """Forget the rule processor of a mapping, once updated or deleted."""
+    _RULE_PROCESSORS.pop(mapping_id, None)
+
+
+def _compile_pattern(value):
+    try:
+        return re.compile(value).search
+    except (re.error, TypeError):
+        # NOTE(garcianavalon) let the invalid pattern fail as before, once
+        # a rule using it is evaluated
+        return lambda assertion_value: re.search(value, assertion_value)
+
+
 class RuleProcessor(object):
-    """A class to process assertions and mapping rules."""
+    """A class to process assertions and mapping rules.
+
+    The rules are compiled once: regular expressions are compiled, the
+    values to compare with are kept in sets and the rules are indexed by
+    the remote attributes, and values, they require. Processing an
+    assertion only evaluates the rules it can satisfy, in their order.
+
+    """
 
     class _EvalType(object):
         """Mapping rule evaluation types."""
@@ -161,6 +201,82 @@ class RuleProcessor(object):
         """
 
         self.rules = rules
+        self._requirements = []
+        # rules indexed by a remote attribute they require, by one of the
+        # values they require from it, and the rules requiring none
+        self._by_type = {}
+        self._by_value = {}
+        self._unconditional = []
+
+        for index, rule in enumerate(rules):
+            requirements = [self._compile_requirement(requirement)
+                            for requirement in rule['remote']]
+            self._requirements.append(requirements)
+            self._index_rule(index, rule['remote'], requirements)
+
+    def _compile_requirement(self, requirement):
+        """Return the type of the requirement and its matcher.
+
+        The matcher tells whether the values of the remote attribute satisfy
+        the any_one_of or, if missing, the not_any_of values of the
+        requirement. It is None if the requirement has neither.
+
+        """
+        requirement_type = requirement['type']
+        for eval_type in (self._EvalType.ANY_ONE_OF,
+                          self._EvalType.NOT_ANY_OF):
+            values = requirement.get(eval_type)
+            if values is None:
+                continue
+            if requirement.get('regex', False):
+                # NOTE(garcianavalon) a regex is satisfied by any match, for
+                # not_any_of as well
+                return requirement_type, self._regex_matcher(
+                    [_compile_pattern(value) for value in values])
+            return requirement_type, self._value_matcher(
+                frozenset(values), eval_type == self._EvalType.ANY_ONE_OF)
+        return requirement_type, None
+
+    @staticmethod
+    def _regex_matcher(patterns):
+        def match(assertion_values):
+            for search in patterns:
+                for assertion_value in assertion_values:
+                    if search(assertion_value):
+                        return True
+            return False
+        return match
+
+    @staticmethod
+    def _value_matcher(values, any_one_of):
+        def match(assertion_values):
+            return values.isdisjoint(assertion_values) != any_one_of
+        return match
+
+    def _index_rule(self, index, remote, requirements):
+        for requirement in remote:
+            if (requirement.get(self._EvalType.ANY_ONE_OF) is not None and
+                    not requirement.get('regex', False)):
+                by_value = self._by_value.setdefault(requirement['type'], {})
+                for value in set(requirement[self._EvalType.ANY_ONE_OF]):
+                    by_value.setdefault(value, []).append(index)
+                return
+        for requirement_type, matcher in requirements:
+            if matcher is not None:
+                self._by_type.setdefault(requirement_type, []).append(index)
+                return
+        self._unconditional.append(index)
+
+    def _candidate_rules(self, assertion):
+        """Return the indexes of the rules the assertion may satisfy."""
+        candidates = set(self._unconditional)
+        for name, values in six.iteritems(assertion):
+            candidates.update(self._by_type.get(name, ()))
+            by_value = self._by_value.get(name)
+            if by_value:
+                for value in values:
+                    candidates.update(by_value.get(value, ()))
+        return sorted(candidates)
 
     def process(self, assertion_data):
         """Transform assertion to a dictionary of user name and group ids
@@ -201,9 +317,9 @@ class RuleProcessor(object):
                          if isinstance(v, six.string_types))
         identity_values = []
 
-        for rule in self.rules:
-            direct_maps = self._verify_all_requirements(rule['remote'],
-                                                        assertion)
+        for index in self._candidate_rules(assertion):
+            direct_maps = self._verify_all_requirements(
+                self._requirements[index], assertion)
 
             # If the compare comes back as None, then the rule did not apply
             # to the assertion data, go on to the next rule
@@ -213,6 +329,7 @@ class RuleProcessor(object):
             # If there are no direct mappings, then add the local mapping
             # directly to the array of saved values. However, if there is
             # a direct mapping, then perform variable replacement.
+            rule = self.rules[index]
             if not direct_maps:
                 identity_values += rule['local']
             else:
@@ -294,8 +411,8 @@ class RuleProcessor(object):
         return new
 
     def _verify_all_requirements(self, requirements, assertion):
-        """Go through the remote requirements of a rule, and compare against
-        the assertion.
+        """Go through the compiled remote requirements of a rule, and compare
+        against the assertion.
 
         If a value of ``None`` is returned, the rule with this assertion
         doesn't apply.
@@ -304,23 +421,8 @@ class RuleProcessor(object):
         Otherwise, then it will return the values, in order, to be directly
         mapped, again, the rule is valid.
 
-        :param requirements: list of remote requirements from rules
+        :param requirements: compiled remote requirements of a rule
         :type requirements: list
-
-        Example requirements::
-
-            [
-                {
-                    "type": "UserName"
-                },
-                {
-                    "type": "orgPersonType",
-                    "any_one_of": [
-                        "Customer"
-                    ]
-                }
-            ]
-
         :param assertion: dict of attributes from an IdP
         :type assertion: dict
 
@@ -340,79 +442,18 @@ class RuleProcessor(object):
 
         direct_maps = []
 
-        for requirement in requirements:
-            requirement_type = requirement['type']
-            regex = requirement.get('regex', False)
-
-            any_one_values = requirement.get(self._EvalType.ANY_ONE_OF)
-            if any_one_values is not None:
-                if self._evaluate_requirement(any_one_values,
-                                              requirement_type,
-                                              self._EvalType.ANY_ONE_OF,
-                                              regex,
-                                              assertion):
-                    continue
-                else:
-                    return None
-
-            not_any_values = requirement.get(self._EvalType.NOT_ANY_OF)
-            if not_any_values is not None:
-                if self._evaluate_requirement(not_any_values,
-                                              requirement_type,
-                                              self._EvalType.NOT_ANY_OF,
-                                              regex,
-                                              assertion):
-                    continue
-                else:
+        for requirement_type, matcher in requirements:
+            assertion_values = assertion.get(requirement_type)
+            if matcher is not None:
+                # If the requirement type does not exist in the assertion
+                # data, the requirement is not valid
+                if not assertion_values or not matcher(assertion_values):
                     return None
+                continue
 
             # If 'any_one_of' or 'not_any_of' are not found, then values are
             # within 'type'. Attempt to find that 'type' within the assertion.
-            direct_map_values = assertion.get(requirement_type)
-            if direct_map_values:
-                direct_maps += direct_map_values
+            if assertion_values:
+                direct_maps += assertion_values
 
         return direct_maps
-
-    def _evaluate_requirement(self, values, requirement_type,
-                              eval_type, regex, assertion):
-        """Evaluate the incoming requirement and assertion.
-
-        If the requirement type does not exist in the assertion data, then
-        return False. If regex is specified, then compare the values and
-        assertion values. Otherwise, grab the intersection of the values
-        and use that to compare against the evaluation type.
-
-        :param values: list of allowed values, defined in the requirement
-        :type values: list
-        :param requirement_type: key to look for in the assertion
-        :type requirement_type: string
-        :param eval_type: determine how to evaluate requirements
-        :type eval_type: string
-        :param regex: perform evaluation with regex
-        :type regex: boolean
-        :param assertion: dict of attributes from the IdP
-        :type assertion: dict
-
-        :returns: boolean, whether requirement is valid or not.
-
-        """
-
-        assertion_values = assertion.get(requirement_type)
-        if not assertion_values:
-            return False
-
-        if regex:
-            for value in values:
-                for assertion_value in assertion_values:
-                    if re.search(value, assertion_value):
-                        return True
-            return False
-
-        any_match = bool(set(values).intersection(set(assertion_values)))
-        if any_match and eval_type == self._EvalType.ANY_ONE_OF:
-            return True
-        if not any_match and eval_type == self._EvalType.NOT_ANY_OF:
-            return True
-
-        return False
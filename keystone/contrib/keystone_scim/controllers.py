@@ -20,11 +20,17 @@
 
 """Extensions supporting SCIM."""
 
+import uuid
+
+import six
+
 from keystone import config
 from keystone.common import controller
 from keystone.common import dependency
 from keystone.common import driver_hints
 from keystone.common import wsgi
+from keystone import exception
+from keystone.i18n import _LW
 from keystone.identity.controllers import UserV3, GroupV3
 from keystone.assignment.controllers import ProjectV3
 from keystone.openstack.common import log
@@ -37,29 +43,47 @@ LOG = log.getLogger(__name__)
 
 
 def pagination(context, hints=None):
-    """Enhance Hints with SCIM pagination info (limit and offset)"""
+    """Enhance Hints with SCIM pagination info (offset and count)"""
     q = context['query_string']
     if hints is None:
         hints = driver_hints.Hints()
     try:
-        hints.scim_limit = q['count']
-    except KeyError:
-        pass
-    try:
-        hints.scim_offset = q['startIndex']
-    except KeyError:
-        pass
+        offset = int(q.get('startIndex', 0))
+        count = int(q['count']) if 'count' in q else None
+    except (TypeError, ValueError):
+        offset = -1
+    if offset < 0 or (count is not None and count < 0):
+        raise exception.ValidationError(
+            attribute='non-negative startIndex and count', target='the query')
+    hints.set_page(offset, count, with_total=True)
     return hints
 
 
+def paginate(refs, hints):
+    """Return the page of refs, if the driver did not return just that.
+
+    The filters the driver could not satisfy are applied first, so that the
+    total only counts the matching entities.
+
+    """
+    page = hints.page
+    if page['satisfied']:
+        return refs
+    refs = controller.V3Controller.filter_by_attributes(refs, hints)
+    page['total'] = len(refs)
+    refs = sorted(refs, key=lambda ref: ref['id'])
+    end = None if page['count'] is None else page['offset'] + page['count']
+    return refs[page['offset']:end]
+
+
 def get_scim_page_info(context, hints):
     page_info = {
-        "totalResults": hints.scim_total
+        "totalResults": hints.page['total']
     }
     if ('startIndex' in context['query_string']):
-        page_info["startIndex"] = hints.scim_offset
+        page_info["startIndex"] = hints.page['offset']
     if ('count' in context['query_string']):
-        page_info["itemsPerPage"] = hints.scim_limit
+        page_info["itemsPerPage"] = hints.page['count']
     return page_info
 
 
@@ -120,6 +144,11 @@ class ScimInfoController(wsgi.Application):
         schema['information']['trialUsers'] = roles_count['trial']
         schema['information']['basicUsers'] = roles_count['basic']
         schema['information']['communityUsers'] = roles_count['community']
+        schema['bulk'] = {
+            'supported': True,
+            'maxOperations': CONF.scim.bulk_max_operations,
+            'maxPayloadSize': min(CONF.scim.bulk_max_payload_size,
+                                  CONF.max_request_body_size)}
         return schema
 
     @controller.protected()
@@ -152,6 +181,7 @@ class ScimUserV3Controller(UserV3):
             refs = self.identity_api.list_users(
                 domain_scope=self._get_domain_id_for_request(context),
                 hints=hints)
+        refs = paginate(refs, hints)
         scim_page_info = get_scim_page_info(context, hints)
         return conv.listusers_key2scim(refs, context['path'], scim_page_info)
 
@@ -233,7 +263,9 @@ class ScimRoleV3Controller(controller.V3Controller):
                              comparator='startswith', case_sensitive=False)
         except KeyError:
             pass
-        refs = self.assignment_api.list_roles(hints=pagination(context, hints))
+        refs = paginate(
+            self.assignment_api.list_roles(hints=pagination(context, hints)),
+            hints)
         scim_page_info = get_scim_page_info(context, hints)
         return conv.listroles_key2scim(refs, context['path'], scim_page_info)
 
@@ -287,6 +319,7 @@ class ScimGroupV3Controller(GroupV3):
             refs = self.identity_api.list_groups(
                 domain_scope=self._get_domain_id_for_request(context),
                 hints=hints)
+        refs = paginate(refs, hints)
         scim_page_info = get_scim_page_info(context, hints)
         return conv.listgroups_key2scim(refs, context['path'], scim_page_info)
 
@@ -333,7 +366,7 @@ class ScimOrganizationV3Controller(ProjectV3):
     @controller.filterprotected('domain_id', 'enabled', 'name')
     def list_organizations(self, context, filters):
         hints = pagination(context, ProjectV3.build_driver_hints(context, filters))
-        refs = self.assignment_api.list_projects(hints=pagination(context, hints))
+        refs = paginate(self.assignment_api.list_projects(hints=hints), hints)
         scim_page_info = get_scim_page_info(context, hints)
         return conv.listorganizations_key2scim(refs, context['path'], scim_page_info)
 
@@ -368,3 +401,264 @@ class ScimOrganizationV3Controller(ProjectV3):
         data['urn:scim:schemas:extension:keystone:%s' % path] = data.pop(
             'urn_scim_schemas_extension_keystone_%s' % path, {})
         return data
+
+
+BULK_RESPONSE_SCHEMA = 'urn:ietf:params:scim:api:messages:2.0:BulkResponse'
+ERROR_SCHEMA = 'urn:ietf:params:scim:api:messages:2.0:Error'
+BULK_ID_PREFIX = 'bulkId:'
+
+
+class _BulkRun(object):
+    """The state of a SCIM Bulk request while its operations are run."""
+
+    def __init__(self, context, fail_on_errors):
+        self.context = context
+        self.prefix = context['path'].rsplit('/Bulk', 1)[0]
+        self.fail_on_errors = fail_on_errors
+        self.errors = 0
+        self.bulk_ids = {}
+        self.pending = []
+        self.results = []
+
+    def stopped(self):
+        return bool(self.fail_on_errors) and (
+            self.errors >= self.fail_on_errors)
+
+    def succeeded(self, operation, resource, resource_id, status):
+        if operation.get('bulkId'):
+            self.bulk_ids[operation['bulkId']] = resource_id
+        location = None
+        if resource_id is not None:
+            location = controller.V3Controller.base_url(
+                self.context,
+                path='%s/%s/%s' % (self.prefix, resource, resource_id))
+        self.results.append(dict(self._result(operation), status=status,
+                                 location=location))
+
+    def failed(self, operation, error):
+        self.errors += 1
+        result = self._result(operation)
+        result['status'] = str(error.code)
+        result['response'] = {'schemas': [ERROR_SCHEMA],
+                              'status': str(error.code),
+                              'detail': six.text_type(error)}
+        self.results.append(result)
+
+    @staticmethod
+    def _result(operation):
+        result = {'method': operation.get('method')}
+        if operation.get('bulkId'):
+            result['bulkId'] = operation['bulkId']
+        return result
+
+
+@dependency.requires('assignment_api', 'identity_api', 'registration_api')
+class ScimBulkController(wsgi.Application):
+    """Run several SCIM operations in a single request.
+
+    Consecutive user creations, the bulk of provisioning the citizens of a
+    registry, are run ``bulk_chunk_size`` at a time: the users, their
+    default organizations and roles are stored with a single transaction
+    and notification each per chunk, and their passwords are hashed
+    together. Any other operation goes through the controller of its
+    resource, one at a time.
+
+    """
+
+    STATUS = {'POST': '201', 'PUT': '200', 'PATCH': '200', 'DELETE': '204'}
+    VERBS = {'POST': 'create', 'PUT': 'put', 'PATCH': 'patch',
+             'DELETE': 'delete'}
+
+    def __init__(self):
+        super(ScimBulkController, self).__init__()
+        self.user_controller = ScimUserV3Controller()
+        # resource: (controller, member name, action prefix)
+        self.resources = {
+            'Users': (self.user_controller, 'user', ''),
+            'Groups': (ScimGroupV3Controller(), 'group', ''),
+            'Organizations': (ScimOrganizationV3Controller(),
+                              'organization', ''),
+            'Roles': (ScimRoleV3Controller(), 'role', 'scim_'),
+        }
+
+    @controller.protected()
+    def scim_bulk(self, context, **kwargs):
+        operations = kwargs.get('Operations')
+        if not isinstance(operations, list):
+            raise exception.ValidationError(attribute='Operations',
+                                            target='the request')
+        content_length = context['environment'].get('CONTENT_LENGTH')
+        if (len(operations) > CONF.scim.bulk_max_operations or
+                int(content_length or 0) > CONF.scim.bulk_max_payload_size):
+            raise exception.RequestTooLarge()
+
+        run = _BulkRun(context, kwargs.get('failOnErrors'))
+        for operation in operations:
+            if run.stopped():
+                break
+            try:
+                resource, resource_id = self._parse(run, operation)
+            except exception.Error as e:
+                run.failed(operation, e)
+                continue
+            if operation['method'] == 'POST' and resource == 'Users':
+                run.pending.append(operation)
+                if len(run.pending) >= CONF.scim.bulk_chunk_size:
+                    self._flush(run)
+            else:
+                self._flush(run)
+                self._run(run, operation, resource, resource_id)
+        self._flush(run)
+
+        return {'schemas': [BULK_RESPONSE_SCHEMA],
+                'Operations': run.results}
+
+    def _parse(self, run, operation):
+        """Validate an operation and resolve its bulkId references.
+
+        :returns: the resource and resource id the operation is about
+
+        """
+        method = operation.get('method')
+        path = operation.get('path')
+        if method not in self.VERBS or not isinstance(path, six.string_types):
+            raise exception.ValidationError(attribute='method and path',
+                                            target='the operation')
+        parts = path.strip('/').split('/')
+        if (parts[0] not in self.resources or
+                len(parts) != (1 if method == 'POST' else 2)):
+            raise exception.ValidationError(attribute='a valid path',
+                                            target='the operation')
+        if method == 'POST' and not operation.get('bulkId'):
+            raise exception.ValidationError(attribute='bulkId',
+                                            target='the operation')
+
+        resource_id = parts[1] if len(parts) == 2 else None
+        resource_id = self._resolve(run, resource_id)
+        if 'data' in operation:
+            operation['data'] = self._resolve(run, operation['data'])
+        return parts[0], resource_id
+
+    def _resolve(self, run, value):
+        """Replace the bulkId references in value with the resource ids."""
+        if isinstance(value, dict):
+            return dict((k, self._resolve(run, v))
+                        for k, v in six.iteritems(value))
+        if isinstance(value, list):
+            return [self._resolve(run, v) for v in value]
+        if (isinstance(value, six.string_types) and
+                value.startswith(BULK_ID_PREFIX)):
+            bulk_id = value[len(BULK_ID_PREFIX):]
+            if bulk_id not in run.bulk_ids and any(
+                    op['bulkId'] == bulk_id for op in run.pending):
+                self._flush(run)
+            if bulk_id not in run.bulk_ids:
+                raise exception.ValidationError(
+                    attribute='a known bulkId', target=value)
+            return run.bulk_ids[bulk_id]
+        return value
+
+    def _run(self, run, operation, resource, resource_id):
+        """Run a single operation through the controller of its resource."""
+        resource_controller, member, prefix = self.resources[resource]
+        method = operation['method']
+        action = getattr(resource_controller, '%s%s_%s' % (
+            prefix, self.VERBS[method], member))
+        context = dict(run.context, path='%s/%s' % (run.prefix, resource),
+                       query_string={})
+        kwargs = self._normalize_dict(operation.get('data') or {})
+        if resource_id is not None:
+            kwargs['%s_id' % member] = resource_id
+        try:
+            ref = action(context, **kwargs)
+        except exception.Error as e:
+            run.failed(operation, e)
+            return
+        if method == 'POST':
+            resource_id = ref['id']
+        run.succeeded(operation, resource, resource_id, self.STATUS[method])
+
+    def _flush(self, run):
+        """Create the users of the pending operations, in a single chunk."""
+        operations, run.pending = run.pending, []
+        if not operations:
+            return
+        try:
+            users = self._create_users(run.context, operations)
+        except exception.Error as e:
+            LOG.debug('Creating %(count)d users at once failed, creating '
+                      'them one at a time: %(error)s',
+                      {'count': len(operations), 'error': e})
+            for operation in operations:
+                if run.stopped():
+                    break
+                self._run(run, operation, 'Users', None)
+            return
+
+        try:
+            self._create_default_projects(run.context, users)
+        except exception.Error as e:
+            # NOTE(garcianavalon) the users were committed on their own,
+            # delete them so a retry does not create them twice
+            self._delete_users(users)
+            for operation in operations:
+                run.failed(operation, e)
+            return
+        for operation, user in zip(operations, users):
+            run.succeeded(operation, 'Users', user['id'], self.STATUS['POST'])
+
+    def _create_users(self, context, operations):
+        """Create several users as ScimUserV3Controller.create_user does.
+
+        :returns: the users created
+
+        """
+        path = context['path']
+        users = []
+        for operation in operations:
+            user = conv.user_scim2key(operation.get('data') or {}, path=path)
+            user.pop('id', None)
+            self._require_attribute(user, 'name')
+            users.append(
+                self.user_controller._normalize_domain_id(context, user))
+
+        user_ids = self.identity_api.generate_user_ids(users)
+        for user, user_id in zip(users, user_ids):
+            user.update(id=user_id, username=user_id,
+                        default_project_id=uuid.uuid4().hex)
+        return self.identity_api.create_users(users)
+
+    def _delete_users(self, users):
+        """Delete the users of a chunk and their default organizations."""
+        for user in users:
+            try:
+                try:
+                    self.assignment_api.delete_project(
+                        user['default_project_id'])
+                except exception.ProjectNotFound:
+                    pass
+                self.identity_api.delete_user(user['id'])
+            except exception.Error as e:
+                LOG.warning(_LW('Unable to delete user %(user_id)s after '
+                                'failing to create its organization: '
+                                '%(error)s'),
+                            {'user_id': user['id'], 'error': e})
+
+    def _create_default_projects(self, context, users):
+        """Give every user a default organization with the default role.
+
+        The organization is named after and owned by the user, as
+        ScimUserV3Controller.create_user does.
+
+        """
+        self.assignment_api.create_projects(
+            [{'id': user['default_project_id'],
+              'name': user['id'],
+              'domain_id': user['domain_id'],
+              'enabled': True,
+              'is_default': True} for user in users])
+        default_role = self.registration_api.get_default_role()
+        self.assignment_api.create_grants(
+            [{'role_id': default_role['id'], 'user_id': user['id'],
+              'project_id': user['default_project_id']} for user in users],
+            context=context)
@@ -34,6 +34,7 @@ class ScimRouter(wsgi.ExtensionRouter):
         group_controller = controllers.ScimGroupV3Controller()
         scim_info_controller = controllers.ScimInfoController()
         org_controller = controllers.ScimOrganizationV3Controller()
+        bulk_controller = controllers.ScimBulkController()
 
         # Users v1.1
 
@@ -249,6 +250,18 @@ class ScimRouter(wsgi.ExtensionRouter):
                        action='scim_get_schemas',
                        conditions=dict(method=['GET']))
 
+        # Bulk
+
+        mapper.connect(self.PATH_PREFIX + '/v1/Bulk',
+                       controller=bulk_controller,
+                       action='scim_bulk',
+                       conditions=dict(method=['POST']))
+
+        mapper.connect(self.PATH_PREFIX + '/v2/Bulk',
+                       controller=bulk_controller,
+                       action='scim_bulk',
+                       conditions=dict(method=['POST']))
+
         # Organizations
 
         mapper.connect(self.PATH_PREFIX + '/v2/Organizations',
@@ -38,7 +38,7 @@ SERVICE_PROVIDER_CONFIGS = {
         "communityUsers": ""
     },
     'bulk': {
-        'supported': False,
+        'supported': True,
         'maxOperations': 0,
         'maxPayloadSize': 0
     },
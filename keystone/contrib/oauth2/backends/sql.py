@@ -12,19 +12,32 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
 import uuid
 
+import sqlalchemy
+
 from keystone.common import sql
 from keystone.contrib import oauth2
 from keystone import exception
+from keystone.token.persistence.backends import sql as token_sql
 #from keystone.i18n import _
 from keystone.openstack.common.gettextutils import _
+from keystone.openstack.common import log
 try: from oslo.utils import timeutils
 except ImportError: from keystone.openstack.common import timeutils
+
+LOG = log.getLogger(__name__)
+
 # TODO(garcianavalon) configuration options
 VALID_RESPONSE_TYPES = sql.Enum('code', 'token')
 VALID_CLIENT_TYPES = sql.Enum('confidential')
 VALID_GRANT_TYPES = sql.Enum('authorization_code')
+# NOTE(garcianavalon) an access token can still be refreshed for a while
+# after it expires, see the validator's validate_refresh_token. Keep these
+# in sync with it until they are extracted as configuration options
+ACCESS_TOKEN_DURATION = datetime.timedelta(seconds=28800)
+REFRESH_TOKEN_DURATION = datetime.timedelta(days=14)
 
 class Consumer(sql.ModelBase, sql.DictBase):
     __tablename__ = 'consumer_oauth2'
@@ -88,11 +101,11 @@ class AccessToken(sql.ModelBase, sql.DictBase):
                              nullable=False, index=True)
     # NOTE(garcianavalon) if the consumers uses the client credentials grant
     # there is no authorizing user, so it should be nullable.
-    authorizing_user_id = sql.Column(sql.String(64), nullable=True)
-    # TODO(garcianavalon) datetime type or similar?
-    expires_at = sql.Column(sql.String(64), nullable=False)
+    authorizing_user_id = sql.Column(sql.String(64), nullable=True,
+                                     index=True)
+    expires_at = sql.Column(sql.DateTime(), nullable=False, index=True)
     scopes = sql.Column(sql.JsonBlob(), nullable=True)
-    refresh_token = sql.Column(sql.String(64), nullable=True)
+    refresh_token = sql.Column(sql.String(64), nullable=True, index=True)
     valid = sql.Column(sql.Boolean(), default=True, nullable=False)
     extra = sql.Column(sql.JsonBlob(), nullable=True)
 
@@ -237,12 +250,14 @@ class OAuth2(oauth2.Driver):
                 session.delete(credentials)
 
     # ACCESS TOKENS
-    def list_access_tokens(self, user_id=None):
+    def list_access_tokens(self, user_id=None, consumer_id=None):
         session = sql.get_session()
         with session.begin():
             refs = session.query(AccessToken)
             if user_id:
                 refs = refs.filter_by(authorizing_user_id=user_id)
+            if consumer_id:
+                refs = refs.filter_by(consumer_id=consumer_id)
         return [token.to_dict() for token in refs]
 
     def _check_access_token_ref(self, access_token_ref, access_token_id, user_id):
@@ -291,3 +306,53 @@ class OAuth2(oauth2.Driver):
                 msg = _('Access Token for refresh token %s not found') %refresh_token
                 raise exception.NotFound(message=msg)
         return access_token_ref.to_dict()
+
+    # EXPIRED DATA
+    def _flush_expired(self, expires_column, upper_bound_func, *criteria):
+        session = sql.get_session()
+        dialect = session.bind.dialect.name
+        expiry_range_func = token_sql._expiry_range_strategy(dialect)
+        query = session.query(expires_column).filter(*criteria)
+        total_removed = 0
+        for expiry_time in expiry_range_func(session, upper_bound_func,
+                                             expires_column=expires_column,
+                                             criteria=criteria):
+            delete_query = query.filter(expires_column <= expiry_time)
+            row_count = delete_query.delete(synchronize_session=False)
+            total_removed += row_count
+            LOG.debug('Removed %d expired rows', total_removed)
+
+        session.flush()
+        return total_removed
+
+    def flush_expired_access_tokens(self):
+        def upper_bound_func():
+            # NOTE(garcianavalon) only tokens that can't be refreshed anymore
+            # are removed
+            return (timeutils.utcnow() + ACCESS_TOKEN_DURATION
+                    - REFRESH_TOKEN_DURATION)
+
+        total_removed = self._flush_expired(AccessToken.expires_at,
+                                            upper_bound_func)
+        LOG.info(_('Total expired access tokens removed: %d'), total_removed)
+        return total_removed
+
+    def flush_expired_authorization_codes(self):
+        def upper_bound_func():
+            return timeutils.isotime(timeutils.utcnow(), subsecond=True)
+
+        total_removed = self._flush_expired(AuthorizationCode.expires_at,
+                                            upper_bound_func)
+        # the codes that were already exchanged for a token are useless too,
+        # remove them in the same batches up to the latest of them
+        session = sql.get_session()
+        latest_used = session.query(
+            sqlalchemy.func.max(AuthorizationCode.expires_at)).filter_by(
+                valid=False).scalar()
+        if latest_used is not None:
+            total_removed += self._flush_expired(
+                AuthorizationCode.expires_at, lambda: latest_used,
+                sqlalchemy.not_(AuthorizationCode.valid))
+        LOG.info(_('Total used or expired authorization codes removed: %d'),
+                 total_removed)
+        return total_removed
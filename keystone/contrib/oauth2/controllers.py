@@ -16,6 +16,7 @@ import json
 import urllib
 
 from oauthlib.oauth2 import FatalClientError, OAuth2Error
+from oslo.utils import timeutils
 
 from keystone import exception
 from keystone.common import controller
@@ -122,17 +123,26 @@ class AccessTokenEndpointV3(controller.V3Controller):
     def _get_user_id(entity):
         return entity.get('authorizing_user_id', '')
 
+    @staticmethod
+    def _format_access_token(ref):
+        # NOTE(garcianavalon) the token might be cached, don't modify it
+        ref = ref.copy()
+        ref['expires_at'] = timeutils.isotime(ref['expires_at'])
+        return ref
+
     @controller.protected()
     def list_access_tokens(self, context, user_id):
         """List authorized access tokens. """
         ref = self.oauth2_api.list_access_tokens(user_id=user_id)
+        ref = [self._format_access_token(token) for token in ref]
         return AccessTokenEndpointV3.wrap_collection(context, ref)
 
     @controller.protected()
     def get_access_token(self, context, user_id, access_token_id):
         """Get access token. """
         ref = self.oauth2_api.get_access_token(access_token_id, user_id=user_id)
-        return AccessTokenEndpointV3.wrap_member(context, ref)
+        return AccessTokenEndpointV3.wrap_member(
+            context, self._format_access_token(ref))
 
     @controller.protected()
     def revoke_access_token(self, context, user_id, access_token_id):
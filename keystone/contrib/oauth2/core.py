@@ -17,17 +17,23 @@ from __future__ import absolute_import
 import abc
 import six
 
+from keystone import config
 from keystone import exception
 from keystone import notifications
+from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import extension
 from keystone.common import manager
+from keystone.i18n import _
 from keystone.openstack.common import log
 
 from oauthlib import oauth2 as oauth2lib
 
 
+CONF = config.CONF
 LOG = log.getLogger(__name__)
+SHOULD_CACHE = cache.should_cache_fn('oauth2')
+EXPIRATION_TIME = lambda: CONF.oauth2.cache_time
 
 EXTENSION_DATA = {
     'name': 'OpenStack OAUTH2 API',
@@ -47,6 +53,16 @@ EXTENSION_DATA = {
 extension.register_admin_extension(EXTENSION_DATA['alias'], EXTENSION_DATA)
 extension.register_public_extension(EXTENSION_DATA['alias'], EXTENSION_DATA)
 
+
+@notifications.internal(notifications.INVALIDATE_OAUTH2_ACCESS_TOKENS,
+                        resource_id_arg_index=0)
+def _emit_access_tokens_invalidate(payload):
+    # This is a special case notification that expects the payload to be a
+    # list of access token ids, so listeners holding data derived from those
+    # tokens (e.g. cached token validations) can drop it.
+    pass
+
+
 def filter_consumer(consumer_ref):
     """Filter out private items in a consumer dict.
 
@@ -130,9 +146,23 @@ class Manager(manager.Manager):
     # TODO(garcianavalon) revoke Identity tokens issued by an access token on token revokation
 
 
+    # CONSUMERS
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    def get_consumer_with_secret(self, consumer_id):
+        return self.driver.get_consumer_with_secret(consumer_id)
+
+    def get_consumer(self, consumer_id):
+        return filter_consumer(self.get_consumer_with_secret(consumer_id))
+
     @notifications.deleted(_CONSUMER)
     def delete_consumer(self, consumer_id):
+        # NOTE(garcianavalon) the issued tokens are deleted on cascade with
+        # the consumer, so their ids must be collected before
+        access_token_ids = self._list_access_token_ids(consumer_id)
+
         ret_val = self.driver.delete_consumer(consumer_id)
+        self.get_consumer_with_secret.invalidate(self, consumer_id)
 
         # delete all the stored credentials
         self.driver.delete_consumer_credentials(consumer_id)
@@ -142,12 +172,14 @@ class Manager(manager.Manager):
 
         # and the issued tokens
         self.driver.delete_access_tokens(consumer_id)
+        self._invalidate_access_tokens(access_token_ids)
 
         return ret_val
 
     @notifications.updated(_CONSUMER)
     def update_consumer(self, consumer_id, consumer_ref):
         ret_val = self.driver.update_consumer(consumer_id, consumer_ref)
+        self.get_consumer_with_secret.invalidate(self, consumer_id)
         # TODO(garcianavalon) also delete on scopes or grant_type changes
         if 'redirect_uris' not in consumer_ref:
             return ret_val
@@ -159,10 +191,49 @@ class Manager(manager.Manager):
         self.driver.delete_authorization_codes(consumer_id)
 
         # and the issued tokens
-        self.driver.delete_access_tokens(consumer_id)
+        self.delete_access_tokens(consumer_id)
+
+        return ret_val
+
+    # ACCESS TOKENS
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    def _get_access_token(self, access_token_id):
+        return self.driver.get_access_token(access_token_id)
+
+    def get_access_token(self, access_token_id, user_id=None):
+        access_token = self._get_access_token(access_token_id)
+        if user_id and access_token['authorizing_user_id'] != user_id:
+            msg = _('Access Token {0} for user {1} not found').format(
+                access_token_id, user_id)
+            raise exception.NotFound(message=msg)
+        return access_token
+
+    def revoke_access_token(self, access_token_id, user_id=None):
+        ret_val = self.driver.revoke_access_token(access_token_id,
+                                                  user_id=user_id)
+        self._invalidate_access_tokens([access_token_id])
+        return ret_val
 
+    def delete_access_tokens(self, client_id):
+        access_token_ids = self._list_access_token_ids(client_id)
+        ret_val = self.driver.delete_access_tokens(client_id)
+        self._invalidate_access_tokens(access_token_ids)
         return ret_val
 
+    def _list_access_token_ids(self, consumer_id):
+        return [t['id'] for t
+                in self.driver.list_access_tokens(consumer_id=consumer_id)]
+
+    def _invalidate_access_tokens(self, access_token_ids):
+        if not access_token_ids:
+            return
+        # NOTE(garcianavalon) ``self`` needs to be passed to invalidate()
+        # because of the way the cache keys are generated.
+        for access_token_id in access_token_ids:
+            self._get_access_token.invalidate(self, access_token_id)
+        _emit_access_tokens_invalidate(access_token_ids)
+
 
 @dependency.requires('identity_api')
 @six.add_metaclass(abc.ABCMeta)
@@ -340,11 +411,14 @@ class Driver(object):
 
     # ACCESS TOKEN
     @abc.abstractmethod
-    def list_access_tokens(self, user_id=None):
+    def list_access_tokens(self, user_id=None, consumer_id=None):
         """Lists all the access tokens granted by a user.
 
         :param user_id: optional filter to check the token belongs to a user
         :type user_id: string
+        :param consumer_id: optional filter to check the token was issued
+            to a consumer
+        :type consumer_id: string
         :returns: access_token as dict
 
         """
@@ -411,3 +485,22 @@ class Driver(object):
 
         """
         raise exception.NotImplemented()
+
+    # EXPIRED DATA
+    @abc.abstractmethod
+    def flush_expired_access_tokens(self):
+        """Deletes the access tokens that can't be used or refreshed anymore.
+
+        :returns: number of deleted access tokens
+
+        """
+        raise exception.NotImplemented()
+
+    @abc.abstractmethod
+    def flush_expired_authorization_codes(self):
+        """Deletes the expired or already used authorization codes.
+
+        :returns: number of deleted authorization codes
+
+        """
+        raise exception.NotImplemented()
@@ -0,0 +1,87 @@
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import calendar
+import datetime
+import time
+
+import sqlalchemy as sql
+
+
+TABLE = 'access_token_oauth2'
+# NOTE(garcianavalon) the expiration date used to be stored as a string
+# in the local time of the server
+OLD_FORMAT = '%Y-%m-%d %H:%M:%S'
+INDEXES = [
+    ('ix_access_token_oauth2_authorizing_user_id', 'authorizing_user_id'),
+    ('ix_access_token_oauth2_refresh_token', 'refresh_token'),
+    ('ix_access_token_oauth2_expires_at', 'expires_at'),
+]
+
+
+def _to_utc_datetime(value):
+    try:
+        local = datetime.datetime.strptime(value, OLD_FORMAT)
+    except (TypeError, ValueError):
+        # NOTE(garcianavalon) the token can't be validated anyway, so
+        # consider it already expired
+        return datetime.datetime.utcnow()
+    return datetime.datetime.utcfromtimestamp(time.mktime(local.timetuple()))
+
+
+def _to_local_string(value):
+    local = datetime.datetime.fromtimestamp(calendar.timegm(value.timetuple()))
+    return local.strftime(OLD_FORMAT)
+
+
+def _convert_expires_at(migrate_engine, new_type, convert):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+    access_token_table = sql.Table(TABLE, meta, autoload=True)
+
+    new_column = sql.Column('new_expires_at', new_type, nullable=True)
+    new_column.create(access_token_table)
+
+    query = sql.select([access_token_table.c.id,
+                        access_token_table.c.expires_at])
+    for token_id, expires_at in migrate_engine.execute(query).fetchall():
+        values = {'new_expires_at': convert(expires_at)}
+        update = (access_token_table.update()
+                  .where(access_token_table.c.id == token_id)
+                  .values(values))
+        migrate_engine.execute(update)
+
+    access_token_table.c.expires_at.drop()
+    access_token_table.c.new_expires_at.alter(name='expires_at',
+                                              nullable=False)
+
+
+def upgrade(migrate_engine):
+    _convert_expires_at(migrate_engine, sql.DateTime(), _to_utc_datetime)
+
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+    access_token_table = sql.Table(TABLE, meta, autoload=True)
+    for name, column in INDEXES:
+        sql.Index(name, access_token_table.c[column]).create()
+
+
+def downgrade(migrate_engine):
+    meta = sql.MetaData()
+    meta.bind = migrate_engine
+    access_token_table = sql.Table(TABLE, meta, autoload=True)
+    for name, column in INDEXES:
+        sql.Index(name, access_token_table.c[column]).drop()
+
+    _convert_expires_at(migrate_engine, sql.String(64), _to_local_string)
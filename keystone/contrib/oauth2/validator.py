@@ -208,13 +208,13 @@ class OAuth2Validator(RequestValidator):
         else:
             user_id = request.user_id
 
-        expires_at = datetime.datetime.today() + datetime.timedelta(seconds=token['expires_in'])
+        expires_at = timeutils.utcnow() + datetime.timedelta(seconds=token['expires_in'])
         access_token = {
             'id':token['access_token'],
             'consumer_id':consumer_id,
             'authorizing_user_id':user_id,
             'scopes': request.scopes,
-            'expires_at':datetime.datetime.strftime(expires_at, '%Y-%m-%d %H:%M:%S'),
+            'expires_at':expires_at,
             'refresh_token': token.get('refresh_token', None),
         }
         self.oauth2_api.store_access_token(access_token)
@@ -232,8 +232,7 @@ class OAuth2Validator(RequestValidator):
         except exception.NotFound:
             return False
 
-        if (datetime.datetime.strptime(access_token['expires_at'], '%Y-%m-%d %H:%M:%S') 
-            < datetime.datetime.today()):
+        if access_token['expires_at'] < timeutils.utcnow():
             return False
 
         if access_token['scopes'] != scopes:
@@ -300,15 +299,12 @@ class OAuth2Validator(RequestValidator):
             refresh_token_duration = 14 # TODO(garcianavalon) extract as configuration option
             
             # TODO(garcianavalon) find a better place to do this
-            access_token_expiration_date = datetime.datetime.strptime(
-                access_token['expires_at'], '%Y-%m-%d %H:%M:%S')
-
             refres_token_expiration_date = (
-                access_token_expiration_date 
+                access_token['expires_at']
                 - datetime.timedelta(seconds=token_duration) 
                 + datetime.timedelta(days=refresh_token_duration))
 
-            if refres_token_expiration_date < datetime.datetime.today():
+            if refres_token_expiration_date < timeutils.utcnow():
                 return False
 
         except exception.NotFound:
@@ -45,11 +45,14 @@ class Revoke(revoke.Driver):
         except exception.NotFound:
             return []
 
+    def _oldest(self):
+        expire_delta = datetime.timedelta(seconds=CONF.token.expiration)
+        return timeutils.utcnow() - expire_delta
+
     def _prune_expired_events_and_get(self, last_fetch=None, new_event=None):
         pruned = []
         results = []
-        expire_delta = datetime.timedelta(seconds=CONF.token.expiration)
-        oldest = timeutils.utcnow() - expire_delta
+        oldest = self._oldest()
         # TODO(ayoung): Store the time of the oldest event so that the
         # prune process can be skipped if none of the events have timed out.
         with self._store.get_lock(_EVENT_KEY) as lock:
@@ -67,7 +70,13 @@ class Revoke(revoke.Driver):
         return results
 
     def get_events(self, last_fetch=None):
-        return self._prune_expired_events_and_get(last_fetch=last_fetch)
+        if last_fetch is None:
+            return self._prune_expired_events_and_get()
+        # NOTE(garcianavalon) the incremental fetches are frequent, don't
+        # take the lock and rewrite the events to prune them.
+        oldest = max(last_fetch, self._oldest())
+        return [event for event in self._get_event()
+                if event.revoked_at > oldest]
 
     def revoke(self, event):
         self._prune_expired_events_and_get(new_event=event)
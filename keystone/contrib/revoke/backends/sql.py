@@ -81,7 +81,10 @@ class Revoke(revoke.Driver):
         session.flush()
 
     def get_events(self, last_fetch=None):
-        self._prune_expired_events()
+        # NOTE(garcianavalon) the incremental fetches are frequent, leave the
+        # pruning to the full ones.
+        if not last_fetch:
+            self._prune_expired_events()
         session = sql.get_session()
         query = session.query(RevocationEvent).order_by(
             RevocationEvent.revoked_at)
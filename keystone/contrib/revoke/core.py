@@ -55,6 +55,8 @@ extension.register_public_extension(EXTENSION_DATA['alias'], EXTENSION_DATA)
 SHOULD_CACHE = cache.should_cache_fn('revoke')
 # TODO(ayoung): migrate from the token section
 REVOCATION_CACHE_EXPIRATION_TIME = lambda: CONF.token.revocation_cache_time
+# Extra time checked back for new events on every poll.
+POLL_OVERLAP = datetime.timedelta(seconds=60)
 
 
 def revoked_before_cutoff_time():
@@ -76,6 +78,12 @@ class Manager(manager.Manager):
         super(Manager, self).__init__(CONF.revoke.driver)
         self._register_listeners()
         self.model = model
+        self._revoke_tree = None
+        self._revoke_tree_expires = None
+        self._next_poll = None
+        self._last_fetch = None
+        self._last_sync = None
+        self._fetch_counts = {'full': 0, 'delta': 0, 'events': 0}
 
     def _user_callback(self, service, resource_type, operation,
                        payload):
@@ -199,13 +207,69 @@ class Manager(manager.Manager):
     def revoke_by_domain_role_assignment(self, domain_id, role_id):
         self.revoke(model.RevokeEvent(domain_id=domain_id, role_id=role_id))
 
-    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
-                        expiration_time=REVOCATION_CACHE_EXPIRATION_TIME)
-    def _get_revoke_tree(self):
+    def _update_last_fetch(self, events, now):
+        if events:
+            latest = max(e.revoked_at for e in events)
+            self._last_fetch = max(latest, self._last_fetch or latest)
+        self._last_sync = now
+        self._next_poll = now + datetime.timedelta(
+            seconds=CONF.revoke.poll_interval)
+        self._fetch_counts['events'] += len(events)
+
+    def _rebuild_revoke_tree(self, now):
         events = self.driver.get_events()
-        revoke_tree = model.RevokeTree(revoke_events=events)
+        self._revoke_tree = model.RevokeTree(revoke_events=events)
+        self._revoke_tree_expires = now + datetime.timedelta(
+            seconds=REVOCATION_CACHE_EXPIRATION_TIME())
+        # NOTE(garcianavalon) start the polls from the time of the fetch if
+        # there are no newer events, so they don't re-read the whole table.
+        self._last_fetch = now
+        self._fetch_counts['full'] += 1
+        self._update_last_fetch(events, now)
+
+    def _poll_revoke_tree(self, now):
+        # NOTE(garcianavalon) events are stamped by the clock of the process
+        # that recorded them and might be committed after a later one, so
+        # the polls overlap. Adding an event twice has no effect.
+        events = self.driver.get_events(
+            last_fetch=self._last_fetch - POLL_OVERLAP)
+        for event in events:
+            self._revoke_tree.add_event(event)
+        self._fetch_counts['delta'] += 1
+        self._update_last_fetch(events, now)
 
-        return revoke_tree
+    def _get_revoke_tree(self):
+        # NOTE(garcianavalon) the tree is kept in process and updated in place
+        # by revoke(). The events recorded by other processes are polled for
+        # incrementally, and the whole tree is rebuilt from the backend from
+        # time to time to drop any drift.
+        now = timeutils.utcnow()
+        if (self._revoke_tree is None or not SHOULD_CACHE(self._revoke_tree)
+                or now >= self._revoke_tree_expires):
+            self._rebuild_revoke_tree(now)
+        elif now >= self._next_poll:
+            self._poll_revoke_tree(now)
+
+        return self._revoke_tree
+
+    def get_revoke_tree_stats(self):
+        """Report how up to date the in process revocation tree is.
+
+        :returns: dictionary with the number of leaves in the tree, the
+         high-water mark of the fetched events, the time since the last
+         fetch in seconds (staleness) and the number of full and delta
+         fetches and of fetched events so far.
+
+        """
+        stats = dict(self._fetch_counts)
+        if self._revoke_tree is None:
+            stats.update(leaves=0, last_fetch=None, staleness=None)
+            return stats
+        stats['leaves'] = len(self._revoke_tree)
+        stats['last_fetch'] = self._last_fetch
+        stats['staleness'] = timeutils.delta_seconds(self._last_sync,
+                                                     timeutils.utcnow())
+        return stats
 
     def check_token(self, token_values):
         """Checks the values from a token against the revocation list
@@ -220,9 +284,48 @@ class Manager(manager.Manager):
         if self._get_revoke_tree().is_revoked(token_values):
             raise exception.TokenNotFound(_('Failed to validate token'))
 
+    def get_revoke_tree(self):
+        """Return the revocation tree kept by this process, up to date.
+
+        The generation of the tree changes whenever an event changes it, so
+        a token that was not revoked remains so while it stays the same.
+
+        :returns: the model.RevokeTree, or None if revocation event caching
+         is disabled, since the tree is then fetched again on every check
+         and is not worth holding on to.
+
+        """
+        if not SHOULD_CACHE(self._revoke_tree):
+            return None
+        return self._get_revoke_tree()
+
+    def get_revoke_generation(self):
+        """Return the generation of the revocation tree kept in process.
+
+        :returns: the generation, or None if the tree is not kept, see
+         get_revoke_tree
+
+        """
+        revoke_tree = self.get_revoke_tree()
+        if revoke_tree is None:
+            return None
+        return revoke_tree.generation
+
+    def is_revoked_many(self, token_values_list):
+        """Checks a batch of tokens against the revocation list
+
+        :param token_values_list: list of dictionaries of values from tokens,
+         as in check_token
+        :returns: list of booleans, True for the revoked tokens
+
+        """
+        return self._get_revoke_tree().is_revoked_many(token_values_list)
+
     def revoke(self, event):
         self.driver.revoke(event)
-        self._get_revoke_tree.invalidate(self)
+        if self._revoke_tree is not None:
+            self._revoke_tree.add_event(event)
+            self._revoke_tree.prune(revoked_before_cutoff_time())
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -239,6 +342,10 @@ class Driver(object):
                   If no last_fetch is specified, returns all events
                   for tokens issued after the expiration cutoff.
 
+        Fetching with `last_fetch` is done frequently by every process, so
+        it should be cheap. In particular, it shouldn't prune the expired
+        events from the backend.
+
         """
         raise exception.NotImplemented()  # pragma: no cover
 
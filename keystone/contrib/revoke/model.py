@@ -10,6 +10,9 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import heapq
+import itertools
+
 from oslo.utils import timeutils
 
 
@@ -46,6 +49,9 @@ _TOKEN_KEYS = ['identity_domain_id',
 
 REVOKE_KEYS = _NAMES + _EVENT_ARGS
 
+# Shared by all the trees, so a rebuilt tree never reuses a generation.
+_GENERATIONS = itertools.count()
+
 
 def blank_token_data(issued_at):
     token_data = dict()
@@ -114,78 +120,166 @@ def attr_keys(event):
     return map(event.key_for_name, _EVENT_NAMES)
 
 
+# Alternative names to be checked in the token for every field of an event.
+_ALTERNATIVES = {
+    'user_id': ['user_id', 'trustor_id', 'trustee_id'],
+    'domain_id': ['identity_domain_id', 'assignment_domain_id'],
+    # For a domain-scoped token, the domain is in assignment_domain_id.
+    'domain_scope_id': ['assignment_domain_id', ],
+}
+
+
+def event_shape(event):
+    """The names of the attributes the event actually restricts."""
+    return tuple(name for name in _EVENT_NAMES if getattr(event, name))
+
+
 class RevokeTree(object):
-    """Fast Revocation Checking Tree Structure
+    """Fast Revocation Checking Index
 
-    The Tree is an index to quickly match tokens against events.
-    Each node is a hashtable of key=value combinations from revocation events.
-    The
+    Events are grouped by their shape, the set of attributes that they
+    restrict; the rest of the attributes are wildcards. Each group is a
+    hashtable from the tuple of the event values to the latest
+    'issued_before' and 'revoked_at' of the otherwise identical events.
+
+    Checking a token costs one lookup per combination of the token values
+    for each shape, so it does not depend on the number of events. There
+    are only a handful of shapes, one per kind of revocation.
 
     """
 
     def __init__(self, revoke_events=None):
         self.revoke_map = dict()
+        self._shapes = []
+        # NOTE(garcianavalon) changes every time an event changes the index,
+        # so the results of previous checks can be trusted while it stays
+        # the same.
+        self.generation = next(_GENERATIONS)
+        # heap of the 'revoked_at' of the leaves, so pruning does not scan
+        # the whole index. Entries of leaves since removed or revoked again
+        # are skipped when popped.
+        self._revoked_at_heap = []
+        self._heap_sequence = itertools.count()
         self.add_events(revoke_events)
 
+    def __len__(self):
+        return sum(len(table) for table in self.revoke_map.values())
+
+    def _compile(self):
+        # NOTE(garcianavalon) the list is replaced instead of modified so
+        # concurrent checks keep iterating over a consistent snapshot.
+        self._shapes = list(self.revoke_map.items())
+
     def add_event(self, event):
-        """Updates the tree based on a revocation event.
+        """Updates the index based on a revocation event.
 
-        Creates any necessary internal nodes in the tree corresponding to the
-        fields of the revocation event.  The leaf node will always be set to
-        the latest 'issued_before' for events that are otherwise identical.
+        The leaf will always be set to the latest 'issued_before' for events
+        that are otherwise identical.
 
-        :param:  Event to add to the tree
+        :param:  Event to add to the index
 
         :returns:  the event that was passed in.
 
         """
-        revoke_map = self.revoke_map
-        for key in attr_keys(event):
-            revoke_map = revoke_map.setdefault(key, {})
-        revoke_map['issued_before'] = max(
-            event.issued_before, revoke_map.get(
-                'issued_before', event.issued_before))
+        shape = event_shape(event)
+        table = self.revoke_map.get(shape)
+        if table is None:
+            table = self.revoke_map[shape] = dict()
+            self._compile()
+        key = tuple(getattr(event, name) for name in shape)
+        leaf = table.get(key)
+        if leaf is None:
+            leaf = table[key] = [event.issued_before, event.revoked_at]
+            revoked_again = True
+        elif event.issued_before > leaf[0] or event.revoked_at > leaf[1]:
+            revoked_again = event.revoked_at > leaf[1]
+            leaf[0] = max(leaf[0], event.issued_before)
+            leaf[1] = max(leaf[1], event.revoked_at)
+        else:
+            # NOTE(garcianavalon) the polls add the same events again, they
+            # must not change the generation.
+            return event
+        if revoked_again:
+            heapq.heappush(self._revoked_at_heap,
+                           (leaf[1], next(self._heap_sequence), shape, key))
+        self.generation = next(_GENERATIONS)
         return event
 
-    def remove_event(self, event):
-        """Update the tree based on the removal of a Revocation Event
+    def _remove_leaf(self, shape, key):
+        table = self.revoke_map[shape]
+        del table[key]
+        if not table:
+            del self.revoke_map[shape]
+            self._compile()
 
-        Removes empty nodes from the tree from the leaf back to the root.
+    def remove_event(self, event):
+        """Update the index based on the removal of a Revocation Event
 
-        If multiple events trace the same path, but have different
-        'issued_before' values, only the last is ever stored in the tree.
+        If multiple events have the same values, but have different
+        'issued_before' values, only the last is ever stored in the index.
         So only an exact match on 'issued_before' ever triggers a removal
 
-        :param: Event to remove from the tree
+        :param: Event to remove from the index
 
         """
-        stack = []
-        revoke_map = self.revoke_map
-        for name in _EVENT_NAMES:
-            key = event.key_for_name(name)
-            nxt = revoke_map.get(key)
-            if nxt is None:
-                break
-            stack.append((revoke_map, key, nxt))
-            revoke_map = nxt
-        else:
-            if event.issued_before == revoke_map['issued_before']:
-                revoke_map.pop('issued_before')
-        for parent, key, child in reversed(stack):
-            if not any(child):
-                del parent[key]
+        shape = event_shape(event)
+        key = tuple(getattr(event, name) for name in shape)
+        leaf = self.revoke_map.get(shape, {}).get(key)
+        if leaf is not None and leaf[0] == event.issued_before:
+            self._remove_leaf(shape, key)
 
     def add_events(self, revoke_events):
         return map(self.add_event, revoke_events or [])
 
+    def prune(self, oldest):
+        """Remove the events revoked before `oldest`.
+
+        Those events can only match tokens that are already expired.
+
+        :returns: the number of removed leaves
+
+        """
+        heap = self._revoked_at_heap
+        removed = 0
+        while heap and heap[0][0] < oldest:
+            revoked_at, _, shape, key = heapq.heappop(heap)
+            leaf = self.revoke_map.get(shape, {}).get(key)
+            if leaf is not None and leaf[1] == revoked_at:
+                self._remove_leaf(shape, key)
+                removed += 1
+        return removed
+
+    def _token_candidates(self, token_data):
+        candidates = dict()
+        for name in _EVENT_NAMES:
+            if name == 'role_id':
+                # Roles are very special since a token has a list of them.
+                # If the revocation event matches any one of them,
+                # revoke the token.
+                values = token_data.get('roles', [])
+            else:
+                values = [token_data.get(alt_name) for alt_name
+                          in _ALTERNATIVES.get(name, [name])]
+            candidates[name] = set(v for v in values if v is not None)
+        return candidates
+
+    def _is_revoked(self, shapes, token_data):
+        candidates = self._token_candidates(token_data)
+        issued_at = token_data['issued_at']
+        for shape, table in shapes:
+            for key in itertools.product(*[candidates[name]
+                                           for name in shape]):
+                leaf = table.get(key)
+                if leaf is not None and leaf[0] > issued_at:
+                    return True
+        return False
+
     def is_revoked(self, token_data):
         """Check if a token matches the revocation event
 
-        Compare the values for each level of the tree with the values from
-        the token, accounting for attributes that have alternative
-        keys, and for wildcard matches.
-        if there is a match, continue down the tree.
-        if there is no match, exit early.
+        Look up the values of the token, accounting for attributes that have
+        alternative keys, in the table of every shape of event. The
+        attributes that are not part of a shape are wildcards for it.
 
         token_data is a map based on a flattened view of token.
         The required fields are:
@@ -195,58 +289,18 @@ class RevokeTree(object):
            'consumer_id', 'access_token_id'
 
         """
-        # Alternative names to be checked in token for every field in
-        # revoke tree.
-        alternatives = {
-            'user_id': ['user_id', 'trustor_id', 'trustee_id'],
-            'domain_id': ['identity_domain_id', 'assignment_domain_id'],
-            # For a domain-scoped token, the domain is in assignment_domain_id.
-            'domain_scope_id': ['assignment_domain_id', ],
-        }
-        # Contains current forest (collection of trees) to be checked.
-        partial_matches = [self.revoke_map]
-        # We iterate over every layer of our revoke tree (except the last one).
-        for name in _EVENT_NAMES:
-            # bundle is the set of partial matches for the next level down
-            # the tree
-            bundle = []
-            wildcard = '%s=*' % (name,)
-            # For every tree in current forest.
-            for tree in partial_matches:
-                # If there is wildcard node on current level we take it.
-                bundle.append(tree.get(wildcard))
-                if name == 'role_id':
-                    # Roles are very special since a token has a list of them.
-                    # If the revocation event matches any one of them,
-                    # revoke the token.
-                    for role_id in token_data.get('roles', []):
-                        bundle.append(tree.get('role_id=%s' % role_id))
-                else:
-                    # For other fields we try to get any branch that concur
-                    # with any alternative field in the token.
-                    for alt_name in alternatives.get(name, [name]):
-                        bundle.append(
-                            tree.get('%s=%s' % (name, token_data[alt_name])))
-            # tree.get returns `None` if there is no match, so `bundle.append`
-            # adds a 'None' entry. This call remoes the `None` entries.
-            partial_matches = [x for x in bundle if x is not None]
-            if not partial_matches:
-                # If we end up with no branches to follow means that the token
-                # is definitely not in the revoke tree and all further
-                # iterations will be for nothing.
-                return False
-
-        # The last (leaf) level is checked in a special way because we verify
-        # issued_at field differently.
-        for leaf in partial_matches:
-            try:
-                if leaf['issued_before'] > token_data['issued_at']:
-                    return True
-            except KeyError:
-                pass
-        # If we made it out of the loop then no element in revocation tree
-        # corresponds to our token and it is good.
-        return False
+        return self._is_revoked(self._shapes, token_data)
+
+    def is_revoked_many(self, token_values_list):
+        """Check a batch of tokens against the same state of the index.
+
+        :param token_values_list: list of token_data, as in is_revoked
+        :returns: list of booleans, in the same order
+
+        """
+        shapes = self._shapes
+        return [self._is_revoked(shapes, token_data)
+                for token_data in token_values_list]
 
 
 def build_token_values_v2(access, default_domain_id):
@@ -12,10 +12,17 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import sqlalchemy
+
+from keystone.assignment.backends import sql as assignment_sql
 from keystone.common import sql
+from keystone.contrib import oauth2
+from keystone.contrib.oauth2.backends import sql as oauth2_sql
 from keystone.contrib import roles
 from keystone import exception
 from keystone.i18n import _
+from keystone import identity
+from keystone.identity.backends import sql as identity_sql
 
 
 class Role(sql.ModelBase, sql.ModelDictMixin):
@@ -199,6 +206,49 @@ class Roles(roles.RolesDriver):
         with session.begin():
             session.delete(ref)
 
+    def list_authorized_organizations(self, user_id, application_id,
+                                      organization_ids=None):
+        session = sql.get_session()
+        query = session.query(RoleUser.organization_id, Role.id, Role.name,
+                              assignment_sql.Project)
+        query = query.join(Role, Role.id == RoleUser.role_id)
+        query = query.join(assignment_sql.Project,
+                           assignment_sql.Project.id == RoleUser.organization_id)
+        query = query.filter(RoleUser.user_id == user_id)
+        query = query.filter(RoleUser.application_id == application_id)
+
+        if organization_ids is None:
+            # only the organizations the user is a member of, directly or
+            # through a group
+            group_ids = session.query(
+                identity_sql.UserGroupMembership.group_id).filter_by(
+                    user_id=user_id)
+            RoleAssignment = assignment_sql.RoleAssignment
+            member_of = session.query(RoleAssignment.target_id).filter(
+                RoleAssignment.type.in_(
+                    [assignment_sql.AssignmentType.USER_PROJECT,
+                     assignment_sql.AssignmentType.GROUP_PROJECT]),
+                sqlalchemy.or_(RoleAssignment.actor_id == user_id,
+                               RoleAssignment.actor_id.in_(group_ids)))
+            query = query.filter(RoleUser.organization_id.in_(member_of))
+        elif organization_ids:
+            query = query.filter(
+                RoleUser.organization_id.in_(organization_ids))
+        else:
+            return []
+
+        organizations = []
+        organizations_by_id = {}
+        for organization_id, role_id, role_name, project_ref in query:
+            if organization_id not in organizations_by_id:
+                organization = project_ref.to_dict()
+                organization['roles'] = []
+                organizations.append(organization)
+                organizations_by_id[organization_id] = organization
+            organizations_by_id[organization_id]['roles'].append(
+                dict(id=role_id, name=role_name))
+        return organizations
+
     # ROLE-ORGANIZATION
     def list_role_organization_assignments(self, organization_id=None, 
                                            application_id=None):
@@ -307,6 +357,20 @@ class Roles(roles.RolesDriver):
         
         return [g.to_dict() for g in query]
 
+    def list_permissions_for_roles(self, role_ids):
+        permissions = dict((role_id, []) for role_id in role_ids)
+        if not role_ids:
+            return permissions
+        session = sql.get_session()
+        query = session.query(RolePermission.role_id, Permission)
+        query = query.join(Permission,
+                           Permission.id == RolePermission.permission_id)
+        query = query.filter(RolePermission.role_id.in_(role_ids))
+
+        for role_id, permission_ref in query:
+            permissions[role_id].append(permission_ref.to_dict())
+        return permissions
+
     def add_permission_to_role(self, role_id, permission_id):
         session = sql.get_session()
         self.get_role(role_id)
@@ -336,8 +400,33 @@ class Roles(roles.RolesDriver):
         with session.begin():
             session.delete(ref)
 
-
-    
-
-    
-            
\ No newline at end of file
+    # OAUTH2 TOKEN VALIDATION
+    def get_access_token_info(self, access_token_id):
+        session = sql.get_session()
+        query = session.query(oauth2_sql.AccessToken, oauth2_sql.Consumer,
+                              identity_sql.User)
+        query = query.join(
+            oauth2_sql.Consumer,
+            oauth2_sql.Consumer.id == oauth2_sql.AccessToken.consumer_id)
+        query = query.outerjoin(
+            identity_sql.User,
+            identity_sql.User.id == oauth2_sql.AccessToken.authorizing_user_id)
+        query = query.filter(oauth2_sql.AccessToken.id == access_token_id)
+        result = query.first()
+        if result is None:
+            msg = _('Access Token %s not found') % access_token_id
+            raise exception.NotFound(message=msg)
+
+        access_token_ref, consumer_ref, user_ref = result
+        user = None
+        if access_token_ref.authorizing_user_id:
+            if user_ref is None:
+                raise exception.UserNotFound(
+                    user_id=access_token_ref.authorizing_user_id)
+            user = identity.filter_user(user_ref.to_dict())
+
+        return {
+            'access_token': access_token_ref.to_dict(),
+            'consumer': oauth2.filter_consumer(consumer_ref.to_dict()),
+            'user': user,
+        }
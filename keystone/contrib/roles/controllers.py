@@ -13,7 +13,8 @@
 # under the License.
 
 import itertools
-import datetime
+
+from oslo.utils import timeutils
 
 from keystone.common import authorization
 from keystone import exception
@@ -430,10 +431,11 @@ class FiwareApiControllerV3(BaseControllerV3):
             See https://github.com/ging/fi-ware-idm/wiki/Using-the-FI-LAB-instance\
             #get-user-information-and-roles
         """
-        # TODO(garcianavalon) check if token is valid, use user_id to filter in get
-        token = self.oauth2_api.get_access_token(token_id)
+        # NOTE(garcianavalon) the token info is cached, don't modify it
+        token_info = self.roles_api.get_oauth2_token_info(token_id)
+        token = token_info['access_token']
         application_id = token['consumer_id']
-        application = self.oauth2_api.get_consumer(application_id)
+        application = token_info['consumer']
 
         if not token['authorizing_user_id']:
             # Client Credentials Grant
@@ -441,23 +443,22 @@ class FiwareApiControllerV3(BaseControllerV3):
             return {
             }
 
-        if not token['valid'] or datetime.datetime.strptime(token['expires_at'], '%Y-%m-%d %H:%M:%S') < datetime.datetime.today():
+        if not token['valid'] or token['expires_at'] < timeutils.utcnow():
             raise exception.Unauthorized
             
-        user = self.identity_api.get_user(token['authorizing_user_id'])
-        
-        organizations = self.roles_api.get_authorized_organizations(
-            user, application_id)
+        user = token_info['user']
 
         # remove the default organization and extract its roles
         user_roles = []
+        organizations = token_info['organizations']
         user_organization = next((org for org in organizations 
-            if org['id'] == user['default_project_id']), None)
+            if org['id'] == user.get('default_project_id')), None)
 
         if user_organization:
-            organizations.remove(user_organization)
+            organizations = [org for org in organizations
+                             if org is not user_organization]
             # extract the user-scoped roles
-            user_roles = user_organization.pop('roles') 
+            user_roles = user_organization['roles']
 
         def _get_name(user):
             name = user.get('username')
@@ -13,17 +13,24 @@
 # under the License.
 
 import abc
+import time
+
 import six
 
+from keystone import config
 from keystone import exception
 from keystone import notifications
+from keystone.common import cache
 from keystone.common import dependency
 from keystone.common import extension
 from keystone.common import manager
 from keystone.openstack.common import log
 
 
+CONF = config.CONF
 LOG = log.getLogger(__name__)
+SHOULD_CACHE = cache.should_cache_fn('roles')
+EXPIRATION_TIME = lambda: CONF.roles.cache_time
 
 EXTENSION_DATA = {
     'name': 'UPM-FIWARE Roles API',
@@ -50,7 +57,115 @@ ASSIGN_INTERNAL_ROLES_PERMISSION = 'Get and assign all internal application role
 MANAGE_APPLICATION_PERMISSION = 'Manage the application'
 MANAGE_ROLES_PERMISSION = 'Manage roles'
 
-@dependency.requires('assignment_api')
+
+class PermissionIndex(object):
+    """In-process index of the data behind the allowed-* checks.
+
+    Keeps, for every role it has seen, the names of its internal
+    permissions and, for every application, the ids of its roles, so the
+    allowed roles and applications of an actor can be computed without
+    querying the backend once per role. Entries are loaded lazily in
+    batches and dropped by the manager whenever a role, a permission or
+    an application changes. The whole index is discarded after ``ttl``
+    seconds to bound staleness with respect to other processes.
+
+    """
+
+    def __init__(self, driver, ttl=None):
+        self.driver = driver
+        self.ttl = ttl
+        self.clear()
+
+    def clear(self):
+        # role_id -> list of internal permission names
+        self._role_permissions = {}
+        # permission_id -> set of role_ids holding it
+        self._permission_roles = {}
+        # application_id -> list of role_ids
+        self._application_roles = {}
+        self._internal_roles = None
+        self._built_at = time.time()
+
+    def _check_expiry(self):
+        if self.ttl and time.time() - self._built_at > self.ttl:
+            self.clear()
+
+    def get_internal_permissions(self, role_ids):
+        """Return a dict mapping each role id to its internal permissions."""
+        self._check_expiry()
+        missing = [role_id for role_id in set(role_ids)
+                   if role_id not in self._role_permissions]
+        if missing:
+            refs = self.driver.list_permissions_for_roles(missing)
+            for role_id in missing:
+                permissions = refs.get(role_id, [])
+                self._role_permissions[role_id] = [
+                    p['name'] for p in permissions if p['is_internal']]
+                for p in permissions:
+                    self._permission_roles.setdefault(
+                        p['id'], set()).add(role_id)
+        return dict((role_id, self._role_permissions[role_id])
+                    for role_id in role_ids)
+
+    def get_application_roles(self, application_id):
+        """Return the ids of all the roles of an application."""
+        self._check_expiry()
+        if application_id not in self._application_roles:
+            self._application_roles[application_id] = [
+                r['id'] for r
+                in self.driver.list_roles(application_id=application_id)]
+        return list(self._application_roles[application_id])
+
+    def get_internal_roles(self):
+        """Return the ids of all the internal roles."""
+        self._check_expiry()
+        if self._internal_roles is None:
+            self._internal_roles = [
+                r['id'] for r in self.driver.list_roles(is_internal=True)]
+        return list(self._internal_roles)
+
+    def add_role(self, role_ref):
+        """Index a role that has just been created, without permissions."""
+        self._role_permissions[role_ref['id']] = []
+        application_roles = self._application_roles.get(
+            role_ref['application_id'])
+        if application_roles is not None:
+            application_roles.append(role_ref['id'])
+        if (self._internal_roles is not None
+                and role_ref.get('is_internal')):
+            self._internal_roles.append(role_ref['id'])
+
+    def invalidate_role(self, role_id):
+        """Drop everything known about a role.
+
+        The applications the role belonged to and the internal role list
+        are dropped as well so that they are reloaded on next access.
+
+        """
+        self._role_permissions.pop(role_id, None)
+        for role_ids in six.itervalues(self._permission_roles):
+            role_ids.discard(role_id)
+        for application_id, role_ids in list(
+                six.iteritems(self._application_roles)):
+            if role_id in role_ids:
+                del self._application_roles[application_id]
+        self._internal_roles = None
+
+    def invalidate_role_permissions(self, role_id):
+        """Drop the cached permissions of a role."""
+        self._role_permissions.pop(role_id, None)
+
+    def invalidate_permission(self, permission_id):
+        """Drop the cached permissions of every role holding a permission."""
+        for role_id in self._permission_roles.pop(permission_id, ()):
+            self._role_permissions.pop(role_id, None)
+
+    def invalidate_application(self, application_id):
+        """Drop the cached role list of an application."""
+        self._application_roles.pop(application_id, None)
+
+
+@dependency.requires('assignment_api', 'identity_api', 'oauth2_api')
 @dependency.provider('roles_api')
 class RolesManager(manager.Manager):
     """Roles and Permissions Manager.
@@ -63,16 +178,105 @@ class RolesManager(manager.Manager):
     def __init__(self):
 
         self.event_callbacks = {
+            notifications.ACTIONS.created: {
+                notifications.role_assignment.ROLE_ASSIGNMENT: [
+                    self._role_assignment_callback],
+            },
+            notifications.ACTIONS.updated: {
+                'user': [self._user_callback],
+                'project': [self._organization_callback],
+            },
             notifications.ACTIONS.deleted: {
+                notifications.role_assignment.ROLE_ASSIGNMENT: [
+                    self._role_assignment_callback],
                 'user': [self.delete_user_assignments],
                 'project': [self.delete_organization_assignments],
                 'consumer_oauth2':[self.delete_application_resources]
             },
+            notifications.ACTIONS.internal: {
+                notifications.INVALIDATE_OAUTH2_ACCESS_TOKENS: [
+                    self._invalidate_access_tokens_callback],
+                notifications.INVALIDATE_USER_TOKEN_PERSISTENCE: [
+                    self._user_callback],
+                notifications.INVALIDATE_USER_EFFECTIVE_ROLES: [
+                    self._user_callback],
+            },
         }
 
         super(RolesManager, self).__init__(
             'keystone.contrib.roles.backends.sql.Roles')
 
+        self.permission_index = None
+        if CONF.roles.permission_index:
+            self.permission_index = PermissionIndex(
+                self.driver, ttl=CONF.roles.permission_index_ttl)
+
+    # ROLES
+    def create_role(self, role):
+        role_ref = self.driver.create_role(role)
+        if self.permission_index:
+            self.permission_index.add_role(role_ref)
+        return role_ref
+
+    def update_role(self, role_id, role):
+        role_ref = self.driver.update_role(role_id, role)
+        if self.permission_index:
+            self.permission_index.invalidate_role(role_id)
+            self.permission_index.invalidate_application(
+                role_ref['application_id'])
+        # NOTE(garcianavalon) the role names are part of the cached token
+        # info of every user holding the role
+        assignments = self.driver.list_role_user_assignments(
+            application_id=role_ref['application_id'])
+        self._invalidate_assignments_oauth2_token_info(
+            [a for a in assignments if a['role_id'] == role_id])
+        return role_ref
+
+    def delete_role(self, role_id):
+        self.driver.delete_role(role_id)
+        if self.permission_index:
+            self.permission_index.invalidate_role(role_id)
+
+    # PERMISSIONS
+    def update_permission(self, permission_id, permission):
+        permission_ref = self.driver.update_permission(
+            permission_id, permission)
+        if self.permission_index:
+            self.permission_index.invalidate_permission(permission_id)
+        return permission_ref
+
+    def delete_permission(self, permission_id):
+        self.driver.delete_permission(permission_id)
+        if self.permission_index:
+            self.permission_index.invalidate_permission(permission_id)
+
+    def add_permission_to_role(self, role_id, permission_id):
+        self.driver.add_permission_to_role(role_id, permission_id)
+        if self.permission_index:
+            self.permission_index.invalidate_role_permissions(role_id)
+
+    def remove_permission_from_role(self, role_id, permission_id):
+        self.driver.remove_permission_from_role(role_id, permission_id)
+        if self.permission_index:
+            self.permission_index.invalidate_role_permissions(role_id)
+
+    # ROLE-USER
+    def add_role_to_user(self, role_id, user_id, organization_id,
+                         application_id):
+        response = self.driver.add_role_to_user(
+            role_id, user_id, organization_id, application_id)
+        self._invalidate_user_oauth2_token_info(user_id, application_id)
+        return response
+
+    def remove_role_from_user(self, role_id, user_id, organization_id,
+                              application_id, check_ids=True):
+        response = self.driver.remove_role_from_user(
+            role_id, user_id, organization_id, application_id,
+            check_ids=check_ids)
+        self._invalidate_user_oauth2_token_info(user_id, application_id)
+        return response
+
+    # ROLE-ORGANIZATION
     def remove_role_from_organization(self, role_id,  
                                       organization_id, application_id,
                                       check_ids=True):
@@ -118,6 +322,11 @@ class RolesManager(manager.Manager):
         for permission in permissions:
             self.driver.delete_permission(permission['id'])
 
+        if self.permission_index:
+            self.permission_index.invalidate_application(app_id)
+            for role in roles:
+                self.permission_index.invalidate_role(role['id'])
+
 
     def delete_user_assignments(self, service, resource_type, operation,
                                 payload):
@@ -125,6 +334,7 @@ class RolesManager(manager.Manager):
         assignments = self.driver.list_role_user_assignments(
             user_id=user_id)
         self._delete_user_assignments(assignments)
+        self._invalidate_user_oauth2_token_info(user_id)
 
 
     def delete_organization_assignments(self, service, resource_type, 
@@ -148,6 +358,8 @@ class RolesManager(manager.Manager):
                 application_id=assignment['application_id'],
                 check_ids=False)
 
+        self._invalidate_assignments_oauth2_token_info(assignments)
+
 
     def _delete_organization_assignments(self, assignments):
         for assignment in assignments:
@@ -161,31 +373,97 @@ class RolesManager(manager.Manager):
     def get_authorized_organizations(self, user, 
                                     application_id,
                                     remove_default_organization=False):
-        # roles associated with this user in the application
-        assignments = self.driver.list_role_user_assignments(
-            user_id=user['id'], application_id=application_id)
-
-        # organizations the user is in
-        organizations = self.assignment_api.list_projects_for_user(user['id'])
-
-        # filter to only organizations with roles
-        organizations = [org for org in organizations 
-            if org['id'] in [a['organization_id'] for a in assignments]]
-
-        for organization in organizations:
-            role_ids = [a['role_id'] for a in assignments 
-                        if a['organization_id'] == organization['id']]            
-            # Load roles' names
-            organization['roles'] = [dict(id=r['id'], name=r['name']) for r
-                    in [self.driver.get_role(id) for id in role_ids]]
+        """List the organizations the user is a member of in which it has
+        roles in the application, each one with the list of those roles.
+        """
+        organization_ids = None
+        if CONF.os_inherit.enabled:
+            # NOTE(garcianavalon) inherited roles make the user a member
+            # of every project in a domain, let the assignment backend
+            # resolve them
+            organization_ids = [
+                org['id'] for org
+                in self.assignment_api.list_projects_for_user(user['id'])]
+
+        organizations = self.driver.list_authorized_organizations(
+            user['id'], application_id, organization_ids=organization_ids)
 
         if remove_default_organization:
             # always remove the default org
             organizations = [org for org in organizations 
-                if not org['id'] == user['default_project_id']]
+                if not org['id'] == user.get('default_project_id')]
 
         return organizations
 
+    @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
+                        expiration_time=EXPIRATION_TIME)
+    def get_oauth2_token_info(self, access_token_id):
+        """Resolve an OAuth2 access token into everything needed to
+        validate it: the token, its consumer, the authorizing user and the
+        organizations in which that user has roles in the consumer.
+
+        The result is cached by token id. Validity and expiration are part
+        of the result, so they must be checked by the caller on every use.
+
+        :param access_token_id: the access_token_id (the string itself)
+        :type access_token_id: string
+        :returns: dict with the access_token, consumer, user and
+            organizations keys. user is None for tokens issued with
+            the client credentials grant.
+        """
+        token_info = self.driver.get_access_token_info(access_token_id)
+        token_info['organizations'] = []
+        if token_info['user']:
+            token_info['organizations'] = self.get_authorized_organizations(
+                token_info['user'], token_info['access_token']['consumer_id'])
+        return token_info
+
+    def _invalidate_access_tokens_callback(self, service, resource_type,
+                                           operation, payload):
+        self._invalidate_oauth2_token_info(payload['resource_info'])
+
+    def _invalidate_oauth2_token_info(self, access_token_ids):
+        # NOTE(garcianavalon) ``self`` needs to be passed to invalidate()
+        # because of the way the cache keys are generated.
+        for access_token_id in access_token_ids:
+            self.get_oauth2_token_info.invalidate(self, access_token_id)
+
+    def _invalidate_user_oauth2_token_info(self, user_id,
+                                           application_id=None):
+        access_tokens = self.oauth2_api.list_access_tokens(
+            user_id=user_id, consumer_id=application_id)
+        self._invalidate_oauth2_token_info([t['id'] for t in access_tokens])
+
+    def _invalidate_assignments_oauth2_token_info(self, assignments):
+        for user_id, application_id in set(
+                (a['user_id'], a['application_id']) for a in assignments):
+            self._invalidate_user_oauth2_token_info(user_id, application_id)
+
+    def _role_assignment_callback(self, service, resource_type, operation,
+                                  payload):
+        # NOTE(garcianavalon) the keystone grants make the users members of
+        # the organizations listed in the token info
+        assignment = payload['resource_info']
+        if assignment['user_id']:
+            self._invalidate_user_oauth2_token_info(assignment['user_id'])
+            return
+        group_id = assignment['group_id']
+        try:
+            user_ids = self.identity_api.list_user_ids_in_groups(
+                [group_id]).get(group_id, [])
+        except exception.GroupNotFound:
+            return
+        for user_id in user_ids:
+            self._invalidate_user_oauth2_token_info(user_id)
+
+    def _user_callback(self, service, resource_type, operation, payload):
+        self._invalidate_user_oauth2_token_info(payload['resource_info'])
+
+    def _organization_callback(self, service, resource_type, operation,
+                               payload):
+        self._invalidate_assignments_oauth2_token_info(
+            self.driver.list_role_user_assignments(
+                organization_id=payload['resource_info']))
 
     def list_applications_user_allowed_to_manage_roles(self, user_id, 
                                                        organization_id):
@@ -255,17 +533,22 @@ class RolesManager(manager.Manager):
         return self._get_allowed_roles(assignments)
         
     def _get_all_internal_permissions(self, current_assignments):
-        applications = set([a['application_id'] for a in current_assignments])
+        role_ids = set([a['role_id'] for a in current_assignments])
+        if self.permission_index:
+            role_permissions = self.permission_index.get_internal_permissions(
+                role_ids)
+        else:
+            role_permissions = dict(
+                (role_id, [p['name'] for p in permissions
+                           if p['is_internal'] == True])
+                for role_id, permissions in six.iteritems(
+                    self.driver.list_permissions_for_roles(role_ids)))
+
         permissions = {}
-        for application_id in applications:
-            owned_roles = [a['role_id'] for a in current_assignments
-                           if a['application_id'] == application_id]
-            permissions[application_id] = []
-            for role_id in owned_roles:
-                permissions[application_id] += \
-                    [p['name'] for p in 
-                     self.driver.list_permissions_for_role(role_id)
-                     if p['is_internal'] == True]
+        for assignment in current_assignments:
+            permissions.setdefault(assignment['application_id'], [])
+            permissions[assignment['application_id']] += \
+                role_permissions[assignment['role_id']]
         return permissions
 
     def _get_allowed_applications_manage_roles(self, current_assignments):
@@ -304,8 +587,7 @@ class RolesManager(manager.Manager):
             # Now check if the internal permissions are present
             if ASSIGN_ALL_PUBLIC_ROLES_PERMISSION in permissions:
                 # add all public roles in the application
-                roles_to_add += set([r['id'] for r 
-                    in self.driver.list_roles(application_id=application)])
+                roles_to_add += self._list_application_role_ids(application)
 
             elif ASSIGN_OWNED_PUBLIC_ROLES_PERMISSION in permissions:
                 # add only the public roles the user has in the application
@@ -315,14 +597,24 @@ class RolesManager(manager.Manager):
 
             # Add the internal permissions if necesary
             if ASSIGN_INTERNAL_ROLES_PERMISSION in permissions:
-                roles_to_add += [r['id'] for r 
-                    in self.driver.list_roles(is_internal=True)]
+                roles_to_add += self._list_internal_role_ids()
 
             if roles_to_add:
                 allowed_roles[application] = roles_to_add
 
         return allowed_roles
 
+    def _list_application_role_ids(self, application_id):
+        if self.permission_index:
+            return self.permission_index.get_application_roles(application_id)
+        return list(set([r['id'] for r
+            in self.driver.list_roles(application_id=application_id)]))
+
+    def _list_internal_role_ids(self):
+        if self.permission_index:
+            return self.permission_index.get_internal_roles()
+        return [r['id'] for r in self.driver.list_roles(is_internal=True)]
+
 
 @dependency.requires('assignment_api', 'identity_api', 'oauth2_api')
 @six.add_metaclass(abc.ABCMeta)
@@ -446,6 +738,24 @@ class RolesDriver(object):
         """
         raise exception.NotImplemented()
 
+    @abc.abstractmethod
+    def list_authorized_organizations(self, user_id, application_id,
+                                      organization_ids=None):
+        """List the organizations in which a user has roles in an
+        application, together with the id and name of those roles.
+
+        :param user_id: user with roles
+        :type user_id: string
+        :param application_id: application in which the roles were assigned
+        :type application_id: string
+        :param organization_ids: organizations the user is a member of. If
+            not provided, membership is resolved by the backend from the
+            direct and group project assignments of the user
+        :type organization_ids: list
+        :returns: list of organizations, each one with a 'roles' key
+        """
+        raise exception.NotImplemented()
+
     # ROLE-ORGANIZATION
     @abc.abstractmethod
     def list_role_organization_assignments(self, organization_id=None, 
@@ -562,6 +872,18 @@ class RolesDriver(object):
         """
         raise exception.NotImplemented()
 
+    @abc.abstractmethod
+    def list_permissions_for_roles(self, role_ids):
+        """List the permissions of several roles at once.
+
+        :param role_ids: ids of the roles to list permissions for
+        :type role_ids: list
+        :returns: dictionary with the role ids as keys and the list of
+            permissions of each role as values
+
+        """
+        raise exception.NotImplemented()
+
     @abc.abstractmethod
     def add_permission_to_role(self, role_id, permission_id):
         """Delete role.
@@ -588,3 +910,17 @@ class RolesDriver(object):
         """
         raise exception.NotImplemented()
 
+    # OAUTH2 TOKEN VALIDATION
+    @abc.abstractmethod
+    def get_access_token_info(self, access_token_id):
+        """Get an OAuth2 access token together with its consumer and its
+        authorizing user.
+
+        :param access_token_id: the access_token_id (the string itself)
+        :type access_token_id: string
+        :returns: dict with the access_token, consumer and user keys. The
+            consumer secret is never returned and user is None if the token
+            has no authorizing user.
+
+        """
+        raise exception.NotImplemented()
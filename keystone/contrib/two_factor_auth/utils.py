@@ -15,6 +15,7 @@
 import passlib.hash
 
 from keystone.common import config
+from keystone.common import utils
 from keystone import exception
 from keystone.openstack.common import log
 from keystone.i18n import _
@@ -49,8 +50,9 @@ def hash_two_factor_security_answer(two_factor_auth):
 def hash_security_answer(security_answer):
     """Hash a security_answer. Hard."""
     security_answer_utf8 = verify_length_and_trunc_security_answer(security_answer).encode('utf-8')
-    return passlib.hash.sha512_crypt.encrypt(
-        security_answer_utf8, rounds=config.CONF.crypt_strength)
+    return utils.crypt_pool.execute(passlib.hash.sha512_crypt.encrypt,
+                                    security_answer_utf8,
+                                    rounds=config.CONF.crypt_strength)
 
 def check_security_answer(security_answer, hashed):
     """Check that a plaintext security_answer matches hashed.
@@ -62,4 +64,5 @@ def check_security_answer(security_answer, hashed):
     if security_answer is None or hashed is None:
         return False
     security_answer_utf8 = verify_length_and_trunc_security_answer(security_answer).encode('utf-8')
-    return passlib.hash.sha512_crypt.verify(security_answer_utf8, hashed)
+    return utils.crypt_pool.execute(passlib.hash.sha512_crypt.verify,
+                                    security_answer_utf8, hashed)
@@ -78,7 +78,7 @@ class Identity(identity.Driver):
         return self.user.get_filtered(user_id)
 
     def list_users(self, hints):
-        return self.user.get_all_filtered()
+        return self.user.get_all_filtered(hints)
 
     def get_user_by_name(self, user_name, domain_id):
         # domain_id will already have been handled in the Manager layer,
@@ -155,7 +155,8 @@ class Identity(identity.Driver):
         return self.group.list_user_groups_filtered(user_dn)
 
     def list_groups(self, hints):
-        return self.group.get_all_filtered()
+        return self.group.get_all_filtered(
+            query=self.group.filter_query(hints))
 
     def list_users_in_group(self, group_id, hints):
         users = []
@@ -258,8 +259,9 @@ class UserApi(common_ldap.EnabledEmuMixIn, common_ldap.BaseLdap):
         user = self.get(user_id)
         return self.filter_attributes(user)
 
-    def get_all_filtered(self):
-        return [self.filter_attributes(user) for user in self.get_all()]
+    def get_all_filtered(self, hints=None):
+        query = self.filter_query(hints)
+        return [self.filter_attributes(user) for user in self.get_all(query)]
 
     def filter_attributes(self, user):
         return identity.filter_user(common_ldap.filter_entity(user))
@@ -20,6 +20,7 @@ from keystone import config
 from keystone import exception
 from keystone.i18n import _
 from keystone import identity
+from keystone.openstack.common import log
 
 # Import assignment sql to ensure that the models defined in there are
 # available for the reference from User and Group to Domain.id.
@@ -27,6 +28,7 @@ from keystone.assignment.backends import sql as assignment_sql  # noqa
 
 
 CONF = config.CONF
+LOG = log.getLogger(__name__)
 
 
 class User(sql.ModelBase, sql.DictBase):
@@ -34,8 +36,8 @@ class User(sql.ModelBase, sql.DictBase):
     attributes = ['id', 'name', 'domain_id', 'password', 'enabled',
                   'default_project_id', 'username']
     id = sql.Column(sql.String(64), primary_key=True)
-    name = sql.Column(sql.String(255), nullable=False)
-    username = sql.Column(sql.String(255), nullable=True)
+    name = sql.Column(sql.String(255), nullable=False, index=True)
+    username = sql.Column(sql.String(255), nullable=True, index=True)
     domain_id = sql.Column(sql.String(64), sql.ForeignKey('domain.id'),
                            nullable=False)
     password = sql.Column(sql.String(128))
@@ -57,7 +59,7 @@ class Group(sql.ModelBase, sql.DictBase):
     __tablename__ = 'group'
     attributes = ['id', 'name', 'domain_id', 'description']
     id = sql.Column(sql.String(64), primary_key=True)
-    name = sql.Column(sql.String(64), nullable=False)
+    name = sql.Column(sql.String(64), nullable=False, index=True)
     domain_id = sql.Column(sql.String(64), sql.ForeignKey('domain.id'),
                            nullable=False)
     description = sql.Column(sql.Text())
@@ -87,13 +89,15 @@ class Identity(identity.Driver):
     def default_assignment_driver(self):
         return "keystone.assignment.backends.sql.Assignment"
 
-    def generate_slug(self, name):
+    def generate_slug(self, name, taken=()):
         slug = slugify(name)
         session = sql.get_session()
         with session.begin():
             query = session.query(User)
             query = query.filter(User.id.like(slug+'%'))
             ids = [u.id for u in query.all()]
+        # NOTE(garcianavalon) ids handed out but not stored yet
+        ids.extend(x for x in taken if x.startswith(slug))
 
         if len(ids) == 0:
             return slug
@@ -107,6 +111,30 @@ class Identity(identity.Driver):
 
         return slug
 
+    def generate_slugs(self, names):
+        """Generate the ids of several new users, see generate_slug.
+
+        The slugs are checked with a single query, and only those already
+        taken, in the database or by a previous name, cost another one.
+
+        """
+        if not names:
+            return []
+        slugs = [slugify(name) for name in names]
+        session = sql.get_session()
+        with session.begin():
+            query = session.query(User.id)
+            query = query.filter(User.id.in_(set(slugs)))
+            taken = set(row.id for row in query.all())
+
+        ids = []
+        for name, slug in zip(names, slugs):
+            if slug in taken:
+                slug = self.generate_slug(name, taken)
+            taken.add(slug)
+            ids.append(slug)
+        return ids
+
     @property
     def is_sql(self):
         return True
@@ -120,7 +148,20 @@ class Identity(identity.Driver):
         https://blueprints.launchpad.net/keystone/+spec/sql-identiy-pam
 
         """
-        return utils.check_password(password, user_ref.password)
+        verified_passwords = identity.get_verified_password_cache()
+        if (verified_passwords is None or password is None or
+                user_ref.password is None):
+            return utils.check_password(password, user_ref.password)
+
+        password = utils.verify_length_and_trunc_password(password)
+
+        if verified_passwords.check(user_ref.id, password, user_ref.password):
+            LOG.debug('Password of user %s verified from cache', user_ref.id)
+            return True
+        if not utils.check_password(password, user_ref.password):
+            return False
+        verified_passwords.set(user_ref.id, password, user_ref.password)
+        return True
 
     # Identity interface
     def authenticate(self, user_id, password):
@@ -145,6 +186,16 @@ class Identity(identity.Driver):
             session.add(user_ref)
         return identity.filter_user(user_ref.to_dict())
 
+    @sql.handle_conflicts(conflict_type='user')
+    def create_users(self, users):
+        users = utils.hash_user_passwords(users)
+        session = sql.get_session()
+        with session.begin():
+            user_refs = [User.from_dict(user) for user in users]
+            session.add_all(user_refs)
+        return [identity.filter_user(user_ref.to_dict())
+                for user_ref in user_refs]
+
     @sql.truncated
     def list_users(self, hints):
         session = sql.get_session()
@@ -263,6 +314,16 @@ class Identity(identity.Driver):
 
         return [identity.filter_user(u.to_dict()) for u in query]
 
+    def list_user_ids_in_groups(self, group_ids):
+        members = dict((group_id, []) for group_id in group_ids)
+        session = sql.get_session()
+        query = session.query(UserGroupMembership.user_id,
+                              UserGroupMembership.group_id)
+        query = query.filter(UserGroupMembership.group_id.in_(group_ids))
+        for user_id, group_id in query:
+            members[group_id].append(user_id)
+        return members
+
     def delete_user(self, user_id):
         session = sql.get_session()
 
@@ -15,8 +15,12 @@
 """Main entry point into the Identity service."""
 
 import abc
+import collections
 import functools
+import hashlib
+import hmac
 import os
+import time
 import uuid
 
 from oslo.config import cfg
@@ -27,6 +31,7 @@ from keystone import clean
 from keystone.common import dependency
 from keystone.common import driver_hints
 from keystone.common import manager
+from keystone.common import utils
 from keystone import config
 from keystone import exception
 from keystone.i18n import _
@@ -66,6 +71,68 @@ def filter_user(user_ref):
     return user_ref
 
 
+class VerifiedPasswordCache(object):
+    """Remember the recent successful password verifications.
+
+    Only an HMAC of the user id, the password and the stored password hash is
+    kept, keyed with a secret generated for this process, so the plaintext
+    can't be recovered and changing the password anywhere makes the entry
+    useless. Entries expire after ``ttl`` seconds and the least recently used
+    ones are dropped beyond ``size``.
+
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._secret = os.urandom(32)
+        self._entries = collections.OrderedDict()
+
+    def _digest(self, user_id, password, hashed):
+        parts = [part.encode('utf-8') if isinstance(part, six.text_type)
+                 else part for part in (user_id, password, hashed)]
+        return hmac.new(self._secret, b'\0'.join(parts),
+                        hashlib.sha256).hexdigest()
+
+    def check(self, user_id, password, hashed):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return False
+        digest, valid_until = entry
+        if time.time() >= valid_until:
+            return False
+        self._entries[user_id] = entry
+        return utils.auth_str_equal(self._digest(user_id, password, hashed),
+                                    digest)
+
+    def set(self, user_id, password, hashed):
+        self._entries.pop(user_id, None)
+        self._entries[user_id] = (self._digest(user_id, password, hashed),
+                                  time.time() + self.ttl)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        self._entries.pop(user_id, None)
+
+
+_VERIFIED_PASSWORDS = None
+
+
+def get_verified_password_cache():
+    """Return the process wide cache of verified passwords, if enabled."""
+    global _VERIFIED_PASSWORDS
+    size = CONF.identity.verified_password_cache_size
+    if size <= 0:
+        return None
+    if (_VERIFIED_PASSWORDS is None or _VERIFIED_PASSWORDS.size != size or
+            _VERIFIED_PASSWORDS.ttl !=
+            CONF.identity.verified_password_cache_time):
+        _VERIFIED_PASSWORDS = VerifiedPasswordCache(
+            size, CONF.identity.verified_password_cache_time)
+    return _VERIFIED_PASSWORDS
+
+
 class DomainConfigs(dict):
     """Discover, store and provide access to domain specific configs.
 
@@ -271,9 +338,24 @@ class Manager(manager.Manager):
     _GROUP = 'group'
 
     def __init__(self):
+        self.event_callbacks = {
+            notifications.ACTIONS.deleted: {
+                self._USER: [self._invalidate_verified_password_callback],
+            },
+            notifications.ACTIONS.internal: {
+                notifications.INVALIDATE_USER_TOKEN_PERSISTENCE: [
+                    self._invalidate_verified_password_callback],
+            },
+        }
         super(Manager, self).__init__(CONF.identity.driver)
         self.domain_configs = DomainConfigs()
 
+    def _invalidate_verified_password_callback(self, service, resource_type,
+                                               operation, payload):
+        verified_passwords = get_verified_password_cache()
+        if verified_passwords is not None:
+            verified_passwords.invalidate(payload['resource_info'])
+
     # Domain ID normalization methods
 
     def _set_domain_id_and_mapping(self, ref, domain_id, driver,
@@ -576,6 +658,56 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref, domain_id, driver, mapping.EntityType.USER)
 
+    @notifications.created(_USER, result_id_arg_attr='id', bulk=True)
+    @domains_configured
+    @exception_translated('user')
+    def create_users(self, user_refs):
+        """Create several users at once, see create_user.
+
+        The users of every domain are handed to its driver in a single call,
+        which the SQL driver stores in a single transaction, and one
+        notification is sent for all of them. Users given with an id, from
+        generate_user_ids, keep it.
+
+        :returns: list of the users created, in the order given
+
+        """
+        users = []
+        for user_ref in user_refs:
+            user = user_ref.copy()
+            user['name'] = clean.user_name(user['name'])
+            user.setdefault('enabled', True)
+            user['enabled'] = clean.user_enabled(user['enabled'])
+            users.append(user)
+        for domain_id in set(user['domain_id'] for user in users):
+            self.assignment_api.get_domain(domain_id)
+
+        without_id = [ref for ref in users if 'id' not in ref]
+        for user, user_id in zip(without_id,
+                                 self.generate_user_ids(without_id)):
+            user['id'] = user_id
+        indexes_by_domain = collections.OrderedDict()
+        for index, user in enumerate(users):
+            indexes_by_domain.setdefault(user['domain_id'], []).append(index)
+
+        refs = [None] * len(users)
+        for domain_id, indexes in six.iteritems(indexes_by_domain):
+            driver = self._select_identity_driver(domain_id)
+            created = driver.create_users(
+                [self._clear_domain_id_if_domain_unaware(driver, users[index])
+                 for index in indexes])
+            for index, ref in zip(indexes, created):
+                refs[index] = self._set_domain_id_and_mapping(
+                    ref, domain_id, driver, mapping.EntityType.USER)
+        return refs
+
+    def generate_user_ids(self, user_refs):
+        """Generate the ids create_user would give to several new users."""
+        # NOTE(garcianavalon) slugs of the username, or name, as create_user
+        return self.driver.generate_slugs(
+            [user.get('username', clean.user_name(user['name']))
+             for user in user_refs])
+
     @domains_configured
     @exception_translated('user')
     def get_user(self, user_id):
@@ -740,6 +872,7 @@ class Manager(manager.Manager):
             user_entity_id, user_driver, group_entity_id, group_driver)
 
         group_driver.add_user_to_group(user_entity_id, group_entity_id)
+        self._emit_invalidate_user_effective_roles(user_id)
 
     @domains_configured
     @exception_translated('group')
@@ -761,6 +894,19 @@ class Manager(manager.Manager):
         group_driver.remove_user_from_group(user_entity_id, group_entity_id)
         self.emit_invalidate_user_token_persistence(user_id)
 
+    @notifications.internal(notifications.INVALIDATE_USER_EFFECTIVE_ROLES)
+    def _emit_invalidate_user_effective_roles(self, user_id):
+        """Emit a notification to the callback system on user role changes.
+
+        This is used when the roles of the user change without a role
+        assignment being created or deleted, e.g. when the user is added to a
+        group.
+
+        :param user_id: user identifier
+        :type user_id: string
+        """
+        pass
+
     @notifications.internal(notifications.INVALIDATE_USER_TOKEN_PERSISTENCE)
     def emit_invalidate_user_token_persistence(self, user_id):
         """Emit a notification to the callback system to revoke user tokens.
@@ -821,6 +967,33 @@ class Manager(manager.Manager):
         return self._set_domain_id_and_mapping(
             ref_list, domain_id, driver, mapping.EntityType.USER)
 
+    @domains_configured
+    def list_user_ids_in_groups(self, group_ids):
+        """List the ids of the members of several groups at once.
+
+        Groups held by the default driver without any ID mapping are looked up
+        with a single driver call, any other group goes through
+        list_users_in_group.
+
+        :returns: a dict of lists of user ids, keyed by group id
+
+        """
+        members = {}
+        local_group_ids = []
+        for group_id in set(group_ids):
+            _domain_id, driver, entity_id = (
+                self._get_domain_driver_and_entity_id(group_id))
+            if (driver is self.driver and entity_id == group_id and
+                    not self._needs_post_processing(driver)):
+                local_group_ids.append(group_id)
+            else:
+                members[group_id] = [
+                    user['id'] for user in self.list_users_in_group(group_id)]
+        if local_group_ids:
+            members.update(
+                self.driver.list_user_ids_in_groups(local_group_ids))
+        return members
+
     @domains_configured
     @exception_translated('group')
     def check_user_in_group(self, user_id, group_id):
@@ -896,6 +1069,16 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def create_users(self, users):
+        """Creates several new users, in a single transaction if possible.
+
+        :param users: list of user dicts, with their ids already set
+        :returns: list of the users created, in the same order
+        :raises: keystone.exception.Conflict
+
+        """
+        return [self.create_user(user['id'], user) for user in users]
+
     @abc.abstractmethod
     def list_users(self, hints):
         """List users in the system.
@@ -921,6 +1104,22 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def list_user_ids_in_groups(self, group_ids):
+        """List the ids of the users in several groups.
+
+        Drivers able to fetch the memberships of many groups with a single
+        query should override this.
+
+        :param group_ids: the groups in question
+
+        :returns: a dict of lists of user ids, keyed by group id.
+
+        """
+        return dict(
+            (group_id, [user['id'] for user in self.list_users_in_group(
+                group_id, driver_hints.Hints())])
+            for group_id in group_ids)
+
     @abc.abstractmethod
     def get_user(self, user_id):
         """Get a user by ID.
@@ -82,6 +82,12 @@ except AttributeError:  # Python 2.6 support
 INVALIDATE_USER_TOKEN_PERSISTENCE = 'invalidate_user_tokens'
 INVALIDATE_USER_PROJECT_TOKEN_PERSISTENCE = 'invalidate_user_project_tokens'
 INVALIDATE_USER_OAUTH_CONSUMER_TOKENS = 'invalidate_user_consumer_tokens'
+INVALIDATE_OAUTH2_ACCESS_TOKENS = 'invalidate_oauth2_access_tokens'
+
+# NOTE(garcianavalon): Internal notification for the changes, such as a new
+# group membership, that alter the roles of a user without going through a
+# role assignment
+INVALIDATE_USER_EFFECTIVE_ROLES = 'invalidate_user_effective_roles'
 
 
 class ManagerNotificationWrapper(object):
@@ -95,15 +101,20 @@ class ManagerNotificationWrapper(object):
     :param public:  If True (default), the event will be sent to the notifier
                 API.  If False, the event will only be sent via
                 notify_event_callbacks to in process listeners
+    :param bulk: If True, the wrapped method returns a list of resources,
+                 identified by ``result_id_arg_attr``, which are notified in
+                 a single event, see _send_bulk_notification
 
     """
     def __init__(self, operation, resource_type, public=True,
-                 resource_id_arg_index=1, result_id_arg_attr=None):
+                 resource_id_arg_index=1, result_id_arg_attr=None,
+                 bulk=False):
         self.operation = operation
         self.resource_type = resource_type
         self.public = public
         self.resource_id_arg_index = resource_id_arg_index
         self.result_id_arg_attr = result_id_arg_attr
+        self.bulk = bulk
 
     def __call__(self, f):
         def wrapper(*args, **kwargs):
@@ -113,6 +124,13 @@ class ManagerNotificationWrapper(object):
             except Exception:
                 raise
             else:
+                if self.bulk:
+                    _send_bulk_notification(
+                        self.operation,
+                        self.resource_type,
+                        [ref[self.result_id_arg_attr] for ref in result],
+                        public=self.public)
+                    return result
                 if self.result_id_arg_attr is not None:
                     resource_id = result[self.result_id_arg_attr]
                 else:
@@ -269,6 +287,38 @@ def _send_notification(operation, resource_type, resource_id, public=True):
                     {'res_id': resource_id, 'event_type': event_type})
 
 
+def _send_bulk_notification(operation, resource_type, resource_ids,
+                            public=True):
+    """Send a single notification for several affected resources.
+
+    In process listeners are still called once per resource, with the same
+    payload as _send_notification, but the notifier API only gets one event
+    whose ``resource_info`` is the list of ids, so that creating thousands of
+    resources at once does not flood the message bus.
+
+    """
+    if not resource_ids:
+        return
+
+    for resource_id in resource_ids:
+        notify_event_callbacks('identity', resource_type, operation,
+                               {'resource_info': resource_id})
+
+    if public:
+        notifier = _get_notifier()
+        if notifier:
+            event_type = 'identity.%(resource_type)s.%(operation)s' % {
+                'resource_type': resource_type,
+                'operation': operation}
+            try:
+                notifier.info({}, event_type,
+                              {'resource_info': list(resource_ids)})
+            except Exception:
+                LOG.exception(_(
+                    'Failed to send %(count)d %(event_type)s notification'),
+                    {'count': len(resource_ids), 'event_type': event_type})
+
+
 def _get_request_audit_info(context, user_id=None):
     remote_addr = None
     http_user_agent = None
@@ -324,12 +374,16 @@ class CadfRoleAssignmentNotificationWrapper(object):
     Sends a CADF notification if the wrapped method does not raise an
     ``Exception`` (such as ``keystone.exception.NotFound``).
 
+    The event callbacks registered for ``role_assignment`` are notified as
+    well, with the role, actor and target of the assignment as payload.
+
     :param operation: one of the values from ACTIONS (create or delete)
     """
 
     ROLE_ASSIGNMENT = 'role_assignment'
 
     def __init__(self, operation):
+        self.action = operation
         self.operation = "%s.%s" % (operation, self.ROLE_ASSIGNMENT)
 
     def __call__(self, f):
@@ -395,11 +449,47 @@ class CadfRoleAssignmentNotificationWrapper(object):
                 _send_audit_notification(self.operation, initiator,
                                          taxonomy.OUTCOME_SUCCESS,
                                          **audit_kwargs)
+                assignment = dict(
+                    (key, call_args[key]) for key in (
+                        'user_id', 'group_id', 'domain_id', 'project_id',
+                        'inherited_to_projects'))
+                assignment['role_id'] = role_id
+                notify_event_callbacks('identity', self.ROLE_ASSIGNMENT,
+                                       self.action,
+                                       {'resource_info': assignment})
                 return result
 
         return wrapper
 
 
+def send_role_assignments_notification(operation, context, assignments):
+    """Send the notifications of several role assignments at once.
+
+    The event callbacks registered for ``role_assignment`` are notified of
+    each assignment, as CadfRoleAssignmentNotificationWrapper does, but a
+    single CADF event carrying the list of assignments is sent.
+
+    :param operation: one of the values from ACTIONS (create or delete)
+    :param context: the request context, to audit the initiator
+    :param assignments: list of dicts with the ``role_id``, ``user_id``,
+                        ``group_id``, ``domain_id``, ``project_id`` and
+                        ``inherited_to_projects`` of every assignment
+
+    """
+    if not assignments:
+        return
+
+    resource_type = CadfRoleAssignmentNotificationWrapper.ROLE_ASSIGNMENT
+    for assignment in assignments:
+        notify_event_callbacks('identity', resource_type, operation,
+                               {'resource_info': assignment})
+
+    initiator = _get_request_audit_info(context)
+    _send_audit_notification('%s.%s' % (operation, resource_type),
+                             initiator, taxonomy.OUTCOME_SUCCESS,
+                             role_assignments=assignments)
+
+
 def send_saml_audit_notification(action, context, user_id, group_ids,
                                  identity_provider, protocol, token_id,
                                  outcome):
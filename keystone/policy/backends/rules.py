@@ -15,11 +15,18 @@
 
 """Policy engine for keystone"""
 
+import ast
 import os.path
+import re
+import threading
+import time
+
+import six
 
 from keystone.common import utils
 from keystone import config
 from keystone import exception
+from keystone.i18n import _LE
 from keystone.openstack.common import log
 from keystone.openstack.common import policy as common_policy
 from keystone import policy
@@ -32,15 +39,24 @@ LOG = log.getLogger(__name__)
 _ENFORCER = None
 _POLICY_PATH = None
 _POLICY_CACHE = {}
+# the rules of the enforcer the checks were compiled from, the checks and
+# the functions building the keys of their decisions
+_CHECKS = (None, {}, {})
+_WATCHER = None
+_DECISIONS = None
 
 
 def reset():
     global _POLICY_PATH
     global _POLICY_CACHE
     global _ENFORCER
+    global _CHECKS
+    global _DECISIONS
     _POLICY_PATH = None
     _POLICY_CACHE = {}
     _ENFORCER = None
+    _CHECKS = (None, {}, {})
+    _DECISIONS = None
 
 
 def init():
@@ -53,6 +69,21 @@ def init():
             _POLICY_PATH = CONF.find_file(_POLICY_PATH)
     if not _ENFORCER:
         _ENFORCER = common_policy.Enforcer(policy_file=_POLICY_PATH)
+    if CONF.policy.reload_interval > 0:
+        # NOTE(garcianavalon) the policy file is watched in the background
+        # instead of on every request
+        if not _POLICY_CACHE:
+            reload()
+        _start_watcher()
+        return
+    utils.read_cached_file(_POLICY_PATH,
+                           _POLICY_CACHE,
+                           reload_func=_set_rules)
+
+
+def reload():
+    """Load the policy file again, whether it was modified or not."""
+    _POLICY_CACHE.clear()
     utils.read_cached_file(_POLICY_PATH,
                            _POLICY_CACHE,
                            reload_func=_set_rules)
@@ -63,6 +94,399 @@ def _set_rules(data):
     default_rule = CONF.policy_default_rule
     _ENFORCER.set_rules(common_policy.Rules.load_json(
         data, default_rule))
+    _get_checks()
+
+
+def _start_watcher():
+    global _WATCHER
+    if _WATCHER is None or not _WATCHER.is_alive():
+        _WATCHER = threading.Thread(target=_watch_policy_file,
+                                    name='policy-file-watcher')
+        _WATCHER.daemon = True
+        _WATCHER.start()
+
+
+def _watch_policy_file():
+    """Reload the policy file when it is modified.
+
+    Runs as a greenthread under eventlet and as a native thread otherwise,
+    until reload_interval is disabled.
+
+    """
+    while CONF.policy.reload_interval > 0:
+        time.sleep(CONF.policy.reload_interval)
+        if not _POLICY_PATH or not _POLICY_CACHE:
+            # NOTE(garcianavalon) reset, the next request loads it
+            continue
+        try:
+            utils.read_cached_file(_POLICY_PATH,
+                                   _POLICY_CACHE,
+                                   reload_func=_set_rules)
+        except Exception:
+            LOG.exception(_LE('Unable to reload the policy file %s'),
+                          _POLICY_PATH)
+
+
+def _allow(target, creds):
+    return True
+
+
+def _deny(target, creds):
+    return False
+
+
+def _all(checks):
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(target, creds):
+        for rule in checks:
+            if not rule(target, creds):
+                return False
+        return True
+    return check
+
+
+def _any(checks):
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(target, creds):
+        for rule in checks:
+            if rule(target, creds):
+                return True
+        return False
+    return check
+
+
+def _rule_reference(rule):
+    # NOTE(garcianavalon) as the oslo RuleCheck, a referenced rule failing
+    # on missing credentials, like the roles of unscoped tokens, is False
+    # instead of denying the whole action
+    def check(target, creds):
+        try:
+            return rule(target, creds)
+        except KeyError:
+            return False
+    return check
+
+
+def _role_check(roles):
+    def check(target, creds):
+        for role in creds['roles']:
+            if role.lower() in roles:
+                return True
+        return False
+    return check
+
+
+def _generic_check(kind, match):
+    try:
+        leftval = six.text_type(ast.literal_eval(kind))
+    except ValueError:
+        kind_parts = kind.split('.')
+    else:
+        kind_parts = None
+
+    def check(target, creds):
+        try:
+            value = match % target
+        except KeyError:
+            return False
+        if kind_parts is None:
+            return value == leftval
+        cred = creds
+        try:
+            for kind_part in kind_parts:
+                cred = cred[kind_part]
+        except KeyError:
+            return False
+        return value == six.text_type(cred)
+    return check
+
+
+class _RuleCompiler(object):
+    """Compile a tree of policy checks into nested flat functions.
+
+    The functions take the target and the credentials, rules referenced by
+    name are compiled once and shared, and the literals and credential
+    paths of generic checks are worked out once for every distinct check.
+    The result of evaluating them is the one of the original checks.
+
+    """
+
+    def __init__(self, rules, enforcer):
+        self.rules = rules
+        self.enforcer = enforcer
+        self.named = {}
+        self.generic = {}
+
+    def compile_rule(self, name):
+        if name in self.named:
+            check = self.named[name]
+            if check is None:
+                # NOTE(garcianavalon) a rule referencing itself, it recurses
+                # when called as the original check does
+                named = self.named
+                return lambda target, creds: named[name](target, creds)
+            return check
+        try:
+            rule = self.rules[name]
+        except KeyError:
+            # We don't have any matching rule; fail closed
+            return _deny
+        self.named[name] = None
+        check = self.named[name] = self.compile(rule)
+        return check
+
+    def compile(self, rule):
+        kind = type(rule)
+        if kind is common_policy.TrueCheck:
+            return _allow
+        if kind is common_policy.FalseCheck:
+            return _deny
+        if kind is common_policy.RuleCheck:
+            return _rule_reference(self.compile_rule(rule.match))
+        if kind is common_policy.RoleCheck:
+            return _role_check(frozenset([rule.match.lower()]))
+        if kind is common_policy.GenericCheck:
+            return self._compile_generic(rule)
+        if kind is common_policy.NotCheck:
+            negated = self.compile(rule.rule)
+            return lambda target, creds: not negated(target, creds)
+        if kind is common_policy.AndCheck:
+            return _all([self.compile(check) for check in rule.rules])
+        if kind is common_policy.OrCheck:
+            return self._compile_or(rule)
+
+        enforcer = self.enforcer
+        return lambda target, creds: rule(target, creds, enforcer)
+
+    def _compile_generic(self, rule):
+        key = (rule.kind, rule.match)
+        if key not in self.generic:
+            try:
+                self.generic[key] = _generic_check(rule.kind, rule.match)
+            except SyntaxError:
+                # NOTE(garcianavalon) not a literal nor a credential path,
+                # the original check raises it when evaluated
+                enforcer = self.enforcer
+                self.generic[key] = (
+                    lambda target, creds: rule(target, creds, enforcer))
+        return self.generic[key]
+
+    def _compile_or(self, rule):
+        # NOTE(garcianavalon) the roles of all the role checks are looked up
+        # at once, where the first of them was
+        checks = []
+        roles = set()
+        roles_index = None
+        for check in rule.rules:
+            if type(check) is common_policy.RoleCheck:
+                if roles_index is None:
+                    roles_index = len(checks)
+                    checks.append(None)
+                roles.add(check.match.lower())
+            else:
+                checks.append(self.compile(check))
+        if roles_index is not None:
+            checks[roles_index] = _role_check(frozenset(roles))
+        return _any(checks)
+
+
+def _get_checks():
+    """Return the compiled checks of the current rules, by action."""
+    global _CHECKS
+    rules, checks, _keys = _CHECKS
+    if rules is not _ENFORCER.rules:
+        rules = _ENFORCER.rules
+        compiler = _RuleCompiler(rules, _ENFORCER)
+        checks = dict((name, compiler.compile_rule(name)) for name in rules)
+        _CHECKS = (rules, checks, {})
+        if _DECISIONS is not None:
+            _DECISIONS.invalidate()
+    return checks
+
+
+def _get_check(action):
+    checks = _get_checks()
+    try:
+        return checks[action]
+    except KeyError:
+        pass
+
+    if not _ENFORCER.rules:
+        # No rules to reference means we're going to fail closed
+        return _deny
+    # NOTE(garcianavalon) the default rule, if any
+    check = checks[action] = _RuleCompiler(
+        _ENFORCER.rules, _ENFORCER).compile_rule(action)
+    return check
+
+
+_TARGET_KEY = re.compile(r'%\(([^)]*)\)')
+_MISSING = object()
+
+
+def _collect_inputs(rule, rules, inputs, seen):
+    """Add the target keys and credential paths the rule reads to inputs.
+
+    :returns: False if the decision of the rule depends on anything else.
+
+    """
+    kind = type(rule)
+    if kind in (common_policy.TrueCheck, common_policy.FalseCheck):
+        return True
+    if kind is common_policy.RuleCheck:
+        if rule.match in seen:
+            return True
+        seen.add(rule.match)
+        try:
+            rule = rules[rule.match]
+        except KeyError:
+            return True
+        return _collect_inputs(rule, rules, inputs, seen)
+    if kind is common_policy.RoleCheck:
+        inputs[1].add(('roles',))
+        return True
+    if kind is common_policy.GenericCheck:
+        if '%' in _TARGET_KEY.sub('', rule.match.replace('%%', '')):
+            # NOTE(garcianavalon) formatted with the whole target
+            return False
+        inputs[0].update(_TARGET_KEY.findall(rule.match))
+        try:
+            ast.literal_eval(rule.kind)
+        except ValueError:
+            inputs[1].add(tuple(rule.kind.split('.')))
+        except SyntaxError:
+            return False
+        return True
+    if kind is common_policy.NotCheck:
+        return _collect_inputs(rule.rule, rules, inputs, seen)
+    if kind in (common_policy.AndCheck, common_policy.OrCheck):
+        return all([_collect_inputs(check, rules, inputs, seen)
+                    for check in rule.rules])
+    # NOTE(garcianavalon) http checks and any other kind of check
+    return False
+
+
+def _build_decision_key(action, rules):
+    """Return a function keying the decisions of the action by its inputs.
+
+    Decisions with equal keys are equal, as the key holds the value, and
+    its type, of every attribute of the target and the credentials the
+    rule of the action reads.
+
+    :returns: the function, or None if the decisions cannot be reused.
+
+    """
+    try:
+        rule = rules[action]
+    except KeyError:
+        return lambda creds, target: (action,)
+    inputs = (set(), set())
+    if not _collect_inputs(rule, rules, inputs, set()):
+        return None
+    target_keys = sorted(inputs[0])
+    cred_paths = sorted(inputs[1])
+
+    def key(creds, target):
+        values = [action]
+        for target_key in target_keys:
+            value = target.get(target_key, _MISSING)
+            values.append(value)
+            values.append(type(value))
+        for path in cred_paths:
+            value = creds
+            try:
+                for part in path:
+                    value = value[part]
+            except (KeyError, IndexError, TypeError):
+                value = _MISSING
+            if isinstance(value, list):
+                value = tuple(value)
+            values.append(value)
+            values.append(type(value))
+        return tuple(values)
+    return key
+
+
+def _get_decision_key(action, credentials, target):
+    """Return the key of the decision in the decision cache, if any."""
+    _rules, _checks, keys = _CHECKS
+    try:
+        build_key = keys[action]
+    except KeyError:
+        build_key = keys[action] = _build_decision_key(
+            action, _ENFORCER.rules)
+    if build_key is None:
+        return None
+    return build_key(credentials, target)
+
+
+class DecisionCache(object):
+    """Bounded cache of policy decisions.
+
+    The decisions are keyed by the action and the attributes its rule
+    reads, so they stay valid until the rules change. Once full, an
+    arbitrary decision is forgotten for every new one, which is cheaper
+    than keeping them in order of use on every hit.
+
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries = {}
+
+    def get(self, key):
+        """Return the decision, or None if unknown.
+
+        :raises TypeError: if an attribute in the key cannot be hashed.
+
+        """
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def set(self, key, result, generation):
+        """Remember the decision, unless invalidated since ``generation``."""
+        if generation != self.generation:
+            return
+        if len(self._entries) >= self.size and key not in self._entries:
+            self._entries.popitem()
+        self._entries[key] = result
+
+    def invalidate(self):
+        """Forget every decision."""
+        self.generation += 1
+        self._entries.clear()
+
+    def get_stats(self):
+        """Report the use of the cache, to help sizing it.
+
+        :returns: dictionary with the number of entries, hits and misses.
+
+        """
+        return {'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+def get_decision_cache():
+    """Return the process wide cache of policy decisions, if enabled."""
+    global _DECISIONS
+    size = CONF.policy.decision_cache_size
+    if size <= 0:
+        return None
+    if _DECISIONS is None or _DECISIONS.size != size:
+        _DECISIONS = DecisionCache(size)
+    return _DECISIONS
 
 
 def enforce(credentials, action, target, do_raise=True):
@@ -84,13 +508,33 @@ def enforce(credentials, action, target, do_raise=True):
     """
     init()
 
-    # Add the exception arguments if asked to do a raise
-    extra = {}
-    if do_raise:
-        extra.update(exc=exception.ForbiddenAction, action=action,
-                     do_raise=do_raise)
+    check = _get_check(action)
+    cache = get_decision_cache()
+    key = result = None
+    if cache is not None:
+        key = _get_decision_key(action, credentials, target)
+        if key is not None:
+            generation = cache.generation
+            try:
+                result = cache.get(key)
+            except TypeError:
+                # NOTE(garcianavalon) an unhashable attribute, the decision
+                # is not cached
+                key = None
+
+    if result is None:
+        try:
+            result = check(target, credentials)
+        except KeyError:
+            LOG.debug("Rule [%s] doesn't exist", action)
+            # If the rule doesn't exist, fail closed
+            result = False
+        if key is not None:
+            cache.set(key, bool(result), generation)
 
-    return _ENFORCER.enforce(action, target, credentials, **extra)
+    if do_raise and not result:
+        raise exception.ForbiddenAction(action=action)
+    return result
 
 
 class Policy(policy.Driver):
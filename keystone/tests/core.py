@@ -302,6 +302,9 @@ class TestCase(BaseTestCase):
         self.config_fixture.config(public_workers=2)
         self.config_fixture.config(admin_workers=2)
         self.config_fixture.config(policy_file=dirs.etc('policy.json'))
+        # Tests rewrite the policy file and expect it to be read again on the
+        # next request
+        self.config_fixture.config(group='policy', reload_interval=0)
         self.config_fixture.config(
             # TODO(morganfainberg): Make Cache Testing a separate test case
             # in tempest, and move it out of the base unit tests.
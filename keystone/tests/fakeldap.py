@@ -136,6 +136,13 @@ def _match(key, value, attrs):
     # This is a wild card search. Implemented as all or nothing for now.
     if value == '*':
         return True
+    if '*' in value:
+        # A substring assertion, ignoring case as the matching rules of the
+        # name attributes do.
+        pattern = '.*'.join(re.escape(part) for part in value.split('*'))
+        return any(re.match(pattern + '$', _internal_attr(key, x)[0],
+                            re.IGNORECASE | re.UNICODE)
+                   for x in attrs[key])
     if key == 'serviceId':
         # for serviceId, the backend is returning a list of numbers
         # make sure we convert them to strings first before comparing
@@ -2311,6 +2311,22 @@ class IdentityTests(object):
                           self.identity_api.list_users_in_group,
                           uuid.uuid4().hex)
 
+    def test_list_user_ids_in_groups(self):
+        domain = self._get_domain_fixture()
+        groups = []
+        for _ in range(2):
+            group = {'domain_id': domain['id'], 'name': uuid.uuid4().hex}
+            groups.append(self.identity_api.create_group(group))
+        user = {'name': uuid.uuid4().hex, 'password': uuid.uuid4().hex,
+                'enabled': True, 'domain_id': domain['id']}
+        user = self.identity_api.create_user(user)
+        self.identity_api.add_user_to_group(user['id'], groups[0]['id'])
+
+        members = self.identity_api.list_user_ids_in_groups(
+            [g['id'] for g in groups])
+        self.assertEqual({groups[0]['id']: [user['id']],
+                          groups[1]['id']: []}, members)
+
     def test_list_groups_for_user(self):
         domain = self._get_domain_fixture()
         test_groups = []
@@ -4776,6 +4792,48 @@ class InheritanceTests(object):
         user_projects = self.assignment_api.list_projects_for_user(user1['id'])
         self.assertEqual(5, len(user_projects))
 
+    def test_list_effective_role_assignments_for_inherited_group_grant(self):
+        self.config_fixture.config(group='os_inherit', enabled=True)
+        domain = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex}
+        self.assignment_api.create_domain(domain['id'], domain)
+        project_ids = []
+        for _ in range(3):
+            project = {'id': uuid.uuid4().hex, 'name': uuid.uuid4().hex,
+                       'domain_id': domain['id']}
+            self.assignment_api.create_project(project['id'], project)
+            project_ids.append(project['id'])
+        group = {'name': uuid.uuid4().hex, 'domain_id': domain['id']}
+        group = self.identity_api.create_group(group)
+        user_ids = []
+        for _ in range(2):
+            user = {'name': uuid.uuid4().hex, 'domain_id': domain['id'],
+                    'password': uuid.uuid4().hex, 'enabled': True}
+            user = self.identity_api.create_user(user)
+            self.identity_api.add_user_to_group(user['id'], group['id'])
+            user_ids.append(user['id'])
+        self.assignment_api.create_grant(group_id=group['id'],
+                                         domain_id=domain['id'],
+                                         role_id=self.role_admin['id'],
+                                         inherited_to_projects=True)
+
+        # Every member gets the role on every project of the domain
+        refs = self.assignment_api.list_role_assignments(
+            role_id=self.role_admin['id'], effective=True)
+        expected = set((user_id, project_id) for user_id in user_ids
+                       for project_id in project_ids)
+        self.assertEqual(expected, set((ref['user_id'], ref['project_id'])
+                                       for ref in refs))
+        for ref in refs:
+            self.assertEqual({'group_id': group['id'],
+                              'domain_id': domain['id']}, ref['indirect'])
+
+        # Filtering by user skips the expansion of the group
+        refs = self.assignment_api.list_role_assignments(
+            role_id=self.role_admin['id'], user_id=user_ids[0],
+            effective=True)
+        self.assertEqual(set(project_ids),
+                         set(ref['project_id'] for ref in refs))
+
 
 class FilterTests(filtering.FilterTests):
     def test_list_users_filtered(self):
@@ -11,12 +11,15 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import contextlib
 import datetime
 import uuid
 
+import mock
 from oslo.utils import timeutils
 import six
 
+from keystone.common.cache.backends import memcache_pool
 from keystone import config
 from keystone import exception
 from keystone import tests
@@ -178,9 +181,9 @@ class KvsToken(tests.TestCase, test_backend.TokenTests):
 
     def test_cleanup_user_index_on_create(self):
         user_id = six.text_type(uuid.uuid4().hex)
-        valid_token_id, data = self.create_token_sample_data(user_id=user_id)
         expired_token_id, expired_data = self.create_token_sample_data(
             user_id=user_id)
+        valid_token_id, data = self.create_token_sample_data(user_id=user_id)
 
         expire_delta = datetime.timedelta(seconds=86400)
 
@@ -192,10 +195,10 @@ class KvsToken(tests.TestCase, test_backend.TokenTests):
         valid_token_ref = token_persistence.get_token(valid_token_id)
         expired_token_ref = token_persistence.get_token(expired_token_id)
         expected_user_token_list = [
-            (valid_token_id, timeutils.isotime(valid_token_ref['expires'],
-                                               subsecond=True)),
             (expired_token_id, timeutils.isotime(expired_token_ref['expires'],
-                                                 subsecond=True))]
+                                                 subsecond=True)),
+            (valid_token_id, timeutils.isotime(valid_token_ref['expires'],
+                                               subsecond=True))]
         self.assertEqual(expected_user_token_list, user_token_list)
         new_expired_data = (expired_token_id,
                             timeutils.isotime(
@@ -226,6 +229,152 @@ class KvsToken(tests.TestCase, test_backend.TokenTests):
         user_token_list = token_persistence.driver._store.get(user_key)
         self.assertEqual(expected_user_token_list, user_token_list)
 
+    def test_user_index_sorted_by_expiry(self):
+        user_id = six.text_type(uuid.uuid4().hex)
+        token_persistence = self.token_provider_api._persistence
+        user_key = token_persistence.driver._prefix_user_id(user_id)
+        later = timeutils.utcnow() + datetime.timedelta(hours=2)
+        later_token_id, data = self.create_token_sample_data(
+            user_id=user_id, expires=later)
+        token_id, data = self.create_token_sample_data(user_id=user_id)
+
+        user_token_list = token_persistence.driver._store.get(user_key)
+        self.assertEqual([token_id, later_token_id],
+                         [item[0] for item in user_token_list])
+
+        token_persistence.delete_token(later_token_id)
+        user_token_list = token_persistence.driver._store.get(user_key)
+        self.assertEqual([token_id], [item[0] for item in user_token_list])
+
+
+class _FakeMemcacheClientPool(object):
+    """In-memory stand-in for the client pool of one memcached server."""
+
+    def __init__(self):
+        self.data = {}
+
+    @contextlib.contextmanager
+    def acquire(self):
+        yield self
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, time=0):
+        self.data[key] = value
+        return True
+
+    def add(self, key, value, time=0):
+        if key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+        return True
+
+    def get_multi(self, keys):
+        return dict((key, self.data[key]) for key in keys if key in self.data)
+
+    def set_multi(self, mapping, time=0):
+        self.data.update(mapping)
+        return []
+
+    def delete_multi(self, keys):
+        for key in keys:
+            self.data.pop(key, None)
+        return True
+
+
+class MemcacheShardedToken(tests.TestCase, test_backend.TokenTests):
+    MEMCACHE_SERVERS = ['127.0.0.1:11211', '127.0.0.1:11212',
+                        '127.0.0.1:11213']
+
+    def setUp(self):
+        self.client_pools = {}
+
+        def create_client_pool(urls, arguments):
+            return self.client_pools.setdefault(urls[0],
+                                                _FakeMemcacheClientPool())
+
+        patcher = mock.patch.object(memcache_pool, '_create_client_pool',
+                                    create_client_pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super(MemcacheShardedToken, self).setUp()
+        self.load_backends()
+
+    def config_overrides(self):
+        super(MemcacheShardedToken, self).config_overrides()
+        self.config_fixture.config(
+            group='token',
+            driver='keystone.token.persistence.backends.memcache_sharded.'
+                   'Token',
+            user_index_buckets=4)
+        self.config_fixture.config(group='memcache',
+                                   servers=self.MEMCACHE_SERVERS)
+
+    def test_flush_expired_token(self):
+        self.assertRaises(
+            exception.NotImplemented,
+            self.token_provider_api._persistence.flush_expired_tokens)
+
+    def _user_token_lists(self, user_id):
+        driver = self.token_provider_api._persistence.driver
+        return driver._store.get_multi_or_default(
+            driver._user_token_list_keys(user_id), default=[])
+
+    def test_keys_spread_over_servers(self):
+        for _ in range(50):
+            self.create_token_sample_data()
+        self.assertEqual(set(self.MEMCACHE_SERVERS), set(self.client_pools))
+        for client_pool in self.client_pools.values():
+            self.assertTrue(client_pool.data)
+
+    def test_user_tokens_spread_over_buckets(self):
+        user_id = six.text_type(uuid.uuid4().hex)
+        token_ids = [self.create_token_sample_data(user_id=user_id)[0]
+                     for _ in range(20)]
+
+        token_lists = self._user_token_lists(user_id)
+        self.assertEqual(4, len(token_lists))
+        self.assertTrue(len([t for t in token_lists if t]) > 1)
+        self.assertItemsEqual(token_ids,
+                              [item[0] for t in token_lists for item in t])
+
+        token_persistence = self.token_provider_api._persistence
+        self.assertItemsEqual(token_ids,
+                              token_persistence._list_tokens(user_id))
+
+    def test_delete_token_removes_it_from_its_bucket(self):
+        user_id = six.text_type(uuid.uuid4().hex)
+        token_ids = [self.create_token_sample_data(user_id=user_id)[0]
+                     for _ in range(8)]
+        token_persistence = self.token_provider_api._persistence
+
+        token_persistence.delete_token(token_ids[0])
+        self.assertItemsEqual(
+            token_ids[1:],
+            [item[0] for t in self._user_token_lists(user_id) for item in t])
+        self.assertItemsEqual(token_ids[1:],
+                              token_persistence._list_tokens(user_id))
+
+    def test_delete_tokens_across_buckets(self):
+        user_id = six.text_type(uuid.uuid4().hex)
+        token_ids = [self.create_token_sample_data(user_id=user_id)[0]
+                     for _ in range(20)]
+        other_token_id, data = self.create_token_sample_data()
+        token_persistence = self.token_provider_api._persistence
+
+        token_persistence.delete_tokens(user_id)
+        self.assertEqual([], token_persistence._list_tokens(user_id))
+        for token_id in token_ids:
+            self.assertRaises(exception.TokenNotFound,
+                              token_persistence.get_token, token_id)
+        self.assertEqual(other_token_id,
+                         token_persistence.get_token(other_token_id)['id'])
+
 
 class KvsCatalog(tests.TestCase, test_backend.CatalogTests):
     def setUp(self):
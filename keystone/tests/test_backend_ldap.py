@@ -23,6 +23,7 @@ from testtools import matchers
 
 from keystone import assignment
 from keystone.common import cache
+from keystone.common import driver_hints
 from keystone.common import ldap as common_ldap
 from keystone.common.ldap import core as common_ldap_core
 from keystone.common import sql
@@ -861,6 +862,56 @@ class LDAPIdentity(BaseLDAPIdentity, tests.TestCase):
         self.useFixture(database.Database())
         super(LDAPIdentity, self).setUp()
 
+    def _list_names(self, list_func, name, value, comparator='equals'):
+        hints = driver_hints.Hints()
+        hints.add_filter(name, value, comparator=comparator)
+        return sorted(ref['name'] for ref in list_func(hints)), hints
+
+    def _filter_query_cases(self):
+        for name in ('Developers', 'Devops', 'Admins'):
+            self.identity_api.create_group(
+                {'name': name, 'domain_id': CONF.identity.default_domain_id})
+        return [(self.identity_api.driver.list_users, 'FOO', 'ba',
+                 ['BadGuy']),
+                (self.identity_api.driver.list_groups, 'Admins', 'dev',
+                 ['Developers', 'Devops']),
+                (self.assignment_api.driver.list_projects, 'MTU', 'ba',
+                 ['BAR', 'BAZ']),
+                (self.assignment_api.driver.list_roles, 'Other', 'wr',
+                 ['Writer'])]
+
+    def test_filter_query_exact(self):
+        for list_func, name, _prefix, _names in self._filter_query_cases():
+            names, hints = self._list_names(list_func, 'name', name)
+            self.assertEqual([name], names)
+            # exact filters are left for the controller, which checks case
+            self.assertEqual(1, len(hints.filters))
+
+    def test_filter_query_inexact(self):
+        for list_func, _name, prefix, expected in self._filter_query_cases():
+            names, hints = self._list_names(list_func, 'name', prefix,
+                                            'startswith')
+            self.assertEqual(expected, names)
+            self.assertEqual([], hints.filters)
+
+    def test_filter_query_domain_id_not_in_ldap(self):
+        # the domain is not stored in LDAP, only set on read
+        for list_func, _name, _prefix, _names in self._filter_query_cases():
+            all_names = sorted(ref['name']
+                               for ref in list_func(driver_hints.Hints()))
+            names, hints = self._list_names(
+                list_func, 'domain_id', CONF.identity.default_domain_id)
+            self.assertEqual(all_names, names)
+            self.assertEqual(1, len(hints.filters))
+
+    def test_filter_query_enabled_not_in_ldap(self):
+        for list_func, _name, _prefix, _names in self._filter_query_cases():
+            all_names = sorted(ref['name']
+                               for ref in list_func(driver_hints.Hints()))
+            names, hints = self._list_names(list_func, 'enabled', True)
+            self.assertEqual(all_names, names)
+            self.assertEqual(1, len(hints.filters))
+
     def test_configurable_allowed_project_actions(self):
         tenant = {'id': u'fäké1', 'name': u'fäké1', 'enabled': True}
         self.assignment_api.create_project(u'fäké1', tenant)
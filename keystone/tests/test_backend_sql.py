@@ -23,6 +23,7 @@ import sqlalchemy
 from sqlalchemy import exc
 from testtools import matchers
 
+from keystone.assignment import core as assignment_core
 from keystone.common import driver_hints
 from keystone.common import sql
 from keystone import config
@@ -130,6 +131,77 @@ class SqlIdentity(SqlTests, test_backend.IdentityTests):
         user_ref = self.identity_api._get_user(session, self.user_foo['id'])
         self.assertNotEqual(user_ref['password'], self.user_foo['password'])
 
+    def test_verified_password_is_remembered(self):
+        self.config_fixture.config(group='identity',
+                                   verified_password_cache_size=10)
+        password = uuid.uuid4().hex
+        user = {'name': uuid.uuid4().hex,
+                'domain_id': DEFAULT_DOMAIN_ID,
+                'password': password}
+        user = self.identity_api.create_user(user)
+        self.identity_api.authenticate({}, user['id'], password)
+
+        with mock.patch.object(identity_sql.utils, 'check_password',
+                               return_value=False) as check_password:
+            self.identity_api.authenticate({}, user['id'], password)
+            self.assertFalse(check_password.called)
+            # a wrong password is always verified
+            self.assertRaises(AssertionError,
+                              self.identity_api.authenticate,
+                              {}, user['id'], uuid.uuid4().hex)
+            self.assertTrue(check_password.called)
+
+        # changing the password forgets the old one
+        self.identity_api.update_user(user['id'],
+                                      {'password': uuid.uuid4().hex})
+        self.assertRaises(AssertionError,
+                          self.identity_api.authenticate,
+                          {}, user['id'], password)
+
+    def test_effective_roles_are_remembered(self):
+        self.config_fixture.config(group='assignment',
+                                   effective_roles_cache_size=10)
+        assignment_core.get_effective_roles_cache().invalidate()
+        user_id = self.user_foo['id']
+        project_id = self.tenant_bar['id']
+        roles = self.assignment_api.get_roles_for_user_and_project(
+            user_id, project_id)
+
+        with mock.patch.object(self.assignment_api.driver,
+                               'get_group_project_roles') as get_group_roles:
+            self.assertEqual(
+                roles, self.assignment_api.get_roles_for_user_and_project(
+                    user_id, project_id))
+            self.assertFalse(get_group_roles.called)
+
+        # new grants, direct or through a group, are seen straight away
+        self.assignment_api.create_grant(self.role_other['id'],
+                                         user_id=user_id,
+                                         project_id=project_id)
+        self.assertIn(self.role_other['id'],
+                      self.assignment_api.get_roles_for_user_and_project(
+                          user_id, project_id))
+
+        group = {'name': uuid.uuid4().hex, 'domain_id': DEFAULT_DOMAIN_ID}
+        group = self.identity_api.create_group(group)
+        self.assignment_api.create_grant(self.role_admin['id'],
+                                         group_id=group['id'],
+                                         project_id=project_id)
+        self.assertNotIn(self.role_admin['id'],
+                         self.assignment_api.get_roles_for_user_and_project(
+                             user_id, project_id))
+        self.identity_api.add_user_to_group(user_id, group['id'])
+        self.assertIn(self.role_admin['id'],
+                      self.assignment_api.get_roles_for_user_and_project(
+                          user_id, project_id))
+
+        self.assignment_api.delete_grant(self.role_other['id'],
+                                         user_id=user_id,
+                                         project_id=project_id)
+        self.assertNotIn(self.role_other['id'],
+                         self.assignment_api.get_roles_for_user_and_project(
+                             user_id, project_id))
+
     def test_delete_user_with_project_association(self):
         user = {'name': uuid.uuid4().hex,
                 'domain_id': DEFAULT_DOMAIN_ID,
@@ -14,6 +14,7 @@
 
 import uuid
 
+import mock
 import six
 
 from keystone import catalog
@@ -179,3 +180,39 @@ class TestV2CatalogAPISQL(tests.TestCase):
         self.assertEqual(1, len(catalog))
         # all three endpoints appear in the backend
         self.assertEqual(3, len(self.catalog_api.list_endpoints()))
+
+    def test_get_catalog_reflects_endpoint_changes(self):
+        user_id = uuid.uuid4().hex
+        tenant_id = uuid.uuid4().hex
+
+        endpoint = self.new_endpoint_ref(self.service_id)
+        endpoint['url'] = 'http://keystone/$(tenant_id)s'
+        self.catalog_api.create_endpoint(endpoint['id'], endpoint)
+        catalog = self.catalog_api.get_v3_catalog(user_id, tenant_id)
+        urls = [ep['url'] for ep in catalog[0]['endpoints']]
+        self.assertIn('http://keystone/%s' % tenant_id, urls)
+
+        endpoint['url'] = 'http://keystone/$(user_id)s'
+        self.catalog_api.update_endpoint(endpoint['id'], endpoint)
+        catalog = self.catalog_api.get_v3_catalog(user_id, tenant_id)
+        urls = [ep['url'] for ep in catalog[0]['endpoints']]
+        self.assertIn('http://keystone/%s' % user_id, urls)
+        self.assertNotIn('http://keystone/%s' % tenant_id, urls)
+
+        self.catalog_api.delete_endpoint(endpoint['id'])
+        catalog = self.catalog_api.get_v3_catalog(user_id, tenant_id)
+        self.assertEqual(1, len(catalog[0]['endpoints']))
+
+    def test_region_changes_invalidate_compiled_catalog(self):
+        region = {'id': uuid.uuid4().hex, 'description': uuid.uuid4().hex}
+        with mock.patch.object(self.catalog_api.driver,
+                               'invalidate_compiled_catalog') as invalidate:
+            self.catalog_api.create_region(region)
+            self.assertEqual(1, invalidate.call_count)
+
+            region['description'] = uuid.uuid4().hex
+            self.catalog_api.update_region(region['id'], region)
+            self.assertEqual(2, invalidate.call_count)
+
+            self.catalog_api.delete_region(region['id'])
+            self.assertEqual(3, invalidate.call_count)
@@ -58,3 +58,29 @@ class ListHintsTests(test.TestCase):
         hints.set_limit(10, truncated=True)
         self.assertEqual(10, hints.limit['limit'])
         self.assertTrue(hints.limit['truncated'])
+
+    def test_marker(self):
+        hints = driver_hints.Hints()
+        self.assertIsNone(hints.marker)
+        hints.set_marker('id1')
+        self.assertEqual('id1', hints.marker)
+
+    def test_sort(self):
+        hints = driver_hints.Hints()
+        self.assertIsNone(hints.sort)
+        hints.set_sort('name', 'desc')
+        self.assertEqual('name', hints.sort['key'])
+        self.assertEqual('desc', hints.sort['dir'])
+        self.assertFalse(hints.sort['satisfied'])
+        hints.set_sort('name', 'desc', satisfied=True)
+        self.assertTrue(hints.sort['satisfied'])
+
+    def test_page(self):
+        hints = driver_hints.Hints()
+        self.assertIsNone(hints.page)
+        hints.set_page(20, 10, with_total=True)
+        self.assertEqual(20, hints.page['offset'])
+        self.assertEqual(10, hints.page['count'])
+        self.assertTrue(hints.page['with_total'])
+        self.assertIsNone(hints.page['total'])
+        self.assertFalse(hints.page['satisfied'])
@@ -16,6 +16,7 @@
 import json
 
 import mock
+from oslotest import mockpatch
 import six
 from six.moves.urllib import request as urlrequest
 from testtools import matchers
@@ -58,6 +59,59 @@ class PolicyFileTestCase(tests.TestCase):
                           empty_credentials, action, self.target)
 
 
+class PolicyFileWatcherTestCase(tests.TestCase):
+    def setUp(self):
+        self.tempfile = self.useFixture(temporaryfile.SecureTempFile())
+        self.tmpfilename = self.tempfile.file_name
+        super(PolicyFileWatcherTestCase, self).setUp()
+
+        rules.reset()
+        self.addCleanup(rules.reset)
+        # NOTE(garcianavalon) the watcher is run by hand
+        self.useFixture(mockpatch.PatchObject(rules, '_start_watcher'))
+        self.target = {}
+        self.action = 'example:test'
+        self._write_policy('[]')
+
+    def config_overrides(self):
+        super(PolicyFileWatcherTestCase, self).config_overrides()
+        self.config_fixture.config(policy_file=self.tmpfilename)
+        self.config_fixture.config(group='policy', reload_interval=10)
+
+    def _write_policy(self, rule):
+        with open(self.tmpfilename, 'w') as policyfile:
+            policyfile.write('{"%s": %s}' % (self.action, rule))
+
+    def test_policy_file_not_checked_per_request(self):
+        rules.enforce({}, self.action, self.target)
+        self._write_policy('[["false:false"]]')
+        with mock.patch('os.path.getmtime') as getmtime:
+            rules.enforce({}, self.action, self.target)
+        self.assertFalse(getmtime.called)
+
+    def test_reload(self):
+        rules.enforce({}, self.action, self.target)
+        self._write_policy('[["false:false"]]')
+        rules.reload()
+        self.assertRaises(exception.ForbiddenAction, rules.enforce,
+                          {}, self.action, self.target)
+
+    def test_watcher_reloads_modified_policy(self):
+        rules.enforce({}, self.action, self.target)
+        self._write_policy('[["false:false"]]')
+        # NOTE(vish): reset stored policy cache so we don't have to sleep(1)
+        rules._POLICY_CACHE['mtime'] = None
+
+        def sleep(seconds):
+            # stop the watcher after one check
+            self.config_fixture.config(group='policy', reload_interval=0)
+
+        with mock.patch('time.sleep', sleep):
+            rules._watch_policy_file()
+        self.assertRaises(exception.ForbiddenAction, rules.enforce,
+                          {}, self.action, self.target)
+
+
 class PolicyTestCase(tests.TestCase):
     def setUp(self):
         super(PolicyTestCase, self).setUp()
@@ -216,3 +270,117 @@ class PolicyJsonTestCase(tests.TestCase):
         diffs = set(policy_keys).difference(set(cloud_policy_keys))
 
         self.assertThat(diffs, matchers.Equals(set()))
+
+
+class CompiledPolicyTestCase(tests.TestCase):
+    """The compiled rules decide as the checks they come from."""
+
+    def setUp(self):
+        super(CompiledPolicyTestCase, self).setUp()
+        rules.reset()
+        self.addCleanup(rules.reset)
+        rules.init()
+
+    def _assert_same_decisions(self, credentials, target):
+        for action in list(rules._ENFORCER.rules) + ['example:noexist']:
+            self.assertEqual(
+                rules._ENFORCER.enforce(action, target, credentials),
+                rules.enforce(credentials, action, target, do_raise=False),
+                action)
+
+    def test_policy_json(self):
+        admin = {'roles': ['Admin'], 'user_id': 'u1', 'project_id': 'p1',
+                 'domain_id': 'default'}
+        member = {'roles': ['_member_'], 'user_id': 'u1',
+                  'project_id': 'p1'}
+        # unscoped tokens carry no roles
+        unscoped = {'user_id': 'u1'}
+        targets = [{},
+                   {'user_id': 'u1', 'project_id': 'p1'},
+                   {'user_id': 'u2', 'project_id': 'p2',
+                    'target': {'user_id': 'u1', 'project_id': 'p1'}}]
+        for credentials in (admin, member, unscoped, {}):
+            for target in targets:
+                self._assert_same_decisions(credentials, target)
+
+    def test_unscoped_owner_lists_own_projects(self):
+        self.assertTrue(rules.enforce({'user_id': 'u1'},
+                                      'identity:list_user_projects',
+                                      {'user_id': 'u1'}))
+
+    def test_nested_rules(self):
+        rules._ENFORCER.set_rules(common_policy.Rules.load_json(json.dumps({
+            'owner': 'user_id:%(user_id)s',
+            'admin': 'role:admin or role:Reader and not role:guest',
+            'example:own': 'rule:admin or rule:owner or rule:missing',
+            'example:enabled': 'True:%(enabled)s and "x":%(name)s',
+            'example:nested': 'user.domain.id:%(domain_id)s',
+            'example:not': 'not (rule:owner or role:admin)'})))
+
+        for credentials in ({'roles': ['ADMIN'], 'user_id': 'u1'},
+                            {'roles': ['reader', 'guest'], 'user_id': 'u2',
+                             'user': {'domain': {'id': 'd1'}}},
+                            {'roles': ['reader'], 'user_id': 'u1'},
+                            {'user_id': 'u1'}):
+            for target in ({'user_id': 'u1', 'domain_id': 'd1',
+                            'enabled': True, 'name': 'x'},
+                           {'enabled': False, 'name': 'y'}):
+                self._assert_same_decisions(credentials, target)
+
+
+class DecisionCacheTestCase(tests.TestCase):
+    def config_overrides(self):
+        super(DecisionCacheTestCase, self).config_overrides()
+        self.config_fixture.config(group='policy', decision_cache_size=10)
+
+    def setUp(self):
+        super(DecisionCacheTestCase, self).setUp()
+        rules.reset()
+        self.addCleanup(rules.reset)
+        rules.init()
+        self._set_rules({
+            'owner': 'user_id:%(target.user_id)s',
+            'example:own': 'role:admin or rule:owner',
+            'example:get_http': 'http:http://www.example.com'})
+        self.cache = rules.get_decision_cache()
+
+    def _set_rules(self, policy):
+        rules._ENFORCER.set_rules(
+            common_policy.Rules.load_json(json.dumps(policy)))
+
+    def test_decision_reused(self):
+        credentials = {'roles': ['member'], 'user_id': 'u1'}
+        target = {'target.user_id': 'u1', 'name': 'a'}
+        self.assertTrue(rules.enforce(credentials, 'example:own', target))
+        # attributes the rule does not read are not part of the key
+        target['name'] = 'b'
+        self.assertTrue(rules.enforce(credentials, 'example:own', target))
+        self.assertEqual({'entries': 1, 'hits': 1, 'misses': 1},
+                         self.cache.get_stats())
+
+        target['target.user_id'] = 'u2'
+        self.assertRaises(exception.ForbiddenAction, rules.enforce,
+                          credentials, 'example:own', target)
+        credentials['roles'] = ['Admin']
+        self.assertTrue(rules.enforce(credentials, 'example:own', target))
+        self.assertEqual(3, self.cache.get_stats()['entries'])
+
+    def test_forgotten_when_rules_change(self):
+        credentials = {'roles': ['admin'], 'user_id': 'u1'}
+        rules.enforce(credentials, 'example:own', {})
+        self._set_rules({'example:own': '!'})
+        self.assertRaises(exception.ForbiddenAction, rules.enforce,
+                          credentials, 'example:own', {})
+        self.assertEqual(1, self.cache.get_stats()['entries'])
+
+    def test_http_decisions_not_cached(self):
+        with mock.patch.object(urlrequest, 'urlopen',
+                               lambda url, post_data: six.StringIO('True')):
+            rules.enforce({}, 'example:get_http', {})
+        self.assertEqual(0, self.cache.get_stats()['entries'])
+
+    def test_disabled(self):
+        self.config_fixture.config(group='policy', decision_cache_size=0)
+        self.assertIsNone(rules.get_decision_cache())
+        self.assertTrue(rules.enforce({'roles': ['admin']}, 'example:own',
+                                      {}))
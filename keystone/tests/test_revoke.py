@@ -168,6 +168,49 @@ class RevokeTests(object):
         # should no longer throw an exception
         self.revoke_api.check_token(token_values)
 
+    def test_revoke_updates_tree_in_place(self):
+        token_values = _sample_blank_token()
+        token_values['user_id'] = _new_id()
+        self.revoke_api.check_token(token_values)
+
+        with mock.patch.object(self.revoke_api.driver, 'get_events') as m:
+            self.revoke_api.revoke_by_user(token_values['user_id'])
+            self.assertRaises(exception.TokenNotFound,
+                              self.revoke_api.check_token,
+                              token_values)
+            self.assertEqual([True],
+                             self.revoke_api.is_revoked_many([token_values]))
+            self.assertFalse(m.called)
+
+    @mock.patch.object(timeutils, 'utcnow')
+    def test_poll_fetches_new_events(self, mock_utcnow):
+        now = datetime.datetime.utcnow()
+        mock_utcnow.return_value = now
+        token_values = _sample_blank_token()
+        token_values['user_id'] = _new_id()
+        self.revoke_api.check_token(token_values)
+
+        # revoked by another process, not seen until the next poll
+        self.revoke_api.driver.revoke(
+            model.RevokeEvent(user_id=token_values['user_id']))
+        self.revoke_api.check_token(token_values)
+
+        mock_utcnow.return_value = now + datetime.timedelta(minutes=1)
+        driver = self.revoke_api.driver
+        with mock.patch.object(driver, 'get_events',
+                               wraps=driver.get_events) as m:
+            self.assertRaises(exception.TokenNotFound,
+                              self.revoke_api.check_token,
+                              token_values)
+            self.assertIsNotNone(m.call_args[1]['last_fetch'])
+
+        stats = self.revoke_api.get_revoke_tree_stats()
+        self.assertEqual(1, stats['full'])
+        self.assertEqual(1, stats['delta'])
+        self.assertEqual(1, stats['events'])
+        self.assertEqual(1, stats['leaves'])
+        self.assertEqual(0, stats['staleness'])
+
     def test_revoke_by_expiration_project_and_domain_fails(self):
         user_id = _new_id()
         expires_at = timeutils.isotime(_future_time(), subsecond=True)
@@ -567,40 +610,16 @@ class RevokeTreeTests(tests.TestCase):
         return self.assertEqual(0, len(collection), "collection not empty")
 
     def _assertEventsMatchIteration(self, turn):
-        self.assertEqual(1, len(self.tree.revoke_map))
-        self.assertEqual(turn + 1, len(self.tree.revoke_map
-                                       ['trust_id=*']
-                                       ['consumer_id=*']
-                                       ['access_token_id=*']
-                                       ['audit_id=*']
-                                       ['audit_chain_id=*']))
-        # two different functions add  domain_ids, +1 for None
-        self.assertEqual(2 * turn + 1, len(self.tree.revoke_map
-                                           ['trust_id=*']
-                                           ['consumer_id=*']
-                                           ['access_token_id=*']
-                                           ['audit_id=*']
-                                           ['audit_chain_id=*']
-                                           ['expires_at=*']))
-        # two different functions add  project_ids, +1 for None
-        self.assertEqual(2 * turn + 1, len(self.tree.revoke_map
-                                           ['trust_id=*']
-                                           ['consumer_id=*']
-                                           ['access_token_id=*']
-                                           ['audit_id=*']
-                                           ['audit_chain_id=*']
-                                           ['expires_at=*']
-                                           ['domain_id=*']))
+        revoke_map = self.tree.revoke_map
+        # one shape per kind of event added
+        self.assertEqual(5, len(revoke_map))
+        self.assertEqual(turn, len(revoke_map[('expires_at', 'user_id')]))
+        # two different functions add domain role assignments
+        self.assertEqual(2 * turn, len(revoke_map[('domain_id', 'role_id')]))
+        self.assertEqual(turn, len(revoke_map[('project_id', 'role_id')]))
+        self.assertEqual(turn, len(revoke_map[('project_id', 'user_id')]))
         # 10 users added
-        self.assertEqual(turn, len(self.tree.revoke_map
-                                   ['trust_id=*']
-                                   ['consumer_id=*']
-                                   ['access_token_id=*']
-                                   ['audit_id=*']
-                                   ['audit_chain_id=*']
-                                   ['expires_at=*']
-                                   ['domain_id=*']
-                                   ['project_id=*']))
+        self.assertEqual(turn, len(revoke_map[('user_id',)]))
 
     def test_cleanup(self):
         events = self.events
@@ -615,12 +634,8 @@ class RevokeTreeTests(tests.TestCase):
             events.append(
                 self._revoke_by_expiration(*args))
 
-            self.assertEqual(i + 2, len(self.tree.revoke_map
-                                        ['trust_id=*']
-                                        ['consumer_id=*']
-                                        ['access_token_id=*']
-                                        ['audit_id=*']
-                                        ['audit_chain_id=*']),
+            self.assertEqual(i + 1, len(self.tree.revoke_map
+                                        [('expires_at', 'user_id')]),
                              'adding %s to %s' % (args,
                                                   self.tree.revoke_map))
 
@@ -637,3 +652,78 @@ class RevokeTreeTests(tests.TestCase):
         for event in self.events:
             self.tree.remove_event(event)
         self._assertEmpty(self.tree.revoke_map)
+
+    def test_prune(self):
+        user_id = _new_id()
+        event = self._revoke_by_user(user_id)
+        event.revoked_at = _past_time()
+        self.tree.remove_event(event)
+        self.tree.add_event(event)
+        self.events.append(self._revoke_by_user_and_project(_new_id(),
+                                                            _new_id()))
+
+        oldest = timeutils.utcnow() - datetime.timedelta(days=1)
+        self.assertEqual(1, self.tree.prune(oldest))
+        self.assertNotIn(('user_id',), self.tree.revoke_map)
+        self.assertEqual(1, len(self.tree.revoke_map))
+
+        # pruning again is a no-op
+        self.assertEqual(0, self.tree.prune(oldest))
+
+    def test_prune_event_revoked_again(self):
+        user_id = _new_id()
+        event = model.RevokeEvent(user_id=user_id, revoked_at=_past_time())
+        self.tree.add_event(event)
+        # revoked again later, so it is kept
+        self._revoke_by_user(user_id)
+
+        oldest = timeutils.utcnow() - datetime.timedelta(days=1)
+        self.assertEqual(0, self.tree.prune(oldest))
+        self.assertEqual(1, len(self.tree))
+
+    def test_generation_changes_only_with_the_index(self):
+        event = self._revoke_by_user(_new_id())
+        generation = self.tree.generation
+
+        # polls add the events they already saw again
+        self.tree.add_event(event)
+        self.assertEqual(generation, self.tree.generation)
+        self.tree.add_event(model.RevokeEvent(
+            user_id=event.user_id, issued_before=_past_time(),
+            revoked_at=_past_time()))
+        self.assertEqual(generation, self.tree.generation)
+
+        self.tree.add_event(model.RevokeEvent(
+            user_id=event.user_id, issued_before=_future_time(),
+            revoked_at=event.revoked_at))
+        self.assertNotEqual(generation, self.tree.generation)
+        generation = self.tree.generation
+
+        self._revoke_by_user(_new_id())
+        self.assertNotEqual(generation, self.tree.generation)
+
+    def test_is_revoked_many(self):
+        token_to_revoke = self.token_to_revoke
+        tokens = self.project_tokens
+        self._revoke_by_grant(role_id=self.role_ids[0],
+                              project_id=self.project_ids[0])
+
+        token_values_list = [token_to_revoke] + tokens
+        self.assertEqual(
+            [any([_matches(e, t) for e in self.events])
+             for t in token_values_list],
+            self.tree.is_revoked_many(token_values_list))
+        self.assertEqual([True, False, True, False],
+                         self.tree.is_revoked_many(token_values_list))
+
+    def test_many_events_same_shape(self):
+        for i in range(0, 1000):
+            self.events.append(self._revoke_by_user_and_project(_new_id(),
+                                                                _new_id()))
+        self.assertEqual(1, len(self.tree.revoke_map))
+        self._assertTokenNotRevoked(self.token_to_revoke)
+
+        token_data = _sample_blank_token()
+        token_data['user_id'] = self.events[500].user_id
+        token_data['project_id'] = self.events[500].project_id
+        self._assertTokenRevoked(token_data)
@@ -20,7 +20,10 @@
 
 import uuid
 
+import mock
+
 from keystone import config
+from keystone import exception
 from keystone.contrib.keystone_scim import controllers
 from keystone.tests import test_v3
 import keystone.tests.core as core
@@ -95,6 +98,37 @@ class BaseCRUDTests(object):
         self.assertEqual(count, int(res_entities['itemsPerPage']))
         self.assertTrue(count < int(res_entities['totalResults']) )
 
+    def test_list_pagination_total_unfiltered(self):
+        for i in range(0, 2):
+            self.post(self.URL,
+                      body=self.build_entity(uuid.uuid4().hex, self.domain_id))
+
+        res_entities = self.get(self.URL).result
+        self.assertTrue(len(res_entities['Resources']) >= 2)
+        self.assertEqual(len(res_entities['Resources']),
+                         int(res_entities['totalResults']))
+
+        res_entities = self.get(self.URL + '?count=1').result
+        self.assertEqual(1, len(res_entities['Resources']))
+        self.assertTrue(int(res_entities['totalResults']) >= 2)
+
+    def test_list_pagination_offset(self):
+        for i in range(0, 3):
+            self.post(self.URL,
+                      body=self.build_entity(uuid.uuid4().hex, self.domain_id))
+
+        URL = ('%(base)s?domain_id=%(domain_id)s' %
+               {'base': self.URL, 'domain_id': self.domain_id})
+        all_ids = sorted(e['id'] for e in self.get(URL).result['Resources'])
+
+        res_entities = self.get(URL + '&startIndex=1&count=1').result
+        self.assertEqual([all_ids[1]],
+                         [e['id'] for e in res_entities['Resources']])
+        self.assertEqual(len(all_ids), int(res_entities['totalResults']))
+        self.assertEqual(1, int(res_entities['startIndex']))
+
+        self.get(URL + '&count=-1', expected_status=400)
+
     def test_get(self):
         name = uuid.uuid4().hex
         entity = self.build_entity(name, self.domain_id)
@@ -374,6 +408,106 @@ class OrganizationsTests(test_v3.RestfulTestCase, BaseCRUDTests):
         modified_entity['name'] = uuid.uuid4().hex
         return modified_entity
 
+class Bulkv2Tests(test_v3.RestfulTestCase):
+
+    EXTENSION_NAME = 'scim'
+    EXTENSION_TO_ADD = 'scim_extension'
+
+    URL = '/OS-SCIM/v2/Bulk'
+    USERS_URL = '/OS-SCIM/v2/Users'
+
+    def setUp(self):
+        super(Bulkv2Tests, self).setUp()
+        self.base_url = 'http://localhost/v3'
+        self.controller = controllers.ScimBulkController()
+
+    def build_user(self, bulk_id, name):
+        return {
+            'method': 'POST',
+            'path': '/Users',
+            'bulkId': bulk_id,
+            'data': {
+                'schemas': ['urn:scim:schemas:core:2.0',
+                            'urn:scim:schemas:extension:keystone:2.0'],
+                'userName': name,
+                'password': 'password',
+                'emails': [{'value': '%s@mailhost.com' % name}],
+                'active': True,
+                'urn:scim:schemas:extension:keystone:2.0': {
+                    'domain_id': self.domain_id
+                }
+            }
+        }
+
+    def test_bulk_create_users(self):
+        self.config_fixture.config(group='scim', bulk_chunk_size=2)
+        names = [uuid.uuid4().hex for i in range(0, 3)]
+        body = {'Operations': [self.build_user(name, name)
+                               for name in names]}
+        resp = self.post(self.URL, body=body, expected_status=200).result
+
+        self.assertEqual([name for name in names],
+                         [op['bulkId'] for op in resp['Operations']])
+        for name, op in zip(names, resp['Operations']):
+            self.assertEqual('201', op['status'])
+            user_id = op['location'].rsplit('/', 1)[1]
+            user = self.get('%s/%s' % (self.USERS_URL, user_id)).result
+            self.assertEqual(name, user['userName'])
+            project_id = user['urn:scim:schemas:extension:keystone:2.0'][
+                'default_project_id']
+            roles = self.assignment_api.get_roles_for_user_and_project(
+                user_id, project_id)
+            self.assertEqual(1, len(roles))
+
+    def test_bulk_references_and_errors(self):
+        name = uuid.uuid4().hex
+        body = {'Operations': [
+            self.build_user('new', name),
+            {'method': 'PATCH', 'path': '/Users/bulkId:new',
+             'data': {'displayName': 'Patched'}},
+            {'method': 'DELETE', 'path': '/Users/%s' % uuid.uuid4().hex},
+            {'method': 'DELETE', 'path': '/Users/bulkId:unknown'},
+        ]}
+        resp = self.post(self.URL, body=body, expected_status=200).result
+
+        self.assertEqual(['201', '200', '404', '400'],
+                         [op['status'] for op in resp['Operations']])
+        user_id = resp['Operations'][0]['location'].rsplit('/', 1)[1]
+        user = self.get('%s/%s' % (self.USERS_URL, user_id)).result
+        self.assertEqual('Patched', user['displayName'])
+
+    def test_bulk_fail_on_errors(self):
+        body = {'failOnErrors': 1, 'Operations': [
+            {'method': 'DELETE', 'path': '/Users/%s' % uuid.uuid4().hex},
+            self.build_user('new', uuid.uuid4().hex),
+        ]}
+        resp = self.post(self.URL, body=body, expected_status=200).result
+        self.assertEqual(['404'], [op['status'] for op in resp['Operations']])
+
+    def test_bulk_users_deleted_when_organizations_fail(self):
+        names = [uuid.uuid4().hex for i in range(0, 2)]
+        body = {'Operations': [self.build_user(name, name)
+                               for name in names]}
+        with mock.patch.object(
+                self.assignment_api, 'create_projects',
+                side_effect=exception.Conflict(type='project',
+                                               details='')):
+            resp = self.post(self.URL, body=body, expected_status=200).result
+
+        self.assertEqual(['409', '409'],
+                         [op['status'] for op in resp['Operations']])
+        for name in names:
+            self.assertRaises(exception.UserNotFound,
+                              self.identity_api.get_user_by_name,
+                              name, self.domain_id)
+
+    def test_bulk_max_operations(self):
+        self.config_fixture.config(group='scim', bulk_max_operations=1)
+        body = {'Operations': [self.build_user(name, name) for name in
+                               (uuid.uuid4().hex, uuid.uuid4().hex)]}
+        self.post(self.URL, body=body, expected_status=413)
+
+
 class Infov1Tests(test_v3.RestfulTestCase):
     URL = '/OS-SCIM/v1/ServiceProviderConfigs'
 
@@ -400,9 +534,10 @@ class Infov1Tests(test_v3.RestfulTestCase):
                 "communityUsers": commuinty
             },
             'bulk': {
-                'supported': False,
-                'maxOperations': 0,
-                'maxPayloadSize': 0
+                'supported': True,
+                'maxOperations': CONF.scim.bulk_max_operations,
+                'maxPayloadSize': min(CONF.scim.bulk_max_payload_size,
+                                      CONF.max_request_body_size)
             },
             'filter': {
                 'supported': True,
@@ -478,9 +613,10 @@ class Infov2Tests(test_v3.RestfulTestCase):
                 "communityUsers": commuinty
             },
             'bulk': {
-                'supported': False,
-                'maxOperations': 0,
-                'maxPayloadSize': 0
+                'supported': True,
+                'maxOperations': CONF.scim.bulk_max_operations,
+                'maxPayloadSize': min(CONF.scim.bulk_max_payload_size,
+                                      CONF.max_request_body_size)
             },
             'filter': {
                 'supported': True,
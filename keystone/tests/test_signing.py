@@ -0,0 +1,69 @@
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from keystoneclient.common import cms
+from oslo.serialization import jsonutils
+
+from keystone.common import signing
+from keystone import config
+from keystone import tests
+
+
+CONF = config.CONF
+
+TOKEN_DATA = jsonutils.dumps({
+    'token': {'methods': ['password'],
+              'user': {'id': 'u1', 'name': u'u\xe9'},
+              'expires_at': '2015-01-01T00:00:00Z'}})
+
+
+class InProcessSigningTests(tests.TestCase):
+
+    def setUp(self):
+        super(InProcessSigningTests, self).setUp()
+        if signing.rsa is None:
+            self.skipTest('cryptography is not installed')
+        self.certfile = CONF.signing.certfile
+        self.keyfile = CONF.signing.keyfile
+
+    def test_pki_token_matches_openssl(self):
+        for text in (TOKEN_DATA, 'first line\nsecond line\r\n', ''):
+            self.assertEqual(
+                cms.cms_sign_token(text, self.certfile, self.keyfile),
+                signing.cms_sign_token(text, self.certfile, self.keyfile))
+
+    def test_pkiz_token_matches_openssl(self):
+        self.assertEqual(
+            cms.pkiz_sign(TOKEN_DATA, self.certfile, self.keyfile),
+            signing.pkiz_sign(TOKEN_DATA, self.certfile, self.keyfile))
+
+    def test_pki_token_verifies(self):
+        token_id = signing.cms_sign_token(TOKEN_DATA, self.certfile,
+                                          self.keyfile)
+        verified = cms.cms_verify(cms.token_to_cms(token_id), self.certfile,
+                                  CONF.signing.ca_certs)
+        self.assertEqual(TOKEN_DATA, verified)
+
+    def test_signer_loaded_once(self):
+        signer = signing.get_signer(self.certfile, self.keyfile)
+        self.assertIsNotNone(signer)
+        self.assertIs(signer, signing.get_signer(self.certfile, self.keyfile))
+
+    def test_unusable_key_falls_back_to_openssl(self):
+        self.assertIsNone(signing.get_signer(self.certfile, self.certfile))
+        self.assertIsNone(signing.get_signer(self.certfile, 'missing.pem'))
+
+    def test_in_process_disabled(self):
+        self.config_fixture.config(group='signing', in_process=False)
+        self.assertIsNone(signing.get_signer(self.certfile, self.keyfile))
@@ -29,13 +29,19 @@ WARNING::
    all data will be lost.
 """
 
+import datetime
+import time
+import uuid
+
 from oslo.db.sqlalchemy import utils
+from sqlalchemy.engine import reflection
 
 from keystone.contrib import endpoint_filter
 from keystone.contrib import endpoint_policy
 from keystone.contrib import example
 from keystone.contrib import federation
 from keystone.contrib import oauth1
+from keystone.contrib import oauth2
 from keystone.contrib import revoke
 from keystone.tests import test_sql_upgrade
 
@@ -295,3 +301,94 @@ class RevokeExtension(test_sql_upgrade.SqlMigrateBase):
                                 _REVOKE_COLUMN_NAMES)
         self.downgrade(0, repository=self.repo_path)
         self.assertTableDoesNotExist('revocation_event')
+
+
+_OAUTH2_ACCESS_TOKEN_INDEXES = [
+    'ix_access_token_oauth2_authorizing_user_id',
+    'ix_access_token_oauth2_refresh_token',
+    'ix_access_token_oauth2_expires_at',
+]
+
+
+class OAuth2Extension(test_sql_upgrade.SqlMigrateBase):
+
+    def repo_package(self):
+        return oauth2
+
+    def upgrade(self, version):
+        super(OAuth2Extension, self).upgrade(
+            version, repository=self.repo_path)
+
+    def downgrade(self, version):
+        super(OAuth2Extension, self).downgrade(
+            version, repository=self.repo_path)
+
+    def _insert_access_token(self, expires_at):
+        consumer_table = utils.get_table(self.engine, 'consumer_oauth2')
+        access_token_table = utils.get_table(self.engine,
+                                             'access_token_oauth2')
+        consumer_id = uuid.uuid4().hex
+        token_id = uuid.uuid4().hex
+        with self.engine.begin() as conn:
+            conn.execute(consumer_table.insert(),
+                         id=consumer_id,
+                         name=uuid.uuid4().hex,
+                         secret=uuid.uuid4().hex,
+                         client_type='confidential',
+                         redirect_uris='[]',
+                         grant_type='authorization_code',
+                         response_type='code')
+            conn.execute(access_token_table.insert(),
+                         id=token_id,
+                         consumer_id=consumer_id,
+                         authorizing_user_id=uuid.uuid4().hex,
+                         expires_at=expires_at,
+                         valid=True)
+        return token_id
+
+    def _get_expires_at(self, token_id):
+        access_token_table = utils.get_table(self.engine,
+                                             'access_token_oauth2')
+        query = (access_token_table.select()
+                 .where(access_token_table.c.id == token_id))
+        return self.engine.execute(query).fetchone()['expires_at']
+
+    def _get_index_names(self):
+        inspector = reflection.Inspector.from_engine(self.engine)
+        return [index['name'] for index
+                in inspector.get_indexes('access_token_oauth2')]
+
+    def test_upgrade_access_token_expires_at(self):
+        self.upgrade(10)
+        token_id = self._insert_access_token('2015-06-01 12:00:00')
+        invalid_token_id = self._insert_access_token(uuid.uuid4().hex)
+
+        self.upgrade(11)
+        # NOTE(garcianavalon) the old value was stored in the local time
+        # of the server
+        local = datetime.datetime(2015, 6, 1, 12, 0, 0)
+        expected = datetime.datetime.utcfromtimestamp(
+            time.mktime(local.timetuple()))
+        self.assertEqual(expected, self._get_expires_at(token_id))
+        # unparseable values are converted to an already expired date
+        self.assertTrue(self._get_expires_at(invalid_token_id) <=
+                        datetime.datetime.utcnow())
+
+        access_token_table = utils.get_table(self.engine,
+                                             'access_token_oauth2')
+        self.assertFalse(access_token_table.c.expires_at.nullable)
+        index_names = self._get_index_names()
+        for name in _OAUTH2_ACCESS_TOKEN_INDEXES:
+            self.assertIn(name, index_names)
+
+    def test_downgrade_access_token_expires_at(self):
+        self.upgrade(10)
+        token_id = self._insert_access_token('2015-06-01 12:00:00')
+
+        self.upgrade(11)
+        self.downgrade(10)
+        self.assertEqual('2015-06-01 12:00:00',
+                         self._get_expires_at(token_id))
+        index_names = self._get_index_names()
+        for name in _OAUTH2_ACCESS_TOKEN_INDEXES:
+            self.assertNotIn(name, index_names)
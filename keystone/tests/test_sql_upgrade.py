@@ -1462,6 +1462,32 @@ class SqlUpgradeTests(SqlMigrateBase):
         index_data = [(idx.name, idx.columns.keys()) for idx in table.indexes]
         self.assertNotIn(('ix_actor_id', ['actor_id']), index_data)
 
+    def test_add_list_filter_indexes(self):
+        self.upgrade(61)
+        self.upgrade(62)
+        for table_name, column_name in [('user', 'name'),
+                                        ('user', 'username'),
+                                        ('project', 'name'),
+                                        ('group', 'name')]:
+            table = sqlalchemy.Table(table_name, self.metadata, autoload=True)
+            index_data = [(idx.name, idx.columns.keys())
+                          for idx in table.indexes]
+            self.assertIn(('ix_%s_%s' % (table_name, column_name),
+                           [column_name]), index_data)
+
+    def test_remove_list_filter_indexes(self):
+        self.upgrade(62)
+        self.downgrade(61)
+        for table_name, column_name in [('user', 'name'),
+                                        ('user', 'username'),
+                                        ('project', 'name'),
+                                        ('group', 'name')]:
+            table = sqlalchemy.Table(table_name, self.metadata, autoload=True)
+            index_data = [(idx.name, idx.columns.keys())
+                          for idx in table.indexes]
+            self.assertNotIn(('ix_%s_%s' % (table_name, column_name),
+                              [column_name]), index_data)
+
     def populate_user_table(self, with_pass_enab=False,
                             with_pass_enab_domain=False):
         # Populate the appropriate fields in the user
@@ -147,6 +147,23 @@ class UtilsTestCase(tests.TestCase):
         self.assertTrue(utils.check_password(password, hashed))
         self.assertFalse(utils.check_password(wrong, hashed))
 
+    def test_crypt_pool(self):
+        self.config_fixture.config(crypt_workers=2)
+        pool = utils.CryptWorkerPool()
+        self.assertEqual(utils.hash_access_key('key'),
+                         pool.execute(utils.hash_access_key, 'key'))
+        stats = pool.get_stats()
+        self.assertEqual(1, stats['calls'])
+        self.assertEqual(0, stats['pending'])
+        self.assertEqual(1, stats['max_pending'])
+
+    def test_crypt_pool_disabled(self):
+        self.config_fixture.config(crypt_workers=0)
+        pool = utils.CryptWorkerPool()
+        self.assertEqual(utils.hash_access_key('key'),
+                         pool.execute(utils.hash_access_key, 'key'))
+        self.assertEqual(0, pool.get_stats()['calls'])
+
     def test_auth_str_equal(self):
         self.assertTrue(utils.auth_str_equal('abc123', 'abc123'))
         self.assertFalse(utils.auth_str_equal('a', 'aaaaa'))
@@ -19,6 +19,7 @@ import operator
 import uuid
 
 from keystoneclient.common import cms
+import mock
 from oslo.utils import timeutils
 import six
 from testtools import matchers
@@ -1384,6 +1385,83 @@ class TestTokenRevokeApi(TestTokenRevokeById):
             events_response,
             audit_id=response['audit_ids'][0])
 
+    def test_validated_token_result_is_remembered(self):
+        token = self.get_scoped_token()
+        self.token_provider_api.validate_v3_token(token)
+
+        persistence = self.token_provider_api._persistence
+        with mock.patch.object(persistence, 'get_token') as mock_get_token:
+            self.token_provider_api.validate_v3_token(token)
+            # an event that doesn't match the token keeps the result
+            self.revoke_api.revoke_by_user(self.user2['id'])
+            self.token_provider_api.validate_v3_token(token)
+            self.assertFalse(mock_get_token.called)
+
+        self.revoke_api.revoke_by_user(self.user['id'])
+        self.assertRaises(exception.TokenNotFound,
+                          self.token_provider_api.validate_v3_token,
+                          token)
+
+    def test_validated_token_result_not_remembered_without_caching(self):
+        # NOTE(garcianavalon) the revocation tree is then fetched again on
+        # every check, so a remembered result would only add fetches
+        self.config_fixture.config(group='revoke', caching=False)
+        token = self.get_scoped_token()
+        self.token_provider_api.validate_v3_token(token)
+
+        revoke_driver = self.revoke_api.driver
+        with mock.patch.object(revoke_driver, 'get_events',
+                               wraps=revoke_driver.get_events) as get_events:
+            self.token_provider_api.validate_v3_token(token)
+            self.assertEqual(1, get_events.call_count)
+        self.assertIsNone(self.revoke_api.get_revoke_generation())
+
+    def test_validate_tokens_batch(self):
+        token = self.get_scoped_token()
+        revoked_token = self.get_scoped_token()
+        self.delete('/auth/tokens',
+                    headers={'X-Subject-Token': revoked_token},
+                    expected_status=204)
+
+        body = {'tokens': [token, revoked_token, uuid.uuid4().hex]}
+        r = self.post('/auth/tokens/batch', body=body, expected_status=200)
+        results = r.json_body['tokens']
+        self.assertEqual([token, revoked_token, body['tokens'][2]],
+                         [result['id'] for result in results])
+        self.assertEqual([True, False, False],
+                         [result['valid'] for result in results])
+        self.assertEqual(self.user['id'], results[0]['token']['user']['id'])
+        self.assertNotIn('token', results[1])
+
+    def test_validate_tokens_batch_requires_list(self):
+        self.post('/auth/tokens/batch', body={'tokens': 'not-a-list'},
+                  expected_status=400)
+
+    def test_validate_tokens_batch_fetches_revocations_once(self):
+        tokens = [self.get_scoped_token() for _ in range(3)]
+        for caching in (True, False):
+            self.config_fixture.config(group='revoke', caching=caching)
+            revoke_driver = self.revoke_api.driver
+            with mock.patch.object(revoke_driver, 'get_events',
+                                   wraps=revoke_driver.get_events) as fetch:
+                valid_tokens = self.token_provider_api.validate_tokens(tokens)
+                self.assertTrue(fetch.call_count <= 1)
+            self.assertEqual(set(tokens), set(valid_tokens))
+
+    def test_validate_tokens_batch_requires_token_ids(self):
+        token = self.get_scoped_token()
+        for invalid in [{'id': token}, 1, None, '', [token]]:
+            self.post('/auth/tokens/batch', body={'tokens': [token, invalid]},
+                      expected_status=400)
+
+    def test_validate_tokens_batch_too_large(self):
+        self.config_fixture.config(group='token', max_batch_validation=2)
+        token = self.get_scoped_token()
+        body = {'tokens': [token, uuid.uuid4().hex]}
+        self.post('/auth/tokens/batch', body=body, expected_status=200)
+        body['tokens'].append(uuid.uuid4().hex)
+        self.post('/auth/tokens/batch', body=body, expected_status=400)
+
     def test_revoke_by_id_false_410(self):
         self.get('/auth/tokens/OS-PKI/revoked', expected_status=410)
 
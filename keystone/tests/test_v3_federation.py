@@ -37,6 +37,7 @@ from keystone.contrib.federation import utils as mapping_utils
 from keystone import exception
 from keystone import notifications
 from keystone.openstack.common import log
+from keystone import tests
 from keystone.tests import federation_fixtures
 from keystone.tests import mapping_fixtures
 from keystone.tests import test_v3
@@ -769,6 +770,51 @@ class MappingRuleEngineTests(FederationTests):
         self.assertRaises(exception.Unauthorized,
                           rp.process, assertion)
 
+    def test_rule_engine_many_rules_in_order(self):
+        """Rules are evaluated in order, whatever their index."""
+        rules = [{'local': [{'group': {'id': 'group%d' % index}}],
+                  'remote': [{'type': 'orgPersonType',
+                              'any_one_of': ['Type%d' % index]}]}
+                 for index in range(100)]
+        rules.insert(50, {'local': [{'user': {'name': 'first'}}],
+                          'remote': [{'type': 'UserName',
+                                      'not_any_of': ['root']}]})
+        rules.append({'local': [{'user': {'name': '{0}'}}],
+                      'remote': [{'type': 'UserName'},
+                                 {'type': 'Email', 'regex': True,
+                                  'any_one_of': ['@example.com$']}]})
+        rp = mapping_utils.RuleProcessor(rules)
+        values = rp.process({'UserName': 'tbo',
+                             'Email': 'tbo@example.com',
+                             'orgPersonType': 'Type7;Type70;Other'})
+        self.assertEqual('first', values['name'])
+        self.assertEqual(['group7', 'group70'], sorted(values['group_ids']))
+
+        values = rp.process({'UserName': 'root',
+                             'Email': 'root@example.com'})
+        self.assertEqual('root', values['name'])
+        self.assertEqual([], values['group_ids'])
+
+    def test_rule_processor_built_once_per_mapping(self):
+        mapping = {'id': uuid.uuid4().hex,
+                   'rules': jsonutils.dumps(
+                       mapping_fixtures.MAPPING_SMALL['rules'])}
+        self.addCleanup(mapping_utils.invalidate_rule_processor,
+                        mapping['id'])
+        rp = mapping_utils.get_rule_processor(mapping)
+        self.assertIs(rp, mapping_utils.get_rule_processor(dict(mapping)))
+
+        mapping['rules'] = jsonutils.dumps(
+            mapping_fixtures.MAPPING_LARGE['rules'])
+        updated_rp = mapping_utils.get_rule_processor(mapping)
+        self.assertIsNot(rp, updated_rp)
+        self.assertEqual(mapping_fixtures.MAPPING_LARGE['rules'],
+                         updated_rp.rules)
+
+        mapping_utils.invalidate_rule_processor(mapping['id'])
+        self.assertIsNot(updated_rp,
+                         mapping_utils.get_rule_processor(mapping))
+
 
 class FederatedTokenTests(FederationTests):
 
@@ -1807,6 +1853,8 @@ class SAMLGenerationTests(FederationTests):
         self.assertEqual(self.PROJECT, project_attribute[0].text)
 
     def test_assertion_using_explicit_namespace_prefixes(self):
+        self.config_fixture.config(group='saml', in_process=False)
+
         class MockedPopen(object):
             def __init__(self, *popenargs, **kwargs):
                 # the last option is the assertion file to be signed
@@ -1847,6 +1895,7 @@ class SAMLGenerationTests(FederationTests):
         """
         if not _is_xmlsec1_installed():
             self.skip('xmlsec1 is not installed')
+        self.config_fixture.config(group='saml', in_process=False)
 
         generator = keystone_idp.SAMLGenerator()
         response = generator.samlize_token(self.ISSUER, self.RECIPIENT,
@@ -1865,6 +1914,37 @@ class SAMLGenerationTests(FederationTests):
         cert_text = cert_text.replace(os.linesep, '')
         self.assertEqual(idp_public_key, cert_text)
 
+    def test_saml_signing_in_process(self):
+        """Test the assertions signed in process are valid for xmlsec1."""
+        if keystone_idp._get_assertion_signer() is None:
+            self.skipTest('cryptography or lxml is not installed')
+
+        with mock.patch('subprocess.Popen') as popen:
+            generator = keystone_idp.SAMLGenerator()
+            response = generator.samlize_token(self.ISSUER, self.RECIPIENT,
+                                               self.SUBJECT, self.ROLES,
+                                               self.PROJECT)
+        self.assertFalse(popen.called)
+
+        signature = response.assertion.signature
+        idp_public_key = sigver.read_cert_from_file(CONF.saml.certfile, 'pem')
+        cert_text = signature.key_info.x509_data[0].x509_certificate.text
+        self.assertEqual(idp_public_key, cert_text)
+        self.assertTrue(signature.signature_value.text)
+        assertion_xml = response.assertion.to_string()
+        self.assertIn('<saml:Assertion', assertion_xml)
+
+        if not _is_xmlsec1_installed():
+            self.skipTest('xmlsec1 is not installed')
+        response_file = tests.dirs.tmp('signed_saml2_response.xml')
+        self.addCleanup(os.remove, response_file)
+        with open(response_file, 'w') as f:
+            f.write(response.to_string())
+        self.assertEqual(0, subprocess.call(
+            [CONF.saml.xmlsec1_binary, '--verify', '--pubkey-cert-pem',
+             CONF.saml.certfile, '--id-attr:ID', 'Assertion',
+             response_file]))
+
     def _create_generate_saml_request(self, token_id, region_id):
         return {
             "auth": {
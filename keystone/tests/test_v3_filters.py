@@ -417,6 +417,84 @@ class IdentityTestListLimitCase(IdentityTestFilteredCase):
         """
         self._test_entity_list_limit('policy', 'policy')
 
+    def _test_entity_pagination(self, entity):
+        """GET /<entities>?limit=3, following the next links
+
+        Test Plan:
+
+        - List all the entities at once
+        - List them again, three at a time, following the next link of
+          every page, and check that they are all returned once, in id order
+
+        """
+        if entity == 'policy':
+            plural = 'policies'
+        else:
+            plural = '%ss' % entity
+
+        r = self.get('/%s' % plural, auth=self.auth)
+        expected_ids = sorted(ref['id'] for ref in r.result.get(plural))
+
+        ids = []
+        path = '/%s?limit=3' % plural
+        while path:
+            r = self.get(path, auth=self.auth)
+            page = r.result.get(plural)
+            self.assertTrue(len(page) <= 3)
+            ids += [ref['id'] for ref in page]
+            next_url = r.result.get('links')['next']
+            path = next_url and next_url.split('/v3', 1)[1]
+        self.assertEqual(expected_ids, ids)
+
+    def test_users_pagination(self):
+        self._test_entity_pagination('user')
+
+    def test_non_driver_pagination(self):
+        self._test_entity_pagination('policy')
+
+    def test_invalid_pagination(self):
+        self.get('/users?limit=0', auth=self.auth, expected_status=400)
+        self.get('/users?marker=a', auth=self.auth, expected_status=400)
+
+    def test_list_users_sorted(self):
+        """GET /users?sort_key=name&sort_dir=desc"""
+        self._set_policy({"identity:list_users": []})
+        user_list = self._create_test_data('user', 5)
+        for index, user in enumerate(user_list):
+            user['name'] = 'sorted-%d' % index
+            self.identity_api.update_user(user['id'], user)
+
+        r = self.get('/users?name__startswith=sorted-&sort_key=name'
+                     '&sort_dir=desc', auth=self.auth)
+        names = [ref['name'] for ref in r.result.get('users')]
+        self.assertEqual(['sorted-%d' % index for index in range(4, -1, -1)],
+                         names)
+
+        self._delete_test_data('user', user_list)
+
+    def test_invalid_sort(self):
+        self.get('/users?sort_key=password', auth=self.auth,
+                 expected_status=400)
+        self.get('/users?sort_dir=up', auth=self.auth, expected_status=400)
+        self.get('/users?sort_key=name&marker=YQ', auth=self.auth,
+                 expected_status=400)
+
+    def test_list_users_inexact_filter_escapes_wildcards(self):
+        """GET /users?name__contains=_%
+
+        The wildcards of LIKE in the value of an inexact filter must only
+        match themselves.
+
+        """
+        self._set_policy({"identity:list_users": []})
+        user = self.user1
+        user['name'] = 'my_%name'
+        self.identity_api.update_user(user['id'], user)
+
+        r = self.get('/users?name__contains=_%25', auth=self.auth)
+        self.assertEqual([user['id']],
+                         [ref['id'] for ref in r.result.get('users')])
+
     def test_no_limit(self):
         """Check truncated attribute not set when list not limited."""
 
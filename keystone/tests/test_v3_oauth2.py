@@ -14,15 +14,21 @@
 
 import base64
 import copy
+import datetime
+import functools
 import json
 import urllib
 import urlparse
 import uuid
 
+import mock
+from oslo.utils import timeutils
+
 from keystone import config
 from keystone.common import dependency
 from keystone.contrib.oauth2 import core
 from keystone.tests import test_v3
+from keystone.token.persistence.backends import sql as token_sql
 
 CONF = config.CONF
 
@@ -169,6 +175,29 @@ class ConsumerCRUDTests(OAuth2BaseTests):
         self.assertEqual(consumer['redirect_uris'], update_redirect_uris)
         self.assertEqual(consumer['id'], original_id)
 
+    def test_consumer_update_already_fetched(self):
+        consumer, data = self._create_consumer()
+        consumer_id = consumer['id']
+        # load the consumer so it gets cached
+        self.get(self.CONSUMER_URL + '/%s' % consumer_id)
+
+        update_description = uuid.uuid4().hex
+        self.patch(self.CONSUMER_URL + '/%s' % consumer_id,
+                   body={'consumer': {'description': update_description}})
+        response = self.get(self.CONSUMER_URL + '/%s' % consumer_id)
+        self.assertEqual(update_description,
+                         response.result['consumer']['description'])
+
+    def test_consumer_delete_already_fetched(self):
+        consumer, data = self._create_consumer()
+        consumer_id = consumer['id']
+        self.get(self.CONSUMER_URL + '/%s' % consumer_id)
+
+        self.delete(self.CONSUMER_URL + '/%s' % consumer_id,
+                    expected_status=204)
+        self.get(self.CONSUMER_URL + '/%s' % consumer_id,
+                 expected_status=404)
+
     def test_consumer_update_bad_secret(self):
         consumer, data = self._create_consumer()
         original_id = consumer['id']
@@ -201,7 +230,7 @@ class AccessTokenEndpointTests(OAuth2BaseTests):
             'consumer_id':consumer_id,
             'authorizing_user_id':user_id,
             'scopes': [uuid.uuid4().hex],
-            'expires_at':uuid.uuid4().hex,
+            'expires_at': timeutils.utcnow() + datetime.timedelta(hours=1),
         }
         return token_ref
 
@@ -246,6 +275,21 @@ class AccessTokenEndpointTests(OAuth2BaseTests):
         token = self._get_access_token(self.user['id'], token['id'])
         # TODO(garcianavalon) access_token assertions
 
+    def test_get_access_token_by_refresh_token(self):
+        consumer_id = uuid.uuid4().hex
+        token_ref = self.new_access_token_ref(self.user['id'], consumer_id)
+        token_ref['refresh_token'] = uuid.uuid4().hex
+        self.oauth2_api.store_access_token(token_ref)
+
+        token = self.oauth2_api.get_access_token_by_refresh_token(
+            token_ref['refresh_token'])
+        self.assertEqual(token_ref['id'], token['id'])
+        self.assertEqual(token_ref['expires_at'], token['expires_at'])
+
+        actual_token = self._get_access_token(self.user['id'], token['id'])
+        self.assertEqual(timeutils.isotime(token_ref['expires_at']),
+                         actual_token['expires_at'])
+
     def test_revoke_access_token(self):
         consumer_id = uuid.uuid4().hex
         token = self._create_access_token(self.user['id'], consumer_id)
@@ -256,6 +300,110 @@ class AccessTokenEndpointTests(OAuth2BaseTests):
         # TODO(garcianavalon) test revoke identity api tokens
         # TODO(garcianavalon) test can't get more identity api tokens
 
+    def test_revoke_access_token_already_fetched(self):
+        consumer_id = uuid.uuid4().hex
+        token = self._create_access_token(self.user['id'], consumer_id)
+        # load the token so it gets cached
+        actual_token = self._get_access_token(self.user['id'], token['id'])
+        self.assertEqual(actual_token['valid'], True)
+
+        self._revoke_access_token(self.user['id'], token['id'])
+        actual_token = self._get_access_token(self.user['id'], token['id'])
+        self.assertEqual(actual_token['valid'], False)
+
+    def test_get_access_token_from_other_user(self):
+        consumer_id = uuid.uuid4().hex
+        token = self._create_access_token(self.user['id'], consumer_id)
+        self._get_access_token(self.user['id'], token['id'])
+
+        self._get_access_token(uuid.uuid4().hex, token['id'],
+                               expected_status=404)
+
+    def test_deleted_access_tokens_not_returned(self):
+        consumer_id = uuid.uuid4().hex
+        token = self._create_access_token(self.user['id'], consumer_id)
+        self.oauth2_api.get_access_token(token['id'])
+
+        self.oauth2_api.delete_access_tokens(consumer_id)
+        self._get_access_token(self.user['id'], token['id'],
+                               expected_status=404)
+
+    def test_flush_expired_access_tokens(self):
+        consumer_id = uuid.uuid4().hex
+        now = timeutils.utcnow()
+        expires = {
+            'valid': now + datetime.timedelta(hours=1),
+            'refreshable': now - datetime.timedelta(days=1),
+            'expired': now - datetime.timedelta(days=15),
+        }
+        tokens = {}
+        for name, expires_at in expires.items():
+            token_ref = self.new_access_token_ref(self.user['id'],
+                                                  consumer_id)
+            token_ref['expires_at'] = expires_at
+            tokens[name] = self.oauth2_api.store_access_token(token_ref)
+
+        removed = self.oauth2_api.driver.flush_expired_access_tokens()
+        self.assertEqual(1, removed)
+
+        remaining = [t['id'] for t in
+                     self.oauth2_api.list_access_tokens(self.user['id'])]
+        self.assertItemsEqual([tokens['valid']['id'],
+                               tokens['refreshable']['id']], remaining)
+
+    def test_flush_expired_authorization_codes(self):
+        consumer_id = uuid.uuid4().hex
+        now = timeutils.utcnow()
+        codes = {}
+        for name, delta in [('valid', 1), ('used', 1), ('expired', -1)]:
+            expires_at = now + datetime.timedelta(hours=delta)
+            codes[name] = self.oauth2_api.store_authorization_code({
+                'code': uuid.uuid4().hex,
+                'consumer_id': consumer_id,
+                'authorizing_user_id': self.user['id'],
+                'expires_at': timeutils.isotime(expires_at, subsecond=True),
+                'redirect_uri': uuid.uuid4().hex,
+            })
+        self.oauth2_api.invalidate_authorization_code(codes['used']['code'])
+
+        removed = self.oauth2_api.driver.flush_expired_authorization_codes()
+        self.assertEqual(2, removed)
+
+        remaining = [c['code'] for c in
+                     self.oauth2_api.list_authorization_codes(self.user['id'])]
+        self.assertEqual([codes['valid']['code']], remaining)
+
+    def test_flush_used_authorization_codes_in_batches(self):
+        consumer_id = uuid.uuid4().hex
+        now = timeutils.utcnow()
+        valid_codes = []
+        for hours in range(1, 8):
+            expires_at = now + datetime.timedelta(hours=hours)
+            code = self.oauth2_api.store_authorization_code({
+                'code': uuid.uuid4().hex,
+                'consumer_id': consumer_id,
+                'authorizing_user_id': self.user['id'],
+                'expires_at': timeutils.isotime(expires_at, subsecond=True),
+                'redirect_uri': uuid.uuid4().hex,
+            })
+            # every other code was exchanged for a token
+            if hours % 2:
+                self.oauth2_api.invalidate_authorization_code(code['code'])
+            else:
+                valid_codes.append(code['code'])
+
+        batched = functools.partial(token_sql._expiry_range_batched,
+                                    batch_size=2)
+        with mock.patch.object(token_sql, '_expiry_range_strategy',
+                               return_value=batched):
+            removed = (
+                self.oauth2_api.driver.flush_expired_authorization_codes())
+        self.assertEqual(4, removed)
+
+        remaining = [c['code'] for c in
+                     self.oauth2_api.list_authorization_codes(self.user['id'])]
+        self.assertItemsEqual(valid_codes, remaining)
+
 
 class OAuth2FlowBaseTests(OAuth2BaseTests):
 
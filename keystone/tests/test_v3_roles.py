@@ -12,11 +12,14 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
 import json
 import uuid
 
 from urllib import urlencode
 
+from oslo.utils import timeutils
+
 from keystone import config
 from keystone.common import dependency
 from keystone.contrib.roles import core
@@ -1061,6 +1064,84 @@ class InternalRolesTests(RolesBaseTests):
         allowed_apps = json.loads(response.body)['allowed_applications']
         self.assertEqual([app_id], allowed_apps)
 
+    def test_allowed_applications_follow_permission_changes(self):
+        user, organization = self._create_user()
+        permission = core.MANAGE_APPLICATION_PERMISSION
+        app_id = uuid.uuid4().hex
+        internal_roles, expected_roles = self._create_internal_roles_user(
+            user, organization, permission, app_id)
+
+        response = self._list_applications_user_allowed_to_manage(
+            user_id=user['id'], organization_id=organization['id'])
+        allowed_apps = json.loads(response.body)['allowed_applications']
+        self.assertEqual([app_id], allowed_apps)
+
+        # the permissions of the role are now indexed, removing the
+        # permission must be reflected in the next listing
+        role_id = internal_roles[0]['id']
+        permission_id = expected_roles[role_id][0]['id']
+        self._remove_permission_from_role(role_id, permission_id)
+
+        response = self._list_applications_user_allowed_to_manage(
+            user_id=user['id'], organization_id=organization['id'])
+        allowed_apps = json.loads(response.body)['allowed_applications']
+        self.assertEqual([], allowed_apps)
+
+        self._add_permission_to_role(role_id, permission_id)
+
+        response = self._list_applications_user_allowed_to_manage(
+            user_id=user['id'], organization_id=organization['id'])
+        allowed_apps = json.loads(response.body)['allowed_applications']
+        self.assertEqual([app_id], allowed_apps)
+
+    def test_allowed_roles_follow_role_changes(self):
+        user, organization = self._create_user()
+        permission = core.ASSIGN_ALL_PUBLIC_ROLES_PERMISSION
+        app_id = uuid.uuid4().hex
+        internal_roles, expected_roles = self._create_internal_roles_user(
+            user, organization, permission, app_id)
+
+        response = self._list_roles_user_allowed_to_assign(
+            user_id=user['id'], organization_id=organization['id'])
+        allowed_roles = json.loads(response.body)['allowed_roles']
+        self.assertItemsEqual(expected_roles.keys(), allowed_roles[app_id])
+
+        # roles created and deleted after the application roles have been
+        # indexed must show up in the next listing
+        new_role = self._create_role(
+            self.new_fiware_role_ref(uuid.uuid4().hex, application=app_id))
+        deleted_role_id = [r_id for r_id in expected_roles
+                           if not expected_roles[r_id]][0]
+        self._delete_role(deleted_role_id)
+
+        response = self._list_roles_user_allowed_to_assign(
+            user_id=user['id'], organization_id=organization['id'])
+        allowed_roles = json.loads(response.body)['allowed_roles']
+        expected = [r_id for r_id in expected_roles
+                    if r_id != deleted_role_id] + [new_role['id']]
+        self.assertItemsEqual(expected, allowed_roles[app_id])
+
+    def test_permission_index_batches_role_permissions(self):
+        role_ids = []
+        for i in range(3):
+            role = self._create_role()
+            permission = self._create_permission(
+                self.new_fiware_permission_ref(
+                    uuid.uuid4().hex, application=role['application_id'],
+                    is_internal=True))
+            self._add_permission_to_role(role['id'], permission['id'])
+            role_ids.append(role['id'])
+
+        index = core.PermissionIndex(self.manager.driver)
+        permissions = index.get_internal_permissions(role_ids)
+        self.assertItemsEqual(role_ids, permissions.keys())
+        for role_id in role_ids:
+            self.assertEqual(1, len(permissions[role_id]))
+
+        # further lookups are served from the index
+        self.manager.driver.list_permissions_for_roles = None
+        self.assertEqual(permissions, index.get_internal_permissions(role_ids))
+
     def _create_internal_roles_user(self, user, organization, permission, app_id):
         internal_roles = []
         expected_roles = {}
@@ -1140,6 +1221,17 @@ class InternalRolesTests(RolesBaseTests):
         return internal_roles, expected_roles
 
 
+class IndexedInternalRolesTests(InternalRolesTests):
+    """Run the internal roles tests with the permission index enabled."""
+
+    def config_overrides(self):
+        super(IndexedInternalRolesTests, self).config_overrides()
+        self.config_fixture.config(group='roles', permission_index=True)
+
+    def test_permission_index_enabled(self):
+        self.assertIsNotNone(self.manager.permission_index)
+
+
 class PermissionCrudTests(RolesBaseTests):
 
     def test_create_permission_default(self):
@@ -1361,14 +1453,14 @@ class FiwareApiTests(RolesBaseTests):
             'consumer_id':self.application_id,
             'authorizing_user_id':self.test_user['id'],
             'scopes': [uuid.uuid4().hex],
-            'expires_at':uuid.uuid4().hex,
+            'expires_at': timeutils.utcnow() + datetime.timedelta(hours=1),
         }
         oauth2_access_token = self.oauth2_api.store_access_token(token_dict)
         return oauth2_access_token['id']
 
-    def _validate_token(self, token_id):
+    def _validate_token(self, token_id, expected_status=200):
         url = '/access-tokens/%s' %token_id
-        return self.get(url)
+        return self.get(url, expected_status=expected_status)
 
     def _authorized_organizations(self, token_id):
         url = '/authorized_organizations/%s' %token_id
@@ -1494,6 +1586,124 @@ class FiwareApiTests(RolesBaseTests):
         self.response = self._validate_token(token_id)
         self._assert_all()
 
+    def test_validate_token_after_revoke(self):
+        self.number_of_user_roles = 1
+        self._create_all()
+        token_id = self._create_oauth2_token()
+        self.response = self._validate_token(token_id)
+        self._assert_all()
+
+        self.oauth2_api.revoke_access_token(token_id)
+        self._validate_token(token_id, expected_status=401)
+
+    def test_validate_token_after_consumer_delete(self):
+        self.number_of_user_roles = 1
+        self._create_all()
+        token_id = self._create_oauth2_token()
+        self.response = self._validate_token(token_id)
+        self._assert_all()
+
+        self.oauth2_api.delete_consumer(self.application_id)
+        self._validate_token(token_id, expected_status=404)
+
+    def test_validate_token_after_role_assignment_changes(self):
+        self.number_of_organizations = 1
+        self.number_of_user_roles = 1
+        self.number_of_organization_roles = 1
+        self._create_all()
+        token_id = self._create_oauth2_token()
+        self.response = self._validate_token(token_id)
+        self._assert_all()
+
+        # a new user-scoped role is reflected in the next validation
+        role = self._create_role(self.new_fiware_role_ref(
+            uuid.uuid4().hex, application=self.application_id))
+        self._add_role_to_user(role_id=role['id'],
+                               user_id=self.test_user['id'],
+                               organization_id=self.user_organization['id'],
+                               application_id=self.application_id)
+        self.user_roles.append(role)
+        self.number_of_user_roles += 1
+        self.response = self._validate_token(token_id)
+        self._assert_all()
+
+        # and so is the removal of an organization-scoped one
+        organization = self.organizations[0]
+        org_role = self.organization_roles[organization['name']][0]
+        self._remove_role_from_user(role_id=org_role['id'],
+                                    user_id=self.test_user['id'],
+                                    organization_id=organization['id'],
+                                    application_id=self.application_id)
+        self.response = self._validate_token(token_id)
+        self.assertEqual([], self.response.result['organizations'])
+
+    def test_validate_token_after_organization_membership_changes(self):
+        self.number_of_organizations = 2
+        self.number_of_organization_roles = 1
+        self._create_all()
+        token_id = self._create_oauth2_token()
+        self.response = self._validate_token(token_id)
+        self._assert_all()
+
+        # removing the keystone grant removes the organization
+        organization = self.organizations.pop()
+        self.assignment_api.delete_grant(self.keystone_role['id'],
+                                         user_id=self.test_user['id'],
+                                         project_id=organization['id'])
+        self.number_of_organizations -= 1
+        self.response = self._validate_token(token_id)
+        self._assert_all()
+
+        # and so does leaving a group that is a member of it
+        organization = self.organizations[0]
+        group = self.identity_api.create_group(
+            self.new_group_ref(domain_id=test_v3.DEFAULT_DOMAIN_ID))
+        self.identity_api.add_user_to_group(self.test_user['id'],
+                                            group['id'])
+        self.assignment_api.create_grant(self.keystone_role['id'],
+                                         group_id=group['id'],
+                                         project_id=organization['id'])
+        self.assignment_api.delete_grant(self.keystone_role['id'],
+                                         user_id=self.test_user['id'],
+                                         project_id=organization['id'])
+        self.response = self._validate_token(token_id)
+        self._assert_all()
+
+        self.identity_api.remove_user_from_group(self.test_user['id'],
+                                                 group['id'])
+        self.response = self._validate_token(token_id)
+        self.assertEqual([], self.response.result['organizations'])
+
+    def test_validate_token_after_role_update(self):
+        self.number_of_organizations = 1
+        self.number_of_user_roles = 1
+        self.number_of_organization_roles = 1
+        self._create_all()
+        token_id = self._create_oauth2_token()
+        self.response = self._validate_token(token_id)
+        self._assert_all()
+
+        role = self.user_roles[0]
+        new_name = uuid.uuid4().hex
+        self.patch(self.ROLES_URL + '/%s' % role['id'],
+                   body={'role': {'name': new_name}})
+        self.response = self._validate_token(token_id)
+        self.assertEqual([new_name],
+                         [r['name'] for r in self.response.result['roles']])
+
+    def test_validate_token_after_user_update(self):
+        self.number_of_user_roles = 1
+        self._create_all()
+        token_id = self._create_oauth2_token()
+        self.response = self._validate_token(token_id)
+        self._assert_all()
+
+        self.test_user['name'] = uuid.uuid4().hex
+        self.identity_api.update_user(self.test_user['id'],
+                                      {'name': self.test_user['name']})
+        self.response = self._validate_token(token_id)
+        self._assert_user_info()
+
     def test_authorized_organizations(self):
         self.number_of_organizations = 2
         self.number_of_user_roles = 2
@@ -126,6 +126,8 @@ TRUST_ID_PARAMETER_RELATION = json_home.build_v3_extension_parameter_relation(
 V3_JSON_HOME_RESOURCES_INHERIT_DISABLED = {
     json_home.build_v3_resource_relation('auth_tokens'): {
         'href': '/auth/tokens'},
+    json_home.build_v3_resource_relation('auth_tokens_batch'): {
+        'href': '/auth/tokens/batch'},
     json_home.build_v3_resource_relation('auth_catalog'): {
         'href': '/auth/catalog'},
     json_home.build_v3_resource_relation('auth_projects'): {
@@ -0,0 +1,86 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Unit tests for core assignment behavior."""
+
+import uuid
+
+import mock
+
+from keystone.assignment import core
+from keystone import tests
+
+
+class TestEffectiveRolesCache(tests.BaseTestCase):
+
+    def setUp(self):
+        super(TestEffectiveRolesCache, self).setUp()
+        self.cache = core.EffectiveRolesCache(size=3, ttl=60)
+        self.user_id = uuid.uuid4().hex
+        self.project_id = uuid.uuid4().hex
+
+    def _set(self, user_id, target_id, role_ids):
+        self.cache.set(user_id, 'project', target_id, role_ids,
+                       self.cache.generation)
+
+    def test_get_counts_hits_and_misses(self):
+        self.assertIsNone(
+            self.cache.get(self.user_id, 'project', self.project_id))
+        self._set(self.user_id, self.project_id, ['a', 'b'])
+        self.assertEqual(
+            ['a', 'b'],
+            self.cache.get(self.user_id, 'project', self.project_id))
+        self.assertEqual({'entries': 1, 'hits': 1, 'misses': 1},
+                         self.cache.get_stats())
+
+    def test_entries_expire(self):
+        with mock.patch.object(core.time, 'time', return_value=1000):
+            self._set(self.user_id, self.project_id, ['a'])
+        with mock.patch.object(core.time, 'time', return_value=1060):
+            self.assertIsNone(
+                self.cache.get(self.user_id, 'project', self.project_id))
+
+    def test_least_recently_used_entries_are_dropped(self):
+        project_ids = [uuid.uuid4().hex for _ in range(4)]
+        for project_id in project_ids:
+            self._set(self.user_id, project_id, ['a'])
+        self.assertIsNone(
+            self.cache.get(self.user_id, 'project', project_ids[0]))
+        self.assertEqual(3, self.cache.get_stats()['entries'])
+
+    def test_invalidate(self):
+        other_user_id = uuid.uuid4().hex
+        other_project_id = uuid.uuid4().hex
+        self._set(self.user_id, self.project_id, ['a'])
+        self._set(self.user_id, other_project_id, ['a'])
+        self._set(other_user_id, self.project_id, ['a'])
+
+        self.cache.invalidate(self.user_id, self.project_id)
+        self.assertIsNone(
+            self.cache.get(self.user_id, 'project', self.project_id))
+        self.assertIsNotNone(
+            self.cache.get(self.user_id, 'project', other_project_id))
+
+        self.cache.invalidate(target_id=self.project_id)
+        self.assertIsNone(
+            self.cache.get(other_user_id, 'project', self.project_id))
+
+        self.cache.invalidate(user_id=self.user_id)
+        self.assertEqual(0, self.cache.get_stats()['entries'])
+
+    def test_roles_computed_before_an_invalidation_are_ignored(self):
+        generation = self.cache.generation
+        self.cache.invalidate(self.user_id)
+        self.cache.set(self.user_id, 'project', self.project_id, ['a'],
+                       generation)
+        self.assertIsNone(
+            self.cache.get(self.user_id, 'project', self.project_id))
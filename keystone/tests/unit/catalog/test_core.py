@@ -74,3 +74,37 @@ class FormatUrlTests(testtools.TestCase):
                           core.format_url,
                           url_template,
                           values)
+
+
+class CompileUrlTests(testtools.TestCase):
+
+    def setUp(self):
+        super(CompileUrlTests, self).setUp()
+        fixture = self.useFixture(config_fixture.Config(CONF))
+        fixture.config(
+            group='catalog',
+            endpoint_substitution_whitelist=['host', 'port', 'tenant_id',
+                                             'user_id'])
+
+    def test_only_user_substitutions_are_left(self):
+        url_template = 'http://%(host)s:%(port)d/%(tenant_id)s/%(user_id)s'
+        values = {'host': 'server', 'port': 9090}
+        template = core.compile_url(url_template, values)
+
+        self.assertEqual('http://server:9090/%(tenant_id)s/%(user_id)s',
+                         template)
+        self.assertEqual('http://server:9090/A/B',
+                         core.render_url(template, 'A', 'B'))
+
+    def test_percent_signs_are_kept(self):
+        url_template = 'http://%(host)s/a%%20b/%(tenant_id)s'
+        template = core.compile_url(url_template, {'host': '10%'})
+
+        self.assertEqual('http://10%/a%20b/A',
+                         core.render_url(template, 'A', 'B'))
+
+    def test_raises_malformed_on_missing_key(self):
+        self.assertRaises(exception.MalformedEndpoint,
+                          core.compile_url,
+                          'http://%(foo)s/%(tenant_id)s',
+                          {})
@@ -0,0 +1,100 @@
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import contextlib
+import uuid
+
+import testtools
+
+from keystone.common.cache import _hash_ring
+from keystone.common.cache.backends import memcache_pool
+
+
+NODES = ['127.0.0.1:11211', '127.0.0.1:11212', '127.0.0.1:11213']
+
+
+class _FakeClientPool(object):
+    def __init__(self):
+        self.data = {}
+
+    @contextlib.contextmanager
+    def acquire(self):
+        yield self
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, time=0):
+        self.data[key] = value
+        return True
+
+    def get_multi(self, keys):
+        return dict((key, self.data[key]) for key in keys if key in self.data)
+
+    def set_multi(self, mapping, time=0):
+        self.data.update(mapping)
+        return []
+
+
+class HashRingTests(testtools.TestCase):
+
+    def setUp(self):
+        super(HashRingTests, self).setUp()
+        self.keys = [uuid.uuid4().hex for _ in range(1000)]
+
+    def test_all_nodes_get_keys(self):
+        ring = _hash_ring.HashRing(NODES)
+        nodes = ring.get_nodes(self.keys)
+        self.assertEqual(set(NODES), set(nodes))
+        for node_keys in nodes.values():
+            self.assertTrue(len(node_keys) > 100)
+
+    def test_adding_node_moves_few_keys(self):
+        ring = _hash_ring.HashRing(NODES)
+        before = dict((key, ring.get_node(key)) for key in self.keys)
+        ring.add_node('127.0.0.1:11214')
+        moved = [key for key in self.keys if ring.get_node(key) != before[key]]
+        # the keys only move to the new node
+        self.assertEqual(set(['127.0.0.1:11214']),
+                         set(ring.get_node(key) for key in moved))
+        self.assertTrue(len(moved) < len(self.keys) / 2)
+
+    def test_removing_node_only_moves_its_keys(self):
+        ring = _hash_ring.HashRing(NODES)
+        before = dict((key, ring.get_node(key)) for key in self.keys)
+        ring.remove_node(NODES[0])
+        self.assertEqual(set(NODES[1:]), ring.nodes)
+        for key in self.keys:
+            if before[key] != NODES[0]:
+                self.assertEqual(before[key], ring.get_node(key))
+
+    def test_empty_ring(self):
+        ring = _hash_ring.HashRing()
+        self.assertRaises(ValueError, ring.get_node, 'key')
+
+
+class ShardedClientProxyTests(testtools.TestCase):
+
+    def test_keys_go_to_their_node(self):
+        pools = dict((node, _FakeClientPool()) for node in NODES)
+        ring = _hash_ring.HashRing(NODES)
+        client = memcache_pool.ShardedClientProxy(pools, ring)
+        mapping = dict((uuid.uuid4().hex, uuid.uuid4().hex)
+                       for _ in range(100))
+
+        self.assertEqual([], client.set_multi(mapping, time=10))
+        for key, value in mapping.items():
+            self.assertEqual(value, pools[ring.get_node(key)].data[key])
+            self.assertEqual(value, client.get(key))
+        self.assertEqual(mapping, client.get_multi(list(mapping)))
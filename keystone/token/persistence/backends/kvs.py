@@ -91,6 +91,13 @@ class Token(token.persistence.Driver):
 
         return token_ref
 
+    def get_tokens(self, token_ids):
+        ptks = [self._prefix_token_id(token_id) for token_id in token_ids]
+        token_refs = self._store.get_multi_or_default(ptks)
+        return dict((token_id, token_ref)
+                    for token_id, token_ref in zip(token_ids, token_refs)
+                    if token_ref is not None)
+
     def create_token(self, token_id, data):
         """Create a token by id and data.
 
@@ -111,9 +118,18 @@ class Token(token.persistence.Driver):
         expires_str = timeutils.isotime(data_copy['expires'], subsecond=True)
 
         self._set_key(ptk, data_copy)
-        user_id = data['user']['id']
-        user_key = self._prefix_user_id(user_id)
-        self._update_user_token_list(user_key, token_id, expires_str)
+        for user_key in self._user_keys_for_token(token_id, data_copy):
+            self._update_user_token_list(user_key, token_id, expires_str)
+
+        return data_copy
+
+    def _user_token_list_key(self, user_id, token_id):
+        """Return the key of the user token list the token goes in."""
+        return self._prefix_user_id(user_id)
+
+    def _user_keys_for_token(self, token_id, data):
+        """Return the keys of the user token lists the token is placed in."""
+        user_keys = [self._user_token_list_key(data['user']['id'], token_id)]
         if CONF.trust.enabled and data.get('trust_id'):
             # NOTE(morganfainberg): If trusts are enabled and this is a trust
             # scoped token, we add the token to the trustee list as well.  This
@@ -121,22 +137,21 @@ class Token(token.persistence.Driver):
             # There is no harm in placing the token in multiple lists, as
             # _list_tokens is smart enough to handle almost any case of
             # valid/invalid/expired for a given token.
-            token_data = data_copy['token_data']
-            if data_copy['token_version'] == token.provider.V2:
+            token_data = data['token_data']
+            if data['token_version'] == token.provider.V2:
                 trustee_user_id = token_data['access']['trust'][
                     'trustee_user_id']
-            elif data_copy['token_version'] == token.provider.V3:
+            elif data['token_version'] == token.provider.V3:
                 trustee_user_id = token_data['OS-TRUST:trust'][
                     'trustee_user_id']
             else:
                 raise exception.UnsupportedTokenVersionException(
                     _('Unknown token version %s') %
-                    data_copy.get('token_version'))
-
-            trustee_key = self._prefix_user_id(trustee_user_id)
-            self._update_user_token_list(trustee_key, token_id, expires_str)
+                    data.get('token_version'))
 
-        return data_copy
+            user_keys.append(self._user_token_list_key(trustee_user_id,
+                                                       token_id))
+        return user_keys
 
     def _get_user_token_list_with_expiry(self, user_key):
         """Return a list of tuples in the format (token_id, token_expiry) for
@@ -144,6 +159,11 @@ class Token(token.persistence.Driver):
         """
         return self._get_key_or_default(user_key, default=[])
 
+    def _get_all_user_tokens_with_expiry(self, user_id):
+        """Return the (token_id, token_expiry) tuples of all the user lists."""
+        return self._get_user_token_list_with_expiry(
+            self._prefix_user_id(user_id))
+
     def _get_user_token_list(self, user_key):
         """Return a list of token_ids for the user_key."""
         token_list = self._get_user_token_list_with_expiry(user_key)
@@ -152,40 +172,100 @@ class Token(token.persistence.Driver):
         # list of token_ids are returned.
         return [t[0] for t in token_list]
 
+    @staticmethod
+    def _bisect_user_token_list(token_list, expires_isotime_str, right=False):
+        """Find where a token expiring at the given time fits in the list.
+
+        The user token lists are kept sorted by expiry. The expiries are all
+        isotime strings with subseconds, which sort like the times they
+        represent, so they don't need to be parsed.
+
+        :raises: ValueError or TypeError if an item is malformed
+
+        """
+        low, high = 0, len(token_list)
+        while low < high:
+            middle = (low + high) // 2
+            _token_id, expires = token_list[middle]
+            if not isinstance(expires, six.string_types):
+                raise TypeError(expires)
+            if (expires < expires_isotime_str or
+                    right and expires == expires_isotime_str):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _count_expired_head(self, token_list, current_time_str):
+        """Count the expired or malformed items at the head of the list."""
+        count = 0
+        for item in token_list:
+            try:
+                _token_id, expires = item
+            except (TypeError, ValueError):
+                count += 1
+                continue
+            if (isinstance(expires, six.string_types) and
+                    expires >= current_time_str):
+                break
+            count += 1
+        return count
+
     def _update_user_token_list(self, user_key, token_id, expires_isotime_str):
         current_time = self._get_current_time()
-        revoked_token_list = set([t['id'] for t in
-                                  self.list_revoked_tokens()])
+        current_time_str = timeutils.isotime(current_time, subsecond=True)
 
         with self._store.get_lock(user_key) as lock:
-            filtered_list = []
             token_list = self._get_user_token_list_with_expiry(user_key)
-            for item in token_list:
-                try:
-                    item_id, expires = self._format_token_index_item(item)
-                except (ValueError, TypeError):
-                    # NOTE(morganfainberg): Skip on expected errors
-                    # possibilities from the `_format_token_index_item` method.
-                    continue
-
-                if expires < current_time:
-                    LOG.debug(('Token `%(token_id)s` is expired, removing '
-                               'from `%(user_key)s`.'),
-                              {'token_id': item_id, 'user_key': user_key})
-                    continue
-
-                if item_id in revoked_token_list:
-                    # NOTE(morganfainberg): If the token has been revoked, it
-                    # can safely be removed from this list.  This helps to keep
-                    # the user_token_list as reasonably small as possible.
-                    LOG.debug(('Token `%(token_id)s` is revoked, removing '
-                               'from `%(user_key)s`.'),
-                              {'token_id': item_id, 'user_key': user_key})
-                    continue
-                filtered_list.append(item)
-            filtered_list.append((token_id, expires_isotime_str))
-            self._set_key(user_key, filtered_list, lock)
-            return filtered_list
+            # NOTE(garcianavalon) the list is sorted by expiry, so the expired
+            # tokens are at its head and each one is only looked at once.
+            # Lists written before they were sorted only get pruned up to the
+            # first valid token, which is safe. Revoked tokens are removed
+            # from the list by delete_token.
+            expired = self._count_expired_head(token_list, current_time_str)
+            if expired:
+                LOG.debug('Removing %(count)d expired tokens from '
+                          '`%(user_key)s`.',
+                          {'count': expired, 'user_key': user_key})
+                del token_list[:expired]
+            try:
+                index = self._bisect_user_token_list(
+                    token_list, expires_isotime_str, right=True)
+            except (ValueError, TypeError):
+                index = len(token_list)
+            token_list.insert(index, (token_id, expires_isotime_str))
+            self._set_key(user_key, token_list, lock)
+            return token_list
+
+    def _remove_from_user_token_list(self, user_key, token_id,
+                                     expires_isotime_str):
+        with self._store.get_lock(user_key) as lock:
+            token_list = self._get_user_token_list_with_expiry(user_key)
+            try:
+                index = self._bisect_user_token_list(token_list,
+                                                     expires_isotime_str)
+                while (index < len(token_list) and
+                       token_list[index][1] == expires_isotime_str and
+                       token_list[index][0] != token_id):
+                    index += 1
+            except (ValueError, TypeError):
+                index = len(token_list)
+            if (index < len(token_list) and
+                    token_list[index][0] == token_id):
+                del token_list[index]
+            else:
+                # NOTE(garcianavalon) not where the expiry says it should be,
+                # look for it in the whole list
+                filtered_list = [item for item in token_list
+                                 if not isinstance(item, (list, tuple)) or
+                                 item[0] != token_id]
+                if len(filtered_list) == len(token_list):
+                    return
+                token_list = filtered_list
+            LOG.debug(('Token `%(token_id)s` is revoked, removing '
+                       'from `%(user_key)s`.'),
+                      {'token_id': token_id, 'user_key': user_key})
+            self._set_key(user_key, token_list, lock)
 
     def _get_current_time(self):
         return timeutils.normalize_time(timeutils.utcnow())
@@ -253,6 +333,19 @@ class Token(token.persistence.Driver):
             ptk = self._prefix_token_id(token_id)
             result = self._delete_key(ptk)
             self._add_to_revocation_list(data, lock)
+
+        # NOTE(morganfainberg): If the token has been revoked, it can safely
+        # be removed from the user token lists. This helps to keep them as
+        # reasonably small as possible.
+        expires = data['expires']
+        if not isinstance(expires, six.string_types):
+            expires = timeutils.isotime(expires, subsecond=True)
+        try:
+            user_keys = self._user_keys_for_token(token_id, data)
+        except (KeyError, exception.UnsupportedTokenVersionException):
+            user_keys = []
+        for user_key in user_keys:
+            self._remove_from_user_token_list(user_key, token_id, expires)
         return result
 
     def delete_tokens(self, user_id, tenant_id=None, trust_id=None,
@@ -312,8 +405,7 @@ class Token(token.persistence.Driver):
         if not CONF.token.revoke_by_id:
             return []
         tokens = []
-        user_key = self._prefix_user_id(user_id)
-        token_list = self._get_user_token_list_with_expiry(user_key)
+        token_list = self._get_all_user_tokens_with_expiry(user_id)
         current_time = self._get_current_time()
         for item in token_list:
             try:
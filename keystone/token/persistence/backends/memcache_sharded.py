@@ -0,0 +1,57 @@
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import hashlib
+import itertools
+
+import six
+
+from keystone.common import config
+from keystone.token.persistence.backends import memcache_pool
+
+
+CONF = config.CONF
+
+
+class Token(memcache_pool.Token):
+    """Memcache token backend spreading the keys with consistent hashing.
+
+    The keys are placed on the memcached servers with a consistent hash ring,
+    and the token list of every user is split in ``[token]
+    user_index_buckets`` keys by token id, so the lists of busy users don't
+    all land on the same server.
+
+    """
+    memcached_backend = 'sharded_memcached'
+
+    def __init__(self, *args, **kwargs):
+        kwargs['hash_ring_points'] = CONF.memcache.hash_ring_points
+        super(Token, self).__init__(*args, **kwargs)
+
+    def _user_token_list_keys(self, user_id):
+        user_key = self._prefix_user_id(user_id)
+        return ['%s-%d' % (user_key, bucket)
+                for bucket in six.moves.range(CONF.token.user_index_buckets)]
+
+    def _user_token_list_key(self, user_id, token_id):
+        if isinstance(token_id, six.text_type):
+            token_id = token_id.encode('utf-8')
+        bucket = (int(hashlib.md5(token_id).hexdigest()[:8], 16) %
+                  CONF.token.user_index_buckets)
+        return '%s-%d' % (self._prefix_user_id(user_id), bucket)
+
+    def _get_all_user_tokens_with_expiry(self, user_id):
+        token_lists = self._store.get_multi_or_default(
+            self._user_token_list_keys(user_id), default=[])
+        return list(itertools.chain.from_iterable(token_lists))
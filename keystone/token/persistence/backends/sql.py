@@ -47,11 +47,15 @@ class TokenModel(sql.ModelBase, sql.DictBase):
     )
 
 
-def _expiry_range_batched(session, upper_bound_func, batch_size):
+def _expiry_range_batched(session, upper_bound_func, batch_size,
+                          expires_column=None, criteria=()):
     """Returns the stop point of the next batch for expiration.
 
     Return the timestamp of the next token that is `batch_size` rows from
-    being the oldest expired token.
+    being the oldest expired token. `expires_column` allows the strategy to
+    be reused for other tables, it defaults to the token expiry column.
+    `criteria` restricts the rows counted in the batches to the ones the
+    caller deletes.
     """
 
     # This expiry strategy splits the tokens into roughly equal sized batches
@@ -60,10 +64,12 @@ def _expiry_range_batched(session, upper_bound_func, batch_size):
     # It's expected that the caller will then delete all rows with a timestamp
     # equal to or older than the one yielded.  This may delete slightly more
     # tokens than the batch_size, but that should be ok in almost all cases.
+    if expires_column is None:
+        expires_column = TokenModel.expires
     LOG.info(_LI('Token expiration batch size: %d') % batch_size)
-    query = session.query(TokenModel.expires)
-    query = query.filter(TokenModel.expires < upper_bound_func())
-    query = query.order_by(TokenModel.expires)
+    query = session.query(expires_column)
+    query = query.filter(expires_column < upper_bound_func(), *criteria)
+    query = query.order_by(expires_column)
     query = query.offset(batch_size - 1)
     query = query.limit(1)
     while True:
@@ -77,12 +83,40 @@ def _expiry_range_batched(session, upper_bound_func, batch_size):
     yield upper_bound_func()
 
 
-def _expiry_range_all(session, upper_bound_func):
+def _expiry_range_all(session, upper_bound_func, expires_column=None,
+                      criteria=()):
     """Expires all tokens in one pass."""
 
     yield upper_bound_func()
 
 
+def _expiry_range_strategy(dialect):
+    """Choose a token range expiration strategy
+
+    Based on the DB dialect, select an expiry range callable that is
+    appropriate.
+    """
+
+    # DB2 and MySQL can both benefit from a batched strategy.  On DB2 the
+    # transaction log can fill up and on MySQL w/Galera, large
+    # transactions can exceed the maximum write set size.
+    if dialect == 'ibm_db_sa':
+        # Limit of 100 is known to not fill a transaction log
+        # of default maximum size while not significantly
+        # impacting the performance of large token purges on
+        # systems where the maximum transaction log size has
+        # been increased beyond the default.
+        return functools.partial(_expiry_range_batched,
+                                 batch_size=100)
+    elif dialect == 'mysql':
+        # We want somewhat more than 100, since Galera replication delay is
+        # at least RTT*2.  This can be a significant amount of time if
+        # doing replication across a WAN.
+        return functools.partial(_expiry_range_batched,
+                                 batch_size=1000)
+    return _expiry_range_all
+
+
 class Token(token.persistence.Driver):
     # Public interface
     def get_token(self, token_id):
@@ -94,6 +128,16 @@ class Token(token.persistence.Driver):
             raise exception.TokenNotFound(token_id=token_id)
         return token_ref.to_dict()
 
+    def get_tokens(self, token_ids):
+        token_ids = [token_id for token_id in token_ids if token_id]
+        if not token_ids:
+            return {}
+        session = sql.get_session()
+        query = session.query(TokenModel)
+        query = query.filter(TokenModel.id.in_(token_ids))
+        query = query.filter_by(valid=True)
+        return dict((token_ref.id, token_ref.to_dict()) for token_ref in query)
+
     def create_token(self, token_id, data):
         data_copy = copy.deepcopy(data)
         if not data_copy.get('expires'):
@@ -246,30 +290,7 @@ class Token(token.persistence.Driver):
         return tokens
 
     def _expiry_range_strategy(self, dialect):
-        """Choose a token range expiration strategy
-
-        Based on the DB dialect, select an expiry range callable that is
-        appropriate.
-        """
-
-        # DB2 and MySQL can both benefit from a batched strategy.  On DB2 the
-        # transaction log can fill up and on MySQL w/Galera, large
-        # transactions can exceed the maximum write set size.
-        if dialect == 'ibm_db_sa':
-            # Limit of 100 is known to not fill a transaction log
-            # of default maximum size while not significantly
-            # impacting the performance of large token purges on
-            # systems where the maximum transaction log size has
-            # been increased beyond the default.
-            return functools.partial(_expiry_range_batched,
-                                     batch_size=100)
-        elif dialect == 'mysql':
-            # We want somewhat more than 100, since Galera replication delay is
-            # at least RTT*2.  This can be a significant amount of time if
-            # doing replication across a WAN.
-            return functools.partial(_expiry_range_batched,
-                                     batch_size=1000)
-        return _expiry_range_all
+        return _expiry_range_strategy(dialect)
 
     def flush_expired_tokens(self):
         session = sql.get_session()
@@ -81,6 +81,22 @@ class PersistenceManager(manager.Manager):
         self._assert_valid(token_id, token_ref)
         return token_ref
 
+    def get_tokens(self, token_ids):
+        """Get a batch of tokens, leaving out the missing or expired ones.
+
+        :returns: dict of token_refs keyed by the unique id of the tokens
+
+        """
+        unique_ids = set(self.token_provider_api.unique_id(token_id)
+                         for token_id in token_ids if token_id)
+        token_refs = self.driver.get_tokens(list(unique_ids))
+        for unique_id, token_ref in list(token_refs.items()):
+            try:
+                self._assert_valid(unique_id, token_ref)
+            except exception.TokenNotFound:
+                del token_refs[unique_id]
+        return token_refs
+
     @cache.on_arguments(should_cache_fn=SHOULD_CACHE,
                         expiration_time=EXPIRATION_TIME)
     def _get_token(self, token_id):
@@ -260,6 +276,26 @@ class Driver(object):
         """
         raise exception.NotImplemented()  # pragma: no cover
 
+    def get_tokens(self, token_ids):
+        """Get a batch of tokens by id.
+
+        Drivers able to fetch several tokens in a single round-trip should
+        override this.
+
+        :param token_ids: identities of the tokens
+        :type token_ids: list
+        :returns: dict of token_refs keyed by token id, leaving out the
+                  tokens that were not found
+
+        """
+        token_refs = {}
+        for token_id in token_ids:
+            try:
+                token_refs[token_id] = self.get_token(token_id)
+            except exception.TokenNotFound:
+                pass
+        return token_refs
+
     @abc.abstractmethod
     def create_token(self, token_id, data):
         """Create a token by id and data.
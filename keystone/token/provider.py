@@ -16,6 +16,7 @@
 
 import abc
 import base64
+import collections
 import datetime
 import sys
 import uuid
@@ -99,6 +100,47 @@ def audit_info(parent_audit_id):
     return [audit_id]
 
 
+class ValidationCache(object):
+    """Bounded LRU of the tokens recently validated by this process.
+
+    Every entry is tagged with the generation of the revocation list it was
+    checked against. While the generation stays the same the entry is
+    trusted as is; afterwards only its revocation values are checked again,
+    so a new revocation event only drops the entries that match it.
+
+    The token data is shared by all the callers, it must not be modified.
+
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = datetime.timedelta(seconds=ttl)
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None or timeutils.utcnow() >= entry['valid_until']:
+            return None
+        # move it to the most recently used end
+        self._entries[key] = entry
+        return entry
+
+    def set(self, key, token, token_values, generation, expiry):
+        self._entries.pop(key, None)
+        self._entries[key] = {
+            'token': token,
+            'token_values': token_values,
+            'generation': generation,
+            'valid_until': min(expiry, timeutils.utcnow() + self.ttl),
+        }
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, unique_id):
+        for key in [k for k in self._entries if k[1] == unique_id]:
+            self._entries.pop(key, None)
+
+
 @dependency.optional('revoke_api')
 @dependency.provider('token_provider_api')
 class Manager(manager.Manager):
@@ -115,6 +157,7 @@ class Manager(manager.Manager):
     INVALIDATE_PROJECT_TOKEN_PERSISTENCE = 'invalidate_project_tokens'
     INVALIDATE_USER_TOKEN_PERSISTENCE = 'invalidate_user_tokens'
     _persistence_manager = None
+    _validation_cache = None
 
     @classmethod
     def get_token_provider(cls):
@@ -191,6 +234,54 @@ class Manager(manager.Manager):
             self._persistence_manager = persistence.PersistenceManager()
         return self._persistence_manager
 
+    def _get_validation_cache(self):
+        if self.revoke_api is None or CONF.token.validation_cache_size <= 0:
+            return None
+        if self._validation_cache is None:
+            self._validation_cache = ValidationCache(
+                CONF.token.validation_cache_size,
+                CONF.token.validation_cache_time)
+        return self._validation_cache
+
+    def _get_revoke_tree(self):
+        # NOTE(garcianavalon) the results can only be trusted while the
+        # revocation events are tracked in process. Otherwise every check
+        # would fetch all the events again, so nothing is remembered.
+        if self._get_validation_cache() is None:
+            return None
+        return self.revoke_api.get_revoke_tree()
+
+    def _get_validated_token(self, kind, unique_id, revoke_tree):
+        if revoke_tree is None:
+            return None
+        validation_cache = self._get_validation_cache()
+        entry = validation_cache.get((kind, unique_id))
+        if entry is None:
+            return None
+        generation = revoke_tree.generation
+        if entry['generation'] != generation:
+            if revoke_tree.is_revoked(entry['token_values']):
+                validation_cache.invalidate(unique_id)
+                return None
+            entry['generation'] = generation
+        return entry['token']
+
+    @staticmethod
+    def _get_revoke_generation(revoke_tree):
+        # NOTE(garcianavalon) taken before the token is validated, so an event
+        # recorded in the meantime makes the result be checked again.
+        if revoke_tree is None:
+            return None
+        return revoke_tree.generation
+
+    def _set_validated_token(self, kind, unique_id, token, token_values,
+                             generation):
+        if generation is None or token_values is None:
+            return
+        self._get_validation_cache().set((kind, unique_id), token,
+                                         token_values, generation,
+                                         self._get_token_expiry(token))
+
     def unique_id(self, token_id):
         """Return a unique ID for a token.
 
@@ -220,11 +311,20 @@ class Manager(manager.Manager):
 
     def validate_token(self, token_id, belongs_to=None):
         unique_id = self.unique_id(token_id)
+        revoke_tree = self._get_revoke_tree()
+        token = self._get_validated_token('token', unique_id, revoke_tree)
+        if token is not None:
+            self._token_belongs_to(token, belongs_to)
+            return token
+
+        generation = self._get_revoke_generation(revoke_tree)
         # NOTE(morganfainberg): Ensure we never use the long-form token_id
         # (PKI) as part of the cache_key.
         token = self._validate_token(unique_id)
         self._token_belongs_to(token, belongs_to)
-        self._is_valid_token(token)
+        token_values = self._is_valid_token(token)
+        self._set_validated_token('token', unique_id, token, token_values,
+                                  generation)
         return token
 
     def check_revocation_v2(self, token):
@@ -237,16 +337,26 @@ class Manager(manager.Manager):
             token_values = self.revoke_api.model.build_token_values_v2(
                 token_data, CONF.identity.default_domain_id)
             self.revoke_api.check_token(token_values)
+            return token_values
 
     def validate_v2_token(self, token_id, belongs_to=None):
         unique_id = self.unique_id(token_id)
+        revoke_tree = self._get_revoke_tree()
+        token = self._get_validated_token(V2, unique_id, revoke_tree)
+        if token is not None:
+            self._token_belongs_to(token, belongs_to)
+            return token
+
+        generation = self._get_revoke_generation(revoke_tree)
         # NOTE(morganfainberg): Ensure we never use the long-form token_id
         # (PKI) as part of the cache_key.
         token_ref = self._persistence.get_token(unique_id)
         token = self._validate_v2_token(token_ref)
         self.check_revocation_v2(token)
         self._token_belongs_to(token, belongs_to)
-        self._is_valid_token(token)
+        token_values = self._is_valid_token(token)
+        self._set_validated_token(V2, unique_id, token, token_values,
+                                  generation)
         return token
 
     def check_revocation_v3(self, token):
@@ -257,6 +367,7 @@ class Manager(manager.Manager):
         if self.revoke_api is not None:
             token_values = self.revoke_api.model.build_token_values(token_data)
             self.revoke_api.check_token(token_values)
+            return token_values
 
     def check_revocation(self, token):
         version = self.driver.get_token_version(token)
@@ -267,6 +378,12 @@ class Manager(manager.Manager):
 
     def validate_v3_token(self, token_id):
         unique_id = self.unique_id(token_id)
+        revoke_tree = self._get_revoke_tree()
+        token = self._get_validated_token(V3, unique_id, revoke_tree)
+        if token is not None:
+            return token
+
+        generation = self._get_revoke_generation(revoke_tree)
         # NOTE(morganfainberg): Ensure we never use the long-form token_id
         # (PKI) as part of the cache_key.
         try:
@@ -274,9 +391,75 @@ class Manager(manager.Manager):
         except (exception.ValidationError, exception.UserNotFound):
             raise exception.TokenNotFound(token_id=token_id)
         token = self._validate_v3_token(token_ref)
-        self._is_valid_token(token)
+        token_values = self._is_valid_token(token)
+        self._set_validated_token(V3, unique_id, token, token_values,
+                                  generation)
         return token
 
+    def validate_tokens(self, token_ids):
+        """Validate a batch of v3 tokens.
+
+        The tokens are fetched from the persistence backend in a single call
+        and checked against the revocation list together.
+
+        :param token_ids: identities of the tokens
+        :returns: dict of the data of the valid tokens, keyed by the given
+                  token ids; invalid tokens are left out
+
+        """
+        results = {}
+        pending = {}
+        # NOTE(garcianavalon) the whole batch is checked against the same
+        # state of the revocation events.
+        revoke_tree = self._get_revoke_tree()
+        for token_id in set(token_ids):
+            if not token_id:
+                continue
+            unique_id = self.unique_id(token_id)
+            token = self._get_validated_token(V3, unique_id, revoke_tree)
+            if token is not None:
+                results[token_id] = token
+            else:
+                pending.setdefault(unique_id, []).append(token_id)
+        if not pending:
+            return results
+
+        generation = self._get_revoke_generation(revoke_tree)
+        current_time = timeutils.normalize_time(timeutils.utcnow())
+        validated = []
+        token_refs = self._persistence.get_tokens(list(pending))
+        for unique_id, token_ref in six.iteritems(token_refs):
+            try:
+                token = self._validate_v3_token(token_ref)
+                if self._get_token_expiry(token) <= current_time:
+                    continue
+                token_data = token['token']
+            except (exception.NotFound, exception.ValidationError,
+                    exception.Unauthorized, KeyError):
+                continue
+            token_values = None
+            if self.revoke_api is not None:
+                token_values = self.revoke_api.model.build_token_values(
+                    token_data)
+            validated.append((unique_id, token, token_values))
+
+        if self.revoke_api is not None and validated:
+            # NOTE(garcianavalon) the token values are the last item
+            token_values_list = [entry[2] for entry in validated]
+            if revoke_tree is not None:
+                revoked = revoke_tree.is_revoked_many(token_values_list)
+            else:
+                revoked = self.revoke_api.is_revoked_many(token_values_list)
+            validated = [entry for entry, is_revoked in zip(validated, revoked)
+                         if not is_revoked]
+
+        for unique_id, token, token_values in validated:
+            self._set_validated_token(V3, unique_id, token, token_values,
+                                      generation)
+            for token_id in pending[unique_id]:
+                results[token_id] = token
+        return results
+
     @versionutils.deprecated(
         as_of=versionutils.deprecated.JUNO,
         what='token_provider_api.check_v2_token',
@@ -333,11 +516,7 @@ class Manager(manager.Manager):
     def _validate_v3_token(self, token_id):
         return self.driver.validate_v3_token(token_id)
 
-    def _is_valid_token(self, token):
-        """Verify the token is valid format and has not expired."""
-
-        current_time = timeutils.normalize_time(timeutils.utcnow())
-
+    def _get_token_expiry(self, token):
         try:
             # Get the data we need from the correct location (V2 and V3 tokens
             # differ in structure, Try V3 first, fall back to V2 second)
@@ -346,17 +525,26 @@ class Manager(manager.Manager):
                                         token_data.get('expires'))
             if not expires_at:
                 expires_at = token_data['token']['expires']
-            expiry = timeutils.normalize_time(
+            return timeutils.normalize_time(
                 timeutils.parse_isotime(expires_at))
         except Exception:
             LOG.exception(_('Unexpected error or malformed token determining '
                             'token expiry: %s'), token)
             raise exception.TokenNotFound(_('Failed to validate token'))
 
+    def _is_valid_token(self, token):
+        """Verify the token is valid format and has not expired.
+
+        :returns: the values checked against the revocation list, if any
+
+        """
+
+        current_time = timeutils.normalize_time(timeutils.utcnow())
+        expiry = self._get_token_expiry(token)
+
         if current_time < expiry:
-            self.check_revocation(token)
             # Token has not expired and has not been revoked.
-            return None
+            return self.check_revocation(token)
         else:
             raise exception.TokenNotFound(_('Failed to validate token'))
 
@@ -442,6 +630,8 @@ class Manager(manager.Manager):
         self._validate_token.invalidate(self, token_id)
         self._validate_v2_token.invalidate(self, token_id)
         self._validate_v3_token.invalidate(self, token_id)
+        if self._validation_cache is not None:
+            self._validation_cache.invalidate(token_id)
 
     def revoke_token(self, token_id, revoke_chain=False):
         if self.revoke_api:
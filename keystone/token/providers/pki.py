@@ -14,10 +14,10 @@
 
 """Keystone PKI Token Provider"""
 
-from keystoneclient.common import cms
 from oslo.serialization import jsonutils
 
 from keystone.common import environment
+from keystone.common import signing
 from keystone.common import utils
 from keystone import config
 from keystone import exception
@@ -39,9 +39,9 @@ class Provider(common.BaseProvider):
             # str()
             # TODO(ayoung): Make to a byte_str for Python3
             token_json = jsonutils.dumps(token_data, cls=utils.PKIEncoder)
-            token_id = str(cms.cms_sign_token(token_json,
-                                              CONF.signing.certfile,
-                                              CONF.signing.keyfile))
+            token_id = str(signing.cms_sign_token(token_json,
+                                                  CONF.signing.certfile,
+                                                  CONF.signing.keyfile))
             return token_id
         except environment.subprocess.CalledProcessError:
             LOG.exception(_('Unable to sign token'))
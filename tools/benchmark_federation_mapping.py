@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark the mapping of federated assertions.
+
+Builds a mapping with ``--rules`` rules, each granting a group to the users
+with a given value of an attribute, a third of them matching it with a
+regular expression, plus a rule taking the user name from the assertion.
+Maps ``--logins`` assertions with ``--groups`` values of that attribute,
+building the rule processor of the mapping for every login and reusing the
+one built for the mapping, as federated logins do, and reports the mapping
+rate of each.
+
+    python tools/benchmark_federation_mapping.py --rules 1000
+    python tools/benchmark_federation_mapping.py --groups 20
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from oslo.serialization import jsonutils  # noqa
+
+from keystone.contrib.federation import utils  # noqa
+
+
+def build_mapping(rules):
+    mapping_rules = []
+    for index in range(rules):
+        remote = {'type': 'orgPersonType', 'any_one_of': ['Type%d' % index]}
+        if index % 3 == 0:
+            remote['any_one_of'] = ['^Type%d$' % index]
+            remote['regex'] = True
+        mapping_rules.append({'local': [{'group': {'id': 'group%d' % index}}],
+                              'remote': [remote]})
+    mapping_rules.append({'local': [{'user': {'name': '{0}'}}],
+                          'remote': [{'type': 'UserName'}]})
+    return {'id': uuid.uuid4().hex,
+            'rules': jsonutils.dumps(mapping_rules)}
+
+
+def run(label, get_processor, mapping, assertion, logins):
+    start = time.time()
+    for _ in range(logins):
+        get_processor(mapping).process(assertion)
+    elapsed = time.time() - start
+    print('  %-12s %8.3f s, %8.3f ms per login, %8.1f logins/s' %
+          (label, elapsed, elapsed * 1000 / logins, logins / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=500)
+    parser.add_argument('--logins', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=5,
+                        help='attribute values in every assertion')
+    args = parser.parse_args()
+
+    mapping = build_mapping(args.rules)
+    step = max(args.rules // max(args.groups, 1), 1)
+    assertion = {'UserName': 'user',
+                 'orgPersonType': ';'.join(
+                     'Type%d' % index
+                     for index in range(0, args.rules, step)[:args.groups])}
+
+    def build_processor(mapping):
+        return utils.RuleProcessor(jsonutils.loads(mapping['rules']))
+
+    mapped = utils.get_rule_processor(mapping).process(assertion)
+    print('%d rules, %d groups mapped' %
+          (args.rules, len(mapped['group_ids'])))
+    run('built', build_processor, mapping, assertion, args.logins)
+    run('reused', utils.get_rule_processor, mapping, assertion, args.logins)
+
+
+if __name__ == '__main__':
+    main()
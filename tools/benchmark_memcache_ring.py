@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark the sharded memcached backend against plain modulo hashing.
+
+By default every memcached server is stood in for by an in-process
+dictionary, which is enough to compare how the keys are spread and how many
+of them move when a server is added or removed. Pass ``--servers`` with the
+addresses of real local instances (e.g. ``memcached -p 11212``) to also time
+the round-trips through the connection pools.
+
+    python tools/benchmark_memcache_ring.py --nodes 4 --keys 100000
+    python tools/benchmark_memcache_ring.py \\
+        --servers 127.0.0.1:11211,127.0.0.1:11212,127.0.0.1:11213
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+import uuid
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from keystone.common.cache import _hash_ring  # noqa
+from keystone.common.cache.backends import memcache_pool  # noqa
+
+
+class StandInServer(object):
+    """A memcached server stand-in keeping the values in a dictionary."""
+
+    def __init__(self):
+        self.data = {}
+
+    @contextlib.contextmanager
+    def acquire(self):
+        yield self
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, time=0):
+        self.data[key] = value
+        return True
+
+    def get_multi(self, keys):
+        return dict((key, self.data[key]) for key in keys if key in self.data)
+
+    def set_multi(self, mapping, time=0):
+        self.data.update(mapping)
+        return []
+
+
+def modulo_node(nodes, key):
+    # NOTE: this is how python-memcached picks the server of a key
+    return nodes[((zlib.crc32(key.encode('utf-8')) & 0xffffffff) >> 16 &
+                  0x7fff) % len(nodes)]
+
+
+def spread(counts):
+    mean = float(sum(counts)) / len(counts)
+    return max(counts) / mean, min(counts) / mean
+
+
+def report_distribution(nodes, keys, points):
+    ring = _hash_ring.HashRing(nodes, points=points)
+    ring_counts = [len(v) for v in ring.get_nodes(keys).values()]
+    modulo_counts = {}
+    for key in keys:
+        node = modulo_node(nodes, key)
+        modulo_counts[node] = modulo_counts.get(node, 0) + 1
+    print('Keys per server (max/mean, min/mean):')
+    print('  hash ring: %.3f, %.3f' % spread(ring_counts))
+    print('  modulo:    %.3f, %.3f' % spread(list(modulo_counts.values())))
+
+
+def report_remapping(nodes, keys, points):
+    new_node = 'new-node:11211'
+    print('Keys moved when a server is added / removed:')
+
+    ring = _hash_ring.HashRing(nodes, points=points)
+    before = [ring.get_node(key) for key in keys]
+    ring.add_node(new_node)
+    added = sum(1 for key, node in zip(keys, before)
+                if ring.get_node(key) != node)
+    ring = _hash_ring.HashRing(nodes, points=points)
+    ring.remove_node(nodes[0])
+    removed = sum(1 for key, node in zip(keys, before)
+                  if ring.get_node(key) != node)
+    print('  hash ring: %.1f%% / %.1f%%' % (100.0 * added / len(keys),
+                                           100.0 * removed / len(keys)))
+
+    before = [modulo_node(nodes, key) for key in keys]
+    added = sum(1 for key, node in zip(keys, before)
+                if modulo_node(nodes + [new_node], key) != node)
+    removed = sum(1 for key, node in zip(keys, before)
+                  if modulo_node(nodes[1:], key) != node)
+    print('  modulo:    %.1f%% / %.1f%%' % (100.0 * added / len(keys),
+                                           100.0 * removed / len(keys)))
+
+
+def report_throughput(client, keys, batch):
+    start = time.time()
+    for key in keys:
+        client.set(key, key)
+    elapsed = time.time() - start
+    print('  set:       %8.0f ops/s' % (len(keys) / elapsed))
+
+    start = time.time()
+    for key in keys:
+        client.get(key)
+    elapsed = time.time() - start
+    print('  get:       %8.0f ops/s' % (len(keys) / elapsed))
+
+    start = time.time()
+    for index in range(0, len(keys), batch):
+        client.get_multi(keys[index:index + batch])
+    elapsed = time.time() - start
+    print('  get_multi: %8.0f keys/s (batches of %d)' % (len(keys) / elapsed,
+                                                        batch))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers',
+                        help='comma separated memcached servers to use '
+                             'instead of the in-process stand-ins')
+    parser.add_argument('--nodes', type=int, default=4,
+                        help='number of stand-in servers')
+    parser.add_argument('--keys', type=int, default=100000)
+    parser.add_argument('--points', type=int, default=100,
+                        help='points of every server in the hash ring')
+    parser.add_argument('--batch', type=int, default=8)
+    args = parser.parse_args()
+
+    keys = ['usertokens-%s' % uuid.uuid4().hex for _ in range(args.keys)]
+    if args.servers:
+        nodes = args.servers.split(',')
+        backend = memcache_pool.ShardedMemcachedBackend(
+            {'url': nodes, 'hash_ring_points': args.points})
+        client = backend.client
+    else:
+        nodes = ['stand-in-%d:11211' % index for index in range(args.nodes)]
+        client = memcache_pool.ShardedClientProxy(
+            dict((node, StandInServer()) for node in nodes),
+            _hash_ring.HashRing(nodes, points=args.points))
+
+    print('%d keys over %d servers, %d points per server' %
+          (len(keys), len(nodes), args.points))
+    report_distribution(nodes, keys, args.points)
+    report_remapping(nodes, keys, args.points)
+    print('Sharded client:')
+    report_throughput(client, keys, args.batch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark policy enforcement.
+
+Enforces every rule of ``--policy-file`` ``--rounds`` times for a project
+member, as the rules backend did before, checking the modification time of
+the file and evaluating the oslo checks, and with the compiled rules of
+keystone.policy.backends.rules, checking that both decide the same and
+reporting the decision rate of each. The compiled rules are run without and
+with the decision cache.
+
+    python tools/benchmark_policy.py --rounds 200
+    python tools/benchmark_policy.py --policy-file other_policy.json
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from keystone.common import utils  # noqa
+from keystone import config  # noqa
+from keystone.policy.backends import rules  # noqa
+
+
+CONF = config.CONF
+
+CREDENTIALS = {'user_id': 'u1', 'project_id': 'p1', 'domain_id': 'default',
+               'roles': ['_member_', 'service']}
+TARGET = {'user_id': 'u1', 'project_id': 'p1', 'domain_id': 'default',
+          'target': {'user_id': 'u1', 'project_id': 'p1'}}
+
+
+def enforce_with_checks(action):
+    utils.read_cached_file(rules._POLICY_PATH, rules._POLICY_CACHE)
+    return rules._ENFORCER.enforce(action, TARGET, CREDENTIALS)
+
+
+def enforce_compiled(action):
+    return rules.enforce(CREDENTIALS, action, TARGET, do_raise=False)
+
+
+def run(label, enforce, actions, rounds):
+    start = time.time()
+    for _ in range(rounds):
+        for action in actions:
+            enforce(action)
+    elapsed = time.time() - start
+    decisions = rounds * len(actions)
+    print('  %-12s %8.3f s, %8.2f us per decision, %10.1f decisions/s' %
+          (label, elapsed, elapsed * 1000000 / decisions,
+           decisions / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=100)
+    parser.add_argument('--policy-file', default=os.path.join(
+        os.path.dirname(__file__), os.pardir, 'etc', 'policy.json'))
+    args = parser.parse_args()
+
+    config.configure()
+    CONF.set_override('policy_file', os.path.abspath(args.policy_file))
+    # NOTE(garcianavalon) the file is not modified while benchmarking
+    rules._start_watcher = lambda: None
+    rules.init()
+
+    actions = sorted(rules._ENFORCER.rules)
+    for action in actions:
+        if enforce_with_checks(action) != enforce_compiled(action):
+            sys.exit('The compiled rule %s does not decide as the checks.' %
+                     action)
+
+    print('%d rules, %d rounds' % (len(actions), args.rounds))
+    run('checks', enforce_with_checks, actions, args.rounds)
+    run('compiled', enforce_compiled, actions, args.rounds)
+    CONF.set_override('decision_cache_size', len(actions), group='policy')
+    run('cached', enforce_compiled, actions, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark the expansion of effective role assignments.
+
+Builds a synthetic dataset of projects spread over several domains and groups
+with several members each, grants every group a role on a few projects and
+some of them an inherited role on a whole domain, and then times
+GET /role_assignments?effective as expanded by the assignment manager against
+the previous expansion that looked the group members and domain projects up
+once per assignment. The backends are stood in for by dictionaries, with
+``--latency`` milliseconds added to every call to account for the round-trip
+to the database.
+
+    python tools/benchmark_role_assignments.py --projects 10000 --groups 1000
+    python tools/benchmark_role_assignments.py --latency 0.5
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from keystone.assignment import core  # noqa
+
+
+class StandIn(object):
+    """Count the calls to the backends and add some latency to them."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class StandInIdentity(StandIn):
+
+    def __init__(self, latency, members):
+        super(StandInIdentity, self).__init__(latency)
+        self.members = members
+
+    def list_users_in_group(self, group_id):
+        self._call()
+        return [{'id': user_id} for user_id in self.members[group_id]]
+
+    def list_user_ids_in_groups(self, group_ids):
+        self._call()
+        return dict((group_id, list(self.members[group_id]))
+                    for group_id in group_ids)
+
+
+class StandInAssignment(StandIn):
+
+    def __init__(self, latency, projects, assignments):
+        super(StandInAssignment, self).__init__(latency)
+        self.projects = projects
+        self.assignments = assignments
+
+    def list_role_assignments(self, inherited_to_projects=None, **kwargs):
+        self._call()
+        return [ref for ref in self.assignments
+                if (ref.get('inherited_to_projects') == 'projects') ==
+                inherited_to_projects]
+
+    def list_projects_in_domain(self, domain_id):
+        self._call()
+        return [{'id': project_id} for project_id in self.projects[domain_id]]
+
+    def list_project_ids_in_domains(self, domain_ids):
+        self._call()
+        return dict((domain_id, list(self.projects[domain_id]))
+                    for domain_id in domain_ids)
+
+
+def build_dataset(args):
+    random.seed(args.seed)
+    domain_ids = [uuid.uuid4().hex for _ in range(args.domains)]
+    projects = dict((domain_id, []) for domain_id in domain_ids)
+    all_project_ids = []
+    for index in range(args.projects):
+        project_id = uuid.uuid4().hex
+        projects[domain_ids[index % len(domain_ids)]].append(project_id)
+        all_project_ids.append(project_id)
+
+    members = {}
+    assignments = []
+    for index in range(args.groups):
+        group_id = uuid.uuid4().hex
+        members[group_id] = [uuid.uuid4().hex for _ in range(args.members)]
+        for project_id in random.sample(all_project_ids, args.grants):
+            assignments.append({'group_id': group_id,
+                                'project_id': project_id,
+                                'role_id': 'member'})
+        if index < args.inherited_groups:
+            assignments.append({'group_id': group_id,
+                                'domain_id': random.choice(domain_ids),
+                                'role_id': 'member',
+                                'inherited_to_projects': 'projects'})
+    return projects, members, assignments
+
+
+def expand_per_assignment(manager):
+    """The expansion as it was done before, one assignment at a time."""
+    driver = manager.driver
+    refs = (driver.list_role_assignments(inherited_to_projects=False) +
+            driver.list_role_assignments(inherited_to_projects=True))
+    expanded = []
+    for ref in refs:
+        if 'group_id' in ref:
+            user_ids = [user['id'] for user in
+                        manager.identity_api.list_users_in_group(
+                            ref['group_id'])]
+        else:
+            user_ids = [ref['user_id']]
+        if ref.get('inherited_to_projects') == 'projects':
+            project_ids = [project['id'] for project in
+                           manager.driver.list_projects_in_domain(
+                               ref['domain_id'])]
+            for user_id in user_ids:
+                for project_id in project_ids:
+                    expanded.append({'user_id': user_id,
+                                     'project_id': project_id,
+                                     'role_id': ref['role_id'],
+                                     'indirect': {
+                                         'group_id': ref.get('group_id'),
+                                         'domain_id': ref['domain_id']}})
+        else:
+            for user_id in user_ids:
+                expanded.append({'user_id': user_id,
+                                 'project_id': ref['project_id'],
+                                 'role_id': ref['role_id'],
+                                 'indirect': {'group_id': ref['group_id']}})
+    return expanded
+
+
+def run(label, manager, expand):
+    manager.identity_api.calls = manager.driver.calls = 0
+    start = time.time()
+    refs = expand()
+    elapsed = time.time() - start
+    print('  %-15s %8.3f s, %9d assignments, %6d backend calls' %
+          (label, elapsed, len(refs),
+           manager.identity_api.calls + manager.driver.calls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=10000)
+    parser.add_argument('--domains', type=int, default=10)
+    parser.add_argument('--groups', type=int, default=1000)
+    parser.add_argument('--members', type=int, default=20,
+                        help='users in every group')
+    parser.add_argument('--grants', type=int, default=5,
+                        help='projects every group has a role on')
+    parser.add_argument('--inherited-groups', type=int, default=20,
+                        help='groups with an inherited role on a domain')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='milliseconds added to every backend call')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    projects, members, assignments = build_dataset(args)
+    latency = args.latency / 1000.0
+    manager = core.Manager.__new__(core.Manager)
+    manager.identity_api = StandInIdentity(latency, members)
+    manager.driver = StandInAssignment(latency, projects, assignments)
+
+    print('%d projects in %d domains, %d groups of %d users, '
+          '%d assignments' % (args.projects, args.domains, args.groups,
+                              args.members, len(assignments)))
+    print('Expanding every assignment:')
+    run('per assignment', manager,
+        lambda: expand_per_assignment(manager))
+    run('bulk', manager,
+        lambda: manager._list_effective_role_assignments(
+            None, None, None, None, None, None))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark the generation of signed SAML assertions.
+
+Generates ``--assertions`` SAML responses for a user with ``--roles`` roles,
+as POST /auth/OS-FEDERATION/saml2 does, signing the assertions with the
+``xmlsec1`` binary and in process, and reports the generation rate of
+each. ``--threads`` generates from several threads at once, as the
+``crypt_workers`` pool does under eventlet.
+
+    python tools/benchmark_saml_signing.py --assertions 200
+    python tools/benchmark_saml_signing.py --threads 4
+    python tools/benchmark_saml_signing.py --xmlsec1 /usr/bin/xmlsec1
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from keystone import config  # noqa
+from keystone.contrib.federation import idp  # noqa
+
+
+CONF = config.CONF
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), os.pardir,
+                            'examples', 'pki')
+
+
+def run(label, roles, assertions, threads):
+    per_thread = max(assertions // threads, 1)
+
+    def worker():
+        for _ in range(per_thread):
+            idp.SAMLGenerator().samlize_token(
+                'https://keystone.example.com/v3/OS-FEDERATION/saml2/idp',
+                'https://sp.example.com/Shibboleth.sso/SAML2/POST',
+                'user', roles, 'project')
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.time() - start
+    generated = per_thread * threads
+    print('  %-12s %8.3f s, %8.2f ms per assertion, %8.1f assertions/s' %
+          (label, elapsed, elapsed * 1000 / generated, generated / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--assertions', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--roles', type=int, default=5,
+                        help='roles of the user in the assertion')
+    parser.add_argument('--xmlsec1', default='xmlsec1')
+    parser.add_argument('--certfile', default=os.path.join(
+        EXAMPLES_DIR, 'certs', 'signing_cert.pem'))
+    parser.add_argument('--keyfile', default=os.path.join(
+        EXAMPLES_DIR, 'private', 'signing_key.pem'))
+    args = parser.parse_args()
+
+    config.configure()
+    CONF.set_override('xmlsec1_binary', args.xmlsec1, group='saml')
+    CONF.set_override('certfile', args.certfile, group='saml')
+    CONF.set_override('keyfile', args.keyfile, group='saml')
+    if idp._get_assertion_signer() is None:
+        sys.exit('Unable to sign in process, are cryptography and lxml '
+                 'installed?')
+
+    roles = ['role%d' % index for index in range(args.roles)]
+    print('%d roles, %d threads' % (args.roles, args.threads))
+    CONF.set_override('in_process', False, group='saml')
+    run('xmlsec1', roles, args.assertions, args.threads)
+    CONF.set_override('in_process', True, group='saml')
+    run('in process', roles, args.assertions, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# Copyright (C) 2015 Universidad Politecnica de Madrid
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmark the signing of PKI and PKIZ tokens.
+
+Builds a v3 token body with a service catalog of ``--services`` services
+and signs it ``--tokens`` times with keystoneclient, which runs openssl in
+a subprocess for every token, and with the in-process signer of
+keystone.common.signing, checking that both produce the same token and
+reporting the issuance rate of each. ``--threads`` signs from several
+threads at once, as the ``crypt_workers`` pool does under eventlet.
+
+    python tools/benchmark_token_signing.py --tokens 500
+    python tools/benchmark_token_signing.py --format pkiz --threads 4
+
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from keystoneclient.common import cms  # noqa
+from oslo.serialization import jsonutils  # noqa
+
+from keystone.common import signing  # noqa
+from keystone import config  # noqa
+
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(__file__), os.pardir,
+                            'examples', 'pki')
+
+
+def build_token(services):
+    catalog = []
+    for index in range(services):
+        endpoints = [{'id': uuid.uuid4().hex,
+                      'interface': interface,
+                      'region': 'RegionOne',
+                      'url': 'http://service%d.example.com:5000/v3' % index}
+                     for interface in ('public', 'internal', 'admin')]
+        catalog.append({'id': uuid.uuid4().hex,
+                        'type': 'service%d' % index,
+                        'endpoints': endpoints})
+    return jsonutils.dumps({'token': {
+        'methods': ['password'],
+        'expires_at': '2015-01-01T00:00:00.000000Z',
+        'issued_at': '2014-12-31T23:00:00.000000Z',
+        'user': {'id': uuid.uuid4().hex, 'name': 'user',
+                 'domain': {'id': 'default', 'name': 'Default'}},
+        'project': {'id': uuid.uuid4().hex, 'name': 'project',
+                    'domain': {'id': 'default', 'name': 'Default'}},
+        'roles': [{'id': uuid.uuid4().hex, 'name': 'member'}],
+        'catalog': catalog}})
+
+
+def run(label, sign, text, tokens, threads):
+    per_thread = max(tokens // threads, 1)
+
+    def worker():
+        for _ in range(per_thread):
+            sign(text)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.time() - start
+    issued = per_thread * threads
+    print('  %-12s %8.3f s, %8.2f ms per token, %8.1f tokens/s' %
+          (label, elapsed, elapsed * 1000 / issued, issued / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--services', type=int, default=10,
+                        help='services in the token catalog')
+    parser.add_argument('--format', choices=('pki', 'pkiz'), default='pki')
+    parser.add_argument('--certfile', default=os.path.join(
+        EXAMPLES_DIR, 'certs', 'signing_cert.pem'))
+    parser.add_argument('--keyfile', default=os.path.join(
+        EXAMPLES_DIR, 'private', 'signing_key.pem'))
+    args = parser.parse_args()
+
+    config.configure()
+    if signing.get_signer(args.certfile, args.keyfile) is None:
+        sys.exit('Unable to sign in process, is cryptography installed?')
+    if args.format == 'pki':
+        openssl_sign = cms.cms_sign_token
+        in_process_sign = signing.cms_sign_token
+    else:
+        openssl_sign = cms.pkiz_sign
+        in_process_sign = signing.pkiz_sign
+
+    def sign_with_openssl(text):
+        return openssl_sign(text, args.certfile, args.keyfile)
+
+    def sign_in_process(text):
+        return in_process_sign(text, args.certfile, args.keyfile)
+
+    text = build_token(args.services)
+    if sign_with_openssl(text) != sign_in_process(text):
+        sys.exit('The in-process signer does not match openssl.')
+
+    print('%s tokens of %d bytes, %d threads' %
+          (args.format.upper(), len(text), args.threads))
+    run('openssl', sign_with_openssl, text, args.tokens, args.threads)
+    run('in process', sign_in_process, text, args.tokens, args.threads)
+
+
+if __name__ == '__main__':
+    main()